@@ -55,6 +55,11 @@ export class MapComponent implements OnDestroy {
     if (this.savedCenter) {
       map.setView(this.savedCenter, this.savedZoom);
     }
+
+    this.mapService.updatePolylinesLevelOfDetail(map.getZoom());
+    map.on('zoomend', () => {
+      this.mapService.updatePolylinesLevelOfDetail(map.getZoom());
+    });
   }
 
   private saveMapState() {
@@ -93,6 +93,7 @@ export class SimulationControlPanelComponent {
       case 'paused':
         return 'yellow';
       case 'stopping':
+      case 'queued':
       case 'starting':
       case 'completed':
         return 'gray';
@@ -101,6 +101,7 @@ export class SimulationListDialogComponent {
       case 'paused':
         return 'yellow';
 
+      case 'queued':
       case 'starting':
       case 'stopping':
       case 'outdated':
@@ -600,6 +600,10 @@ export class VisualizerComponent implements OnDestroy {
         case 'stopping':
           return;
 
+        case 'queued':
+          this.loadingService.start('Waiting for a free slot to start...');
+          return;
+
         case 'starting':
           this.loadingService.start('Starting simulation...');
           return;
@@ -3,6 +3,7 @@ import { EntityType } from './entity.model';
 export const SIMULATION_SAVE_FILE_SEPARATOR = '---';
 
 export type SimulationStatus =
+  | 'queued'
   | 'starting'
   | 'paused'
   | 'running'
@@ -14,6 +15,7 @@ export type SimulationStatus =
   | 'future';
 
 export const SIMULATION_STATUSES: SimulationStatus[] = [
+  'queued',
   'starting',
   'paused',
   'running',
@@ -26,6 +28,7 @@ export const SIMULATION_STATUSES: SimulationStatus[] = [
 ];
 
 export const RUNNING_SIMULATION_STATUSES: SimulationStatus[] = [
+  'queued',
   'starting',
   'running',
   'paused',
@@ -38,11 +41,12 @@ export const STATUSES_ORDER: Record<SimulationStatus, number> = {
   running: 1,
   paused: 1,
   stopping: 2,
-  lost: 3,
-  completed: 4,
-  corrupted: 5,
-  outdated: 5,
-  future: 5,
+  queued: 3,
+  lost: 4,
+  completed: 5,
+  corrupted: 6,
+  outdated: 6,
+  future: 6,
 };
 
 export interface Simulation {
@@ -115,6 +119,17 @@ export interface Simulation {
    * Version of the polylines
    */
   polylinesVersion: number;
+
+  /**
+   * Position of the simulation in the queue of simulations waiting to start
+   */
+  queuePosition: number | null;
+
+  /**
+   * Fraction of the states of the saved simulation compacted so far,
+   * null if it is not being compacted
+   */
+  compactionProgress: number | null;
 }
 
 export interface SimulationConfiguration {
@@ -176,6 +191,19 @@ export interface PassengerLegsUpdate {
   nextLegs: Leg[];
 }
 
+/**
+ * Change of the legs of a passenger since its last update. The legs are seen
+ * as a single list (previous legs, current leg and next legs) that is cut to
+ * legsCount legs and in which the changed legs are replaced or added.
+ */
+export interface PassengerLegsDeltaUpdate {
+  id: string;
+  previousLegsCount: number;
+  hasCurrentLeg: boolean;
+  legsCount: number;
+  changedLegs: { index: number; leg: Leg }[];
+}
+
 export type VehicleStatus =
   | 'release'
   | 'idle'
@@ -207,6 +235,10 @@ export interface Polyline {
 
 export interface AllPolylines {
   version: number;
+  /**
+   * 0 is the full detail, polylines are more simplified as it increases
+   */
+  levelOfDetail: number;
   polylinesByCoordinates: Record<string, Polyline>;
 }
 
@@ -300,6 +332,19 @@ export interface VehicleStopsUpdate {
   nextStops: Stop[];
 }
 
+/**
+ * Change of the stops of a vehicle since its last update. The stops are seen
+ * as a single list (previous stops, current stop and next stops) that is cut
+ * to stopsCount stops and in which the changed stops are replaced or added.
+ */
+export interface VehicleStopsDeltaUpdate {
+  id: string;
+  previousStopsCount: number;
+  hasCurrentStop: boolean;
+  stopsCount: number;
+  changedStops: { index: number; stop: Stop }[];
+}
+
 // eslint-disable-next-line @typescript-eslint/no-explicit-any
 export type Statistic = Record<string, any>;
 
@@ -314,6 +359,8 @@ export type SimulationUpdateType =
   | 'createVehicle'
   | 'updateVehicleStatus'
   | 'updateVehicleStops'
+  | 'updateVehicleStopsDelta'
+  | 'updatePassengerLegsDelta'
   | 'updateStatistic';
 
 export const SIMULATION_UPDATE_TYPES: SimulationUpdateType[] = [
@@ -323,6 +370,8 @@ export const SIMULATION_UPDATE_TYPES: SimulationUpdateType[] = [
   'createVehicle',
   'updateVehicleStatus',
   'updateVehicleStops',
+  'updateVehicleStopsDelta',
+  'updatePassengerLegsDelta',
   'updateStatistic',
 ];
 
@@ -333,6 +382,8 @@ export interface SimulationUpdateTypeMap {
   createVehicle: Vehicle;
   updateVehicleStatus: VehicleStatusUpdate;
   updateVehicleStops: VehicleStopsUpdate;
+  updateVehicleStopsDelta: VehicleStopsDeltaUpdate;
+  updatePassengerLegsDelta: PassengerLegsDeltaUpdate;
   updateStatistic: StatisticUpdate;
 }
 
@@ -25,6 +25,9 @@ export class DataService {
   private readonly _availableSimulationDataSignal: WritableSignal<string[]> =
     signal([]);
 
+  // Simulations as received from the server, to apply the changes to
+  private rawSimulations: Record<string, Simulation> = {};
+
   // MARK: Constructor
   constructor(private readonly communicationService: CommunicationService) {
     this.listen();
@@ -54,11 +57,29 @@ export class DataService {
 
   private listen() {
     this.communicationService.on('simulations', (simulations) => {
+      this.rawSimulations = {};
+      for (const rawSimulation of simulations as Simulation[]) {
+        if (rawSimulation?.id) {
+          this.rawSimulations[rawSimulation.id] = rawSimulation;
+        }
+      }
+
       this._simulationsSignal.set(
         this.extractSimulations(simulations as Simulation[]),
       );
     });
 
+    // Only the changed fields of a simulation are sent, or null if the simulation has been removed
+    this.communicationService.on(
+      'simulation-changed',
+      (simulationId, changes) => {
+        this.applySimulationChanges(
+          simulationId as string,
+          changes as Record<string, unknown> | null,
+        );
+      },
+    );
+
     this.communicationService.on('available-data', (availableData) => {
       this._availableSimulationDataSignal.set(
         (availableData as string[]).sort(),
@@ -80,6 +101,41 @@ export class DataService {
     this.communicationService.emit('get-simulations');
   }
 
+  private applySimulationChanges(
+    simulationId: string,
+    changes: Record<string, unknown> | null,
+  ) {
+    const otherSimulations = this._simulationsSignal().filter(
+      (simulation) => simulation.id !== simulationId,
+    );
+
+    if (changes === null) {
+      delete this.rawSimulations[simulationId];
+      this._simulationsSignal.set(otherSimulations);
+      return;
+    }
+
+    const rawSimulation: Record<string, unknown> = {
+      ...(this.rawSimulations[simulationId] ?? {}),
+    };
+
+    for (const [key, value] of Object.entries(changes)) {
+      // Removed fields are sent as null
+      if (value === null) {
+        delete rawSimulation[key];
+      } else {
+        rawSimulation[key] = value;
+      }
+    }
+
+    this.rawSimulations[simulationId] = rawSimulation as unknown as Simulation;
+
+    this._simulationsSignal.set([
+      ...otherSimulations,
+      ...this.extractSimulations([rawSimulation as unknown as Simulation]),
+    ]);
+  }
+
   // MARK: Extraction
   /**
    * Validate and extract simulation from the raw data.
@@ -128,6 +184,8 @@ export class DataService {
               maxDuration: null,
             },
             polylinesVersion: -1,
+            queuePosition: null,
+            compactionProgress: null,
           };
         }
 
@@ -202,6 +260,10 @@ export class DataService {
 
         const polylinesVersion = rawSimulation.polylinesVersion ?? -1;
 
+        const queuePosition = rawSimulation.queuePosition ?? null;
+
+        const compactionProgress = rawSimulation.compactionProgress ?? null;
+
         return {
           id,
           name,
@@ -218,6 +280,8 @@ export class DataService {
             maxDuration,
           },
           polylinesVersion,
+          queuePosition,
+          compactionProgress,
         };
       })
       .filter((simulation) => !!simulation);
@@ -20,11 +20,20 @@ export class MapService {
   private readonly minZoom = 8;
   private readonly maxZoom = 18;
 
+  /**
+   * Minimum zoom of each polylines level of detail, from the full detail (0)
+   * to the most simplified polylines.
+   */
+  private readonly POLYLINES_LEVELS_OF_DETAIL_MIN_ZOOMS = [15, 13, 11];
+
   map: Map | null = null;
 
   private _selectedMapTile!: WritableSignal<MapTile>;
   private _mapTiles: WritableSignal<MapTile[]> = signal([]);
 
+  private readonly _polylinesLevelOfDetailSignal: WritableSignal<number> =
+    signal(0);
+
   get selectedMapTile(): Signal<MapTile> {
     return this._selectedMapTile;
   }
@@ -33,6 +42,10 @@ export class MapService {
     return this._mapTiles;
   }
 
+  get polylinesLevelOfDetailSignal(): Signal<number> {
+    return this._polylinesLevelOfDetailSignal;
+  }
+
   constructor() {
     this.loadMapTilesData();
 
@@ -57,6 +70,18 @@ export class MapService {
     mapTile.tile.addTo(this.map);
   }
 
+  updatePolylinesLevelOfDetail(zoom: number) {
+    const levelOfDetail = this.POLYLINES_LEVELS_OF_DETAIL_MIN_ZOOMS.findIndex(
+      (minZoom) => zoom >= minZoom,
+    );
+
+    this._polylinesLevelOfDetailSignal.set(
+      levelOfDetail === -1
+        ? this.POLYLINES_LEVELS_OF_DETAIL_MIN_ZOOMS.length
+        : levelOfDetail,
+    );
+  }
+
   addMapTile(name: string, url: string, attribution: string | null) {
     this._mapTiles.update((mapTiles) => {
       const newTile = this.createMapTile(name, url, attribution, true);
@@ -25,6 +25,7 @@ import {
   Passenger,
   PASSENGER_STATUSES,
   PassengerAnimationData,
+  PassengerLegsDeltaUpdate,
   PassengerLegsUpdate,
   PassengerStatusUpdate,
   Polyline,
@@ -43,6 +44,7 @@ import {
   VEHICLE_STATUSES,
   VehicleAnimationData,
   VehicleStatusUpdate,
+  VehicleStopsDeltaUpdate,
   VehicleStopsUpdate,
 } from '../interfaces/simulation.model';
 import { CommunicationService } from './communication.service';
@@ -71,6 +73,13 @@ export class SimulationService {
 
   private readonly _isFetchingStatesSignal: WritableSignal<boolean> =
     signal(false);
+
+  // Byte offset read up to in the state file of each loaded state,
+  // used to only fetch the updates appended to the last state
+  private stateByteOffsets: Record<number, number> = {};
+
+  // Responses of the missing states, applied one after the other
+  private missingStatesQueue: Promise<void> = Promise.resolve();
   private readonly _isFetchingPolylinesSignal: WritableSignal<boolean> =
     signal(false);
 
@@ -96,54 +105,95 @@ export class SimulationService {
         firstContinuousStateOrder,
         lastContinuousStateOrder,
         currentStateOrder,
+        stateByteOffsets,
+        appendedStateOrders,
+        compressedStates,
       ) => {
-        this._simulationStatesSignal.update((states) => {
-          const parsedMissingStates = (rawMissingStates as string[]).map(
-            (rawState) => JSON.parse(rawState) as RawSimulationState,
-          );
-          const parsedMissingUpdates = Object.entries(
-            rawMissingUpdates as Record<string, string[]>,
-          ).reduce(
-            (acc, [order, rawUpdates]) => {
-              acc[parseInt(order)] = rawUpdates.map(
-                (rawUpdate) => JSON.parse(rawUpdate) as AnySimulationUpdate,
-              );
-              return acc;
-            },
-            {} as Record<number, AnySimulationUpdate[]>,
-          );
-          const missingStates = parsedMissingStates
-            .map((rawState) =>
-              this.extractSimulationState(rawState, parsedMissingUpdates),
-            )
-            .filter((state) => state !== null);
-
-          return this.mergeStates(
-            states,
-            missingStates,
-            stateOrdersToKeep as number[],
-            !!shouldRequestMoreStates,
-            firstContinuousStateOrder as number,
-            lastContinuousStateOrder as number,
-            currentStateOrder as number,
-          );
-        });
+        // Complete states are compressed if the browser can decompress them
+        const allCompressedStates =
+          (compressedStates as Record<number, ArrayBuffer> | undefined) ?? {};
+        const decompressedStatesPromise = Promise.all(
+          Object.values(allCompressedStates).map((compressedState) =>
+            this.decompressSimulationState(compressedState),
+          ),
+        );
+
+        // Apply the responses in the order they are received,
+        // even if the states of a previous one are still decompressed
+        this.missingStatesQueue = this.missingStatesQueue
+          .then(async () => {
+            const decompressedStates = await decompressedStatesPromise;
+
+            // The active simulation has changed since the request
+            if (this._activeSimulationIdSignal() !== simulationId) {
+              return;
+            }
 
-        this._isFetchingStatesSignal.set(false);
+            this.applyMissingSimulationStates(
+              rawMissingStates as string[],
+              rawMissingUpdates as Record<string, string[]>,
+              stateOrdersToKeep as number[],
+              !!shouldRequestMoreStates,
+              firstContinuousStateOrder as number,
+              lastContinuousStateOrder as number,
+              currentStateOrder as number,
+              (stateByteOffsets as Record<number, number> | undefined) ?? {},
+              (appendedStateOrders as number[] | undefined) ?? [],
+              decompressedStates,
+            );
+          })
+          .catch((error) => {
+            console.error('Invalid missing simulation states: ', error);
+            this._isFetchingStatesSignal.set(false);
+          });
       },
     );
 
     this.communicationService.on(
       `polylines-${simulationId}`,
-      (polylinesByCoordinates, version) => {
+      (polylinesByCoordinates, version, knownVersion, levelOfDetail) => {
         this._isFetchingPolylinesSignal.set(false);
 
-        this._simulationPolylinesSignal.set(
-          this.extractPolylines(
-            polylinesByCoordinates as unknown as string[],
-            version as number,
-          ) ?? null,
+        const polylines = this.extractPolylines(
+          polylinesByCoordinates as unknown as string[],
+          version as number,
+          (levelOfDetail as number | undefined) ?? 0,
         );
+
+        if (
+          polylines === null ||
+          knownVersion === null ||
+          knownVersion === undefined
+        ) {
+          this._simulationPolylinesSignal.set(polylines);
+          return;
+        }
+
+        // Only the polylines added after the known version have been sent
+        const currentPolylines = this._simulationPolylinesSignal();
+
+        if (
+          currentPolylines === null ||
+          currentPolylines.version !== knownVersion ||
+          currentPolylines.levelOfDetail !== polylines.levelOfDetail
+        ) {
+          // The polylines have changed since the request, fetch all of them again
+          this._simulationPolylinesSignal.set(null);
+          return;
+        }
+
+        if (polylines.version === currentPolylines.version) {
+          return;
+        }
+
+        this._simulationPolylinesSignal.set({
+          version: polylines.version,
+          levelOfDetail: polylines.levelOfDetail,
+          polylinesByCoordinates: {
+            ...currentPolylines.polylinesByCoordinates,
+            ...polylines.polylinesByCoordinates,
+          },
+        });
       },
     );
   }
@@ -167,6 +217,8 @@ export class SimulationService {
     this._isFetchingStatesSignal.set(false);
     this._isFetchingPolylinesSignal.set(false);
 
+    this.stateByteOffsets = {};
+
     this.communicationService.removeAllListeners('missing-simulation-states');
 
     if (activeSimulationId) {
@@ -224,21 +276,110 @@ export class SimulationService {
   ) {
     this._isFetchingStatesSignal.set(true);
 
+    // Send the byte offset read up to in the last state to only get the appended updates
+    const lastStateOrder =
+      allStateOrders.length > 0 ? Math.max(...allStateOrders) : null;
+    const lastStateByteOffset =
+      lastStateOrder !== null ? this.stateByteOffsets[lastStateOrder] : null;
+
     this.communicationService.emit(
       'get-missing-simulation-states',
       simulationId,
       visualizationTime,
       allStateOrders,
+      lastStateByteOffset ? [lastStateOrder, lastStateByteOffset] : null,
+      typeof DecompressionStream === 'undefined' ? [] : ['deflate'],
     );
   }
 
-  getPolylines(simulationId: string) {
+  getPolylines(simulationId: string, levelOfDetail: number) {
     this._isFetchingPolylinesSignal.set(true);
 
-    this.communicationService.emit('get-polylines', simulationId);
+    // Send the version of the loaded polylines to only get the new ones,
+    // unless they have been loaded with another level of detail
+    const currentPolylines = this._simulationPolylinesSignal();
+    const knownVersion =
+      currentPolylines !== null &&
+      currentPolylines.levelOfDetail === levelOfDetail
+        ? currentPolylines.version
+        : null;
+
+    this.communicationService.emit(
+      'get-polylines',
+      simulationId,
+      knownVersion,
+      levelOfDetail,
+    );
   }
 
   // MARK: Data extraction
+  private applyMissingSimulationStates(
+    rawMissingStates: string[],
+    rawMissingUpdates: Record<string, string[]>,
+    stateOrdersToKeep: number[],
+    shouldRequestMoreStates: boolean,
+    firstContinuousStateOrder: number,
+    lastContinuousStateOrder: number,
+    currentStateOrder: number,
+    stateByteOffsets: Record<number, number>,
+    appendedStateOrders: number[],
+    decompressedStates: unknown[][],
+  ) {
+    // The byte offsets are updated with the states they were read for
+    this.stateByteOffsets = { ...this.stateByteOffsets, ...stateByteOffsets };
+
+    this._simulationStatesSignal.update((states) => {
+      const parsedMissingStates = rawMissingStates.map(
+        (rawState) => JSON.parse(rawState) as RawSimulationState,
+      );
+      const parsedMissingUpdates = Object.entries(rawMissingUpdates).reduce(
+        (acc, [order, rawUpdates]) => {
+          acc[parseInt(order)] = rawUpdates.map(
+            (rawUpdate) => JSON.parse(rawUpdate) as AnySimulationUpdate,
+          );
+          return acc;
+        },
+        {} as Record<number, AnySimulationUpdate[]>,
+      );
+
+      for (const [rawState, ...updates] of decompressedStates) {
+        parsedMissingStates.push(rawState as RawSimulationState);
+        parsedMissingUpdates[(rawState as RawSimulationState).order] =
+          updates as AnySimulationUpdate[];
+      }
+
+      const missingStates = parsedMissingStates
+        .map((rawState) =>
+          this.extractSimulationState(rawState, parsedMissingUpdates),
+        )
+        .filter((state) => state !== null);
+
+      // Only the updates appended since the last request are sent for these states
+      for (const order of appendedStateOrders) {
+        const appendedState = this.appendSimulationUpdates(
+          states.states.find((state) => state.order === order),
+          parsedMissingUpdates[order],
+        );
+
+        if (appendedState) {
+          missingStates.push(appendedState);
+        }
+      }
+
+      return this.mergeStates(
+        states,
+        missingStates,
+        stateOrdersToKeep,
+        shouldRequestMoreStates,
+        firstContinuousStateOrder,
+        lastContinuousStateOrder,
+        currentStateOrder,
+      );
+    });
+
+    this._isFetchingStatesSignal.set(false);
+  }
+
   /**
    * Validate and extract simulation update from the raw data.
    */
@@ -302,6 +443,16 @@ export class SimulationService {
           }
         }
         return null;
+      case 'updatePassengerLegsDelta':
+        {
+          const passengerLegsDeltaUpdate = this.extractPassengerLegsDeltaUpdate(
+            data as PassengerLegsDeltaUpdate,
+          );
+          if (passengerLegsDeltaUpdate) {
+            return { type, order, timestamp, data: passengerLegsDeltaUpdate };
+          }
+        }
+        return null;
 
       case 'createVehicle':
         {
@@ -334,6 +485,17 @@ export class SimulationService {
         }
         return null;
 
+      case 'updateVehicleStopsDelta':
+        {
+          const vehicleStopsDeltaUpdate = this.extractVehicleStopsDeltaUpdate(
+            data as VehicleStopsDeltaUpdate,
+          );
+          if (vehicleStopsDeltaUpdate) {
+            return { type, order, timestamp, data: vehicleStopsDeltaUpdate };
+          }
+        }
+        return null;
+
       case 'updateStatistic': {
         return {
           type,
@@ -519,6 +681,57 @@ export class SimulationService {
     return { id, previousLegs, currentLeg, nextLegs };
   }
 
+  private extractPassengerLegsDeltaUpdate(
+    data: PassengerLegsDeltaUpdate,
+  ): PassengerLegsDeltaUpdate | null {
+    // TODO Uncomment for debugging
+    // console.debug('Extracting passenger legs delta update: ', data);
+
+    const id = data.id;
+    if (!id) {
+      console.error('Passenger ID not found: ', id);
+      return null;
+    }
+
+    const previousLegsCount = data.previousLegsCount;
+    if (previousLegsCount === undefined) {
+      console.error(
+        'Passenger previous legs count not found: ',
+        previousLegsCount,
+      );
+      return null;
+    }
+
+    const hasCurrentLeg = data.hasCurrentLeg;
+    if (hasCurrentLeg === undefined) {
+      console.error('Passenger has current leg not found: ', hasCurrentLeg);
+      return null;
+    }
+
+    const legsCount = data.legsCount;
+    if (legsCount === undefined) {
+      console.error('Passenger legs count not found: ', legsCount);
+      return null;
+    }
+
+    if (!Array.isArray(data.changedLegs)) {
+      console.error('Passenger changed legs not found: ', data.changedLegs);
+      return null;
+    }
+
+    const changedLegs: { index: number; leg: Leg }[] = [];
+    for (const changedLeg of data.changedLegs) {
+      const leg = this.extractLeg(changedLeg.leg);
+      if (changedLeg.index === undefined || leg === null) {
+        console.error('Passenger changed leg invalid: ', changedLeg);
+        return null;
+      }
+      changedLegs.push({ index: changedLeg.index, leg });
+    }
+
+    return { id, previousLegsCount, hasCurrentLeg, legsCount, changedLegs };
+  }
+
   private extractVehicle(data: Vehicle): Vehicle | null {
     // TODO Uncomment for debugging
     // console.debug('Extracting vehicle: ', data);
@@ -673,6 +886,57 @@ export class SimulationService {
     return { id, previousStops, currentStop, nextStops };
   }
 
+  private extractVehicleStopsDeltaUpdate(
+    data: VehicleStopsDeltaUpdate,
+  ): VehicleStopsDeltaUpdate | null {
+    // TODO Uncomment for debugging
+    // console.debug('Extracting vehicle stops delta update: ', data);
+
+    const id = data.id;
+    if (!id) {
+      console.error('Vehicle ID not found: ', id);
+      return null;
+    }
+
+    const previousStopsCount = data.previousStopsCount;
+    if (previousStopsCount === undefined) {
+      console.error(
+        'Vehicle previous stops count not found: ',
+        previousStopsCount,
+      );
+      return null;
+    }
+
+    const hasCurrentStop = data.hasCurrentStop;
+    if (hasCurrentStop === undefined) {
+      console.error('Vehicle has current stop not found: ', hasCurrentStop);
+      return null;
+    }
+
+    const stopsCount = data.stopsCount;
+    if (stopsCount === undefined) {
+      console.error('Vehicle stops count not found: ', stopsCount);
+      return null;
+    }
+
+    if (!Array.isArray(data.changedStops)) {
+      console.error('Vehicle changed stops not found: ', data.changedStops);
+      return null;
+    }
+
+    const changedStops: { index: number; stop: Stop }[] = [];
+    for (const changedStop of data.changedStops) {
+      const stop = this.extractStop(changedStop.stop);
+      if (changedStop.index === undefined || stop === null) {
+        console.error('Vehicle changed stop invalid: ', changedStop);
+        return null;
+      }
+      changedStops.push({ index: changedStop.index, stop });
+    }
+
+    return { id, previousStopsCount, hasCurrentStop, stopsCount, changedStops };
+  }
+
   private extractStop(data: Stop): Stop | null {
     // TODO Uncomment for debugging
     // console.debug('Extracting stop: ', data);
@@ -769,6 +1033,22 @@ export class SimulationService {
     return { passengers, vehicles, timestamp, statistic, order };
   }
 
+  /**
+   * Decompress the records of a complete state, sent as a deflate compressed
+   * JSON array of the state followed by its updates.
+   */
+  private async decompressSimulationState(
+    compressedState: ArrayBuffer,
+  ): Promise<unknown[]> {
+    const decompressedStream = new Blob([compressedState])
+      .stream()
+      .pipeThrough(new DecompressionStream('deflate'));
+
+    return JSON.parse(
+      await new Response(decompressedStream).text(),
+    ) as unknown[];
+  }
+
   private extractSimulationState(
     rawSimulationState: RawSimulationState,
     allUpdates: Record<number, AnySimulationUpdate[]>,
@@ -804,9 +1084,46 @@ export class SimulationService {
     return { ...environment, updates };
   }
 
+  /**
+   * Create a copy of a loaded state with the updates appended since it was loaded.
+   */
+  private appendSimulationUpdates(
+    state: AnimatedSimulationState | undefined,
+    rawUpdates: AnySimulationUpdate[] | undefined,
+  ): SimulationState | null {
+    if (!state) {
+      console.error('Simulation state to append updates to not found');
+      return null;
+    }
+
+    if (!Array.isArray(rawUpdates)) {
+      console.error('Simulation state updates not found: ', rawUpdates);
+      return null;
+    }
+
+    const updates: AnySimulationUpdate[] = [...state.updates];
+
+    for (const rawUpdate of rawUpdates) {
+      const update = this.extractSimulationUpdate(rawUpdate);
+
+      if (update) {
+        updates.push(update);
+      } else {
+        console.error('Invalid simulation update: ', rawUpdate);
+        return null;
+      }
+    }
+
+    // eslint-disable-next-line @typescript-eslint/no-unused-vars
+    const { animationData, ...simulationState } = state;
+
+    return { ...simulationState, updates };
+  }
+
   private extractPolylines(
     polylinesByCoordinates: string[],
     version: number,
+    levelOfDetail: number,
   ): AllPolylines | null {
     if (!Array.isArray(polylinesByCoordinates)) {
       console.error('Polylines not found: ', polylinesByCoordinates);
@@ -932,7 +1249,11 @@ export class SimulationService {
       console.error('Polylines version not found: ', version);
       return null;
     }
-    return { version, polylinesByCoordinates: parsedPolylinesByCoordinates };
+    return {
+      version,
+      levelOfDetail,
+      polylinesByCoordinates: parsedPolylinesByCoordinates,
+    };
   }
 
   // MARK: Build environment
@@ -1026,6 +1347,26 @@ export class SimulationService {
           };
         }
         break;
+      case 'updatePassengerLegsDelta':
+        {
+          const passengerLegsDeltaUpdate =
+            update.data as PassengerLegsDeltaUpdate;
+          const passenger =
+            simulationEnvironment.passengers[passengerLegsDeltaUpdate.id];
+          if (!passenger) {
+            console.error('Passenger not found: ', passengerLegsDeltaUpdate.id);
+            break;
+          }
+
+          simulationEnvironment.passengers[passengerLegsDeltaUpdate.id] = {
+            ...passenger,
+            ...this.applyPassengerLegsDeltaUpdate(
+              passenger,
+              passengerLegsDeltaUpdate,
+            ),
+          };
+        }
+        break;
       case 'createVehicle':
         {
           const vehicle = update.data as Vehicle;
@@ -1067,6 +1408,26 @@ export class SimulationService {
           };
         }
         break;
+      case 'updateVehicleStopsDelta':
+        {
+          const vehicleStopsDeltaUpdate =
+            update.data as VehicleStopsDeltaUpdate;
+          const vehicle =
+            simulationEnvironment.vehicles[vehicleStopsDeltaUpdate.id];
+          if (!vehicle) {
+            console.error('Vehicle not found: ', vehicleStopsDeltaUpdate.id);
+            break;
+          }
+
+          simulationEnvironment.vehicles[vehicleStopsDeltaUpdate.id] = {
+            ...vehicle,
+            ...this.applyVehicleStopsDeltaUpdate(
+              vehicle,
+              vehicleStopsDeltaUpdate,
+            ),
+          };
+        }
+        break;
       case 'updateStatistic':
         {
           simulationEnvironment.statistic = (
@@ -1077,6 +1438,54 @@ export class SimulationService {
     }
   }
 
+  private applyPassengerLegsDeltaUpdate(
+    passenger: Passenger,
+    update: PassengerLegsDeltaUpdate,
+  ): Pick<Passenger, 'previousLegs' | 'currentLeg' | 'nextLegs'> {
+    const legs = [
+      ...passenger.previousLegs,
+      ...(passenger.currentLeg === null ? [] : [passenger.currentLeg]),
+      ...passenger.nextLegs,
+    ].slice(0, update.legsCount);
+
+    for (const { index, leg } of update.changedLegs) {
+      legs[index] = leg;
+    }
+
+    const currentLegsCount = update.hasCurrentLeg ? 1 : 0;
+
+    return {
+      previousLegs: legs.slice(0, update.previousLegsCount),
+      currentLeg: update.hasCurrentLeg ? legs[update.previousLegsCount] : null,
+      nextLegs: legs.slice(update.previousLegsCount + currentLegsCount),
+    };
+  }
+
+  private applyVehicleStopsDeltaUpdate(
+    vehicle: Vehicle,
+    update: VehicleStopsDeltaUpdate,
+  ): Pick<Vehicle, 'previousStops' | 'currentStop' | 'nextStops'> {
+    const stops = [
+      ...vehicle.previousStops,
+      ...(vehicle.currentStop === null ? [] : [vehicle.currentStop]),
+      ...vehicle.nextStops,
+    ].slice(0, update.stopsCount);
+
+    for (const { index, stop } of update.changedStops) {
+      stops[index] = stop;
+    }
+
+    const currentStopsCount = update.hasCurrentStop ? 1 : 0;
+
+    return {
+      previousStops: stops.slice(0, update.previousStopsCount),
+      currentStop: update.hasCurrentStop
+        ? stops[update.previousStopsCount]
+        : null,
+      nextStops: stops.slice(update.previousStopsCount + currentStopsCount),
+    };
+  }
+
   private mergeStates(
     states: AnimatedSimulationStates,
     missingStates: SimulationState[],
@@ -1263,6 +1672,16 @@ export class SimulationService {
             );
           }
           break;
+        case 'updatePassengerLegsDelta':
+          {
+            const castedUpdate =
+              update as SimulationUpdate<'updatePassengerLegsDelta'>;
+            this.handleUpdatePassengerLegs(
+              animatedSimulationState,
+              castedUpdate,
+            );
+          }
+          break;
         case 'createVehicle':
           {
             const castedUpdate = update as SimulationUpdate<'createVehicle'>;
@@ -1294,6 +1713,17 @@ export class SimulationService {
             );
           }
           break;
+        case 'updateVehicleStopsDelta':
+          {
+            const castedUpdate =
+              update as SimulationUpdate<'updateVehicleStopsDelta'>;
+            this.handleUpdateVehicleStops(
+              animatedSimulationState,
+              castedUpdate,
+              polylines,
+            );
+          }
+          break;
         case 'updateStatistic':
           // Do nothing
           break;
@@ -1535,7 +1965,9 @@ export class SimulationService {
 
   private handleUpdatePassengerLegs(
     animatedSimulationState: AnimatedSimulationState,
-    update: SimulationUpdate<'updatePassengerLegs'>,
+    update: SimulationUpdate<
+      'updatePassengerLegs' | 'updatePassengerLegsDelta'
+    >,
   ): void {
     const passengerId = update.data.id;
 
@@ -1630,7 +2062,7 @@ export class SimulationService {
 
   private handleUpdateVehicleStops(
     animatedSimulationState: AnimatedSimulationState,
-    update: SimulationUpdate<'updateVehicleStops'>,
+    update: SimulationUpdate<'updateVehicleStops' | 'updateVehicleStopsDelta'>,
     polylines: Record<string, Polyline> | null,
   ): void {
     const vehicleId = update.data.id;
@@ -26,6 +26,7 @@ import {
   StaticVehicleAnimationData,
 } from '../interfaces/simulation.model';
 import { CommunicationService } from './communication.service';
+import { MapService } from './map.service';
 import { SimulationService } from './simulation.service';
 
 @Injectable()
@@ -78,6 +79,7 @@ export class VisualizationService {
     private readonly injector: Injector,
     private readonly communicationService: CommunicationService,
     private readonly simulationService: SimulationService,
+    private readonly mapService: MapService,
   ) {
     effect(() => {
       const wantedVisualizationTime = this._wantedVisualizationTimeSignal();
@@ -163,12 +165,15 @@ export class VisualizationService {
 
       const polylines = this.simulationService.simulationPolylinesSignal();
       const isFetching = this.simulationService.isFetchingPolylinesSignal();
+      const levelOfDetail = this.mapService.polylinesLevelOfDetailSignal();
 
       const needPolylineUpdate =
-        polylines === null || polylines.version !== simulation.polylinesVersion;
+        polylines === null ||
+        polylines.version !== simulation.polylinesVersion ||
+        polylines.levelOfDetail !== levelOfDetail;
 
       if (needPolylineUpdate && !isFetching) {
-        this.getPolylines(simulation.id);
+        this.getPolylines(simulation.id, levelOfDetail);
       }
     });
 
@@ -373,7 +378,7 @@ export class VisualizationService {
     );
   }
 
-  private getPolylines(simulationId: string) {
+  private getPolylines(simulationId: string, levelOfDetail: number) {
     if (this.fetchPolylinesTimeout !== null) {
       clearTimeout(this.fetchPolylinesTimeout);
       this.fetchPolylinesTimeout = null;
@@ -386,13 +391,13 @@ export class VisualizationService {
       this.fetchPolylinesTimeout = setTimeout(() => {
         this.fetchPolylinesTimeout = null;
         this.lastFetchPolylinesTime = currentTime;
-        this.simulationService.getPolylines(simulationId);
+        this.simulationService.getPolylines(simulationId, levelOfDetail);
       }, this.MIN_POLYLINES_DEBOUNCE_TIME - timeSinceLastDebounce) as unknown as number;
       return;
     }
 
     this.lastFetchPolylinesTime = currentTime;
-    this.simulationService.getPolylines(simulationId);
+    this.simulationService.getPolylines(simulationId, levelOfDetail);
   }
 
   // MARK: Computed signals
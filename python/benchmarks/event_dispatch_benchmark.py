@@ -0,0 +1,119 @@
+"""
+Compare the cost of dispatching the events of a simulation to their handlers in the data collector.
+
+The event mix is replayed from a saved simulation log (by default the largest log in server/saved_logs),
+in which every line is "<time> TODO <event type>". Events are created without calling their constructors,
+so only the dispatch itself is measured: the former chain of isinstance checks, the registry lookup of the
+data collector, and the construction of the log message of each event.
+
+Usage:
+
+    python <path to python>/benchmarks/event_dispatch_benchmark.py [log file] [--repeat N]
+"""
+
+import argparse
+import os
+import time
+
+from multimodalsim_viewer.server.simulation_visualization_data_collector import (
+    SimulationVisualizationDataCollector,
+)
+
+# Matched in the same order as the former chain of isinstance checks of process_event
+EVENT_TYPES = SimulationVisualizationDataCollector.get_handled_event_types()
+
+EVENT_TYPES_BY_NAME = {event_type.__name__: event_type for event_type in EVENT_TYPES}
+
+
+def get_default_log_file_path() -> str:
+    log_directory_path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "multimodalsim_viewer",
+        "server",
+        "saved_logs",
+    )
+
+    log_file_paths = [
+        os.path.join(log_directory_path, file_name)
+        for file_name in os.listdir(log_directory_path)
+        if file_name.endswith(".txt")
+    ]
+
+    if len(log_file_paths) == 0:
+        raise FileNotFoundError(f"No saved log in {log_directory_path}, run a simulation first")
+
+    return max(log_file_paths, key=os.path.getsize)
+
+
+def load_events(log_file_path: str) -> list:
+    events = []
+
+    with open(log_file_path, "r", encoding="utf-8") as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) != 3 or parts[2] not in EVENT_TYPES_BY_NAME:
+                continue
+
+            event = object.__new__(EVENT_TYPES_BY_NAME[parts[2]])
+            event.time = float(parts[0])
+            events.append(event)
+
+    return events
+
+
+def dispatch_with_isinstance_chain(event) -> str:
+    for event_type in EVENT_TYPES:
+        if isinstance(event, event_type):
+            return event_type.__name__
+
+    raise NotImplementedError(f"Event {type(event)} not implemented")
+
+
+def dispatch_with_registry(event) -> str:
+    _, event_name = SimulationVisualizationDataCollector.get_event_handler(type(event))
+    return event_name
+
+
+def measure(events: list, function, repeat: int) -> float:
+    best_time = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for event in events:
+            function(event)
+        best_time = min(best_time, time.perf_counter() - start)
+
+    return best_time / len(events) * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the event dispatch of the data collector")
+    parser.add_argument("log_file", type=str, nargs="?", help="The saved simulation log to replay")
+    parser.add_argument("--repeat", type=int, default=5, help="The number of times the events are replayed")
+    args = parser.parse_args()
+
+    log_file_path = args.log_file if args.log_file is not None else get_default_log_file_path()
+    events = load_events(log_file_path)
+
+    if len(events) == 0:
+        print(f"No event found in {log_file_path}")
+        return
+
+    print(f"{log_file_path}: {len(events)} events")
+    print(f"  {'dispatch':<32} {'time/event (ns)':>16}")
+
+    results = [
+        ("isinstance chain", measure(events, dispatch_with_isinstance_chain, args.repeat)),
+        ("registry lookup", measure(events, dispatch_with_registry, args.repeat)),
+        (
+            "registry lookup + log message",
+            measure(events, SimulationVisualizationDataCollector.get_event_log_message, args.repeat),
+        ),
+    ]
+
+    for name, time_per_event in results:
+        print(f"  {name:<32} {time_per_event:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Compare the cost of finding the boarding and alighting stops of the legs of the passengers.
+
+Each data folder (by default every data/instance_medium_* folder) is simulated in offline mode without saving.
+Every few events, the legs of all the trips assigned to a vehicle are built twice: with the former scan of the
+passengers of every stop of the route (once per leg), and with the stop indices of the routes, built once per route
+and per event like in the data collector. Both must find the same stops.
+
+Usage (from the directory that contains the data folder):
+
+    python <path to python>/benchmarks/leg_stop_indices_benchmark.py [data ...] [--max-duration S] [--sample-interval N]
+"""
+
+import argparse
+import fnmatch
+import os
+import time
+from typing import Optional
+
+from multimodalsim.observer.data_collector import DataCollector
+from multimodalsim.observer.environment_observer import EnvironmentObserver
+from multimodalsim.simulator.environment import Environment
+from multimodalsim.simulator.event import Event
+from multimodalsim.simulator.request import Leg, Trip
+from multimodalsim.simulator.simulator import Simulator
+
+from multimodalsim_viewer.common.utils import (
+    get_available_data,
+    get_data_directory_path,
+)
+from multimodalsim_viewer.server.simulation_visualization_data_model import (
+    RouteStopIndices,
+    VisualizedLeg,
+)
+
+
+def get_stop_indices_with_stop_scan(leg: Leg, environment: Environment, trip: Trip) -> tuple[int | None, int | None]:
+    """
+    Find the boarding and alighting stop indices of a leg like VisualizedLeg.from_leg_environment_and_trip did
+    before the stop indices of the routes.
+    """
+    boarding_stop_index = None
+    alighting_stop_index = None
+
+    route = environment.get_route_by_vehicle_id(leg.assigned_vehicle.id) if leg.assigned_vehicle is not None else None
+
+    all_legs = trip.previous_legs + ([trip.current_leg] if trip.current_leg else []) + trip.next_legs
+
+    same_vehicle_leg_index = 0
+    for other_leg in all_legs:
+        if other_leg.assigned_vehicle == leg.assigned_vehicle:
+            if other_leg == leg:
+                break
+            same_vehicle_leg_index += 1
+
+    if route is not None:
+        all_stops = route.previous_stops.copy()
+        if route.current_stop is not None:
+            all_stops.append(route.current_stop)
+        all_stops += route.next_stops
+
+        trip_found_count = 0
+
+        for i, stop in enumerate(all_stops):
+            if trip in (stop.passengers_to_board + stop.boarding_passengers + stop.boarded_passengers):
+                if trip_found_count == same_vehicle_leg_index:
+                    boarding_stop_index = i
+                    break
+                trip_found_count += 1
+
+        trip_found_count = 0
+
+        for i, stop in enumerate(all_stops):
+            if trip in (stop.passengers_to_alight + stop.alighting_passengers + stop.alighted_passengers):
+                if trip_found_count == same_vehicle_leg_index:
+                    alighting_stop_index = i
+                    break
+                trip_found_count += 1
+
+    return boarding_stop_index, alighting_stop_index
+
+
+def get_stop_indices_with_route_stop_indices(
+    leg: Leg, environment: Environment, trip: Trip, route_stop_indices: dict[str, RouteStopIndices]
+) -> tuple[int | None, int | None]:
+    visualized_leg = VisualizedLeg.from_leg_environment_and_trip(leg, environment, trip, None, route_stop_indices)
+    return visualized_leg.boarding_stop_index, visualized_leg.alighting_stop_index
+
+
+class LegStopIndicesBenchmarkDataCollector(DataCollector):
+    """
+    Measure the time taken to find the stops of the legs of the assigned trips, every sample_interval events.
+    """
+
+    max_duration: float | None
+    sample_interval: int
+
+    number_of_events: int
+    number_of_samples: int
+    number_of_legs: int
+    stop_scan_time: float
+    route_stop_indices_time: float
+
+    __start_time: float | None
+
+    def __init__(self, max_duration: float | None, sample_interval: int) -> None:
+        super().__init__()
+
+        self.max_duration = max_duration
+        self.sample_interval = sample_interval
+
+        self.number_of_events = 0
+        self.number_of_samples = 0
+        self.number_of_legs = 0
+        self.stop_scan_time = 0.0
+        self.route_stop_indices_time = 0.0
+
+        self.__start_time = None
+
+    def collect(
+        self,
+        env: Environment,
+        current_event: Optional[Event] = None,
+        event_index: Optional[int] = None,
+        event_priority: Optional[int] = None,
+    ) -> None:
+        if self.__start_time is None:
+            self.__start_time = env.current_time
+
+        if self.max_duration is not None:
+            env.simulation_config.max_time = self.__start_time + self.max_duration
+
+        if current_event is None:
+            return
+
+        self.number_of_events += 1
+
+        if self.number_of_events % self.sample_interval == 0:
+            self.measure(env)
+
+    def measure(self, environment: Environment) -> None:
+        legs = [
+            (leg, trip)
+            for trip in environment.trips
+            for leg in trip.previous_legs + ([trip.current_leg] if trip.current_leg else []) + trip.next_legs
+            if leg.assigned_vehicle is not None
+        ]
+
+        if len(legs) == 0:
+            return
+
+        start = time.perf_counter()
+        expected_stop_indices = [get_stop_indices_with_stop_scan(leg, environment, trip) for leg, trip in legs]
+        self.stop_scan_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        route_stop_indices = {}
+        stop_indices = [
+            get_stop_indices_with_route_stop_indices(leg, environment, trip, route_stop_indices) for leg, trip in legs
+        ]
+        self.route_stop_indices_time += time.perf_counter() - start
+
+        if stop_indices != expected_stop_indices:
+            raise ValueError(f"Stop indices differ at time {environment.current_time}")
+
+        self.number_of_samples += 1
+        self.number_of_legs += len(legs)
+
+    def clean_up(self, env: Environment) -> None:
+        pass
+
+
+def benchmark_data(data: str, max_duration: float | None, sample_interval: int) -> None:
+    data_collector = LegStopIndicesBenchmarkDataCollector(max_duration, sample_interval)
+    environment_observer = EnvironmentObserver([data_collector])
+
+    simulator = Simulator(
+        get_data_directory_path(data) + "/",
+        visualizers=environment_observer.visualizers,
+        data_collectors=environment_observer.data_collectors,
+    )
+    simulator.simulate()
+
+    print(
+        f"{data}: {data_collector.number_of_events} events, {data_collector.number_of_samples} samples, "
+        f"{data_collector.number_of_legs} legs"
+    )
+
+    if data_collector.number_of_legs == 0:
+        return
+
+    print(f"  {'lookup':<24} {'total (s)':>10} {'time/leg (us)':>14}")
+
+    results = [
+        ("stop scan", data_collector.stop_scan_time),
+        ("route stop indices", data_collector.route_stop_indices_time),
+    ]
+
+    for name, total_time in results:
+        print(f"  {name:<24} {total_time:>10.3f} {total_time / data_collector.number_of_legs * 1e6:>14.1f}")
+
+    if data_collector.route_stop_indices_time > 0:
+        print(f"  speedup: {data_collector.stop_scan_time / data_collector.route_stop_indices_time:.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the lookup of the boarding and alighting stops of the legs")
+    parser.add_argument(
+        "data",
+        type=str,
+        nargs="*",
+        default=["instance_medium_*"],
+        help="The data (or glob patterns of data) to simulate",
+    )
+    parser.add_argument(
+        "--max-duration", type=float, help="The maximum duration to simulate (the whole simulation by default)"
+    )
+    parser.add_argument(
+        "--sample-interval", type=int, default=50, help="The number of events between two measures of the legs"
+    )
+    args = parser.parse_args()
+
+    available_data = get_available_data()
+    all_data = sorted({data for pattern in args.data for data in fnmatch.filter(available_data, pattern)})
+
+    if len(all_data) == 0:
+        print(f"No data matches {args.data} in {os.getcwd()}/data")
+        return
+
+    for data in all_data:
+        benchmark_data(data, args.max_duration, max(1, args.sample_interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Compare the size on disk and the encode/decode time of the save formats.
+
+Each data folder (by default every data/instance_medium_* folder) is simulated once in offline mode,
+unless a completed simulation of the same data is already saved. The states and updates of the save are
+then encoded and decoded with every save codec. The size includes the stop table and the completed entities archive
+of the codecs that use them. The state files of the latest codec are then compressed and decompressed with every
+available state compression.
+
+Usage (from the directory that contains the data folder):
+
+    python <path to python>/benchmarks/save_format_benchmark.py [data ...]
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import tempfile
+import time
+
+from multimodalsim_viewer.common.utils import (
+    StateCompression,
+    build_simulation_id,
+    get_available_data,
+)
+from multimodalsim_viewer.server.simulation import run_simulation
+from multimodalsim_viewer.server.simulation_visualization_data_model import (
+    SimulationCompletedEntitiesArchive,
+    SimulationStopTable,
+    SimulationVisualizationDataManager,
+    Update,
+    VisualizedEnvironment,
+)
+from multimodalsim_viewer.server.simulation_visualization_save_codec import (
+    SAVE_CODECS,
+    SaveCodec,
+    compress_state_file_content,
+    decompress_state_file_content,
+    verify_state_compression_is_available,
+)
+
+
+def find_saved_simulation(data: str) -> str | None:
+    for simulation_id in sorted(SimulationVisualizationDataManager.get_all_saved_simulation_ids(), reverse=True):
+        try:
+            simulation_information = SimulationVisualizationDataManager.get_simulation_information(simulation_id)
+        except Exception:  # pylint: disable=broad-exception-caught
+            continue
+
+        if simulation_information.data == data and simulation_information.simulation_end_time is not None:
+            return simulation_id
+
+    return None
+
+
+def load_segments(simulation_id: str) -> list[tuple[VisualizedEnvironment, list[Update]]]:
+    codec = SimulationVisualizationDataManager.get_save_codec(simulation_id)
+
+    segments = []
+    for order, timestamp in SimulationVisualizationDataManager.get_sorted_states(simulation_id):
+        # The states are read like the client receives them, with their archived entities
+        records, _ = SimulationVisualizationDataManager.read_state_records(simulation_id, order, timestamp, codec)
+        records = [json.loads(record) for record in records]
+
+        environment = VisualizedEnvironment.deserialize(records[0])
+        updates = [Update.deserialize(record) for record in records[1:]]
+        segments.append((environment, updates))
+
+    return segments
+
+
+def encode_segments(
+    codec: SaveCodec,
+    segments: list[tuple[VisualizedEnvironment, list[Update]]],
+    stop_table: SimulationStopTable,
+    completed_entities_archive: SimulationCompletedEntitiesArchive,
+) -> list[bytes]:
+    """
+    Encode the segments like the state writer, archiving the complete entities with the codecs that support it.
+    """
+    encoded_segments = []
+
+    for environment, updates in segments:
+        active_environment = environment
+        if codec.version >= SimulationVisualizationDataManager.COMPLETED_ENTITIES_ARCHIVE_MINIMUM_VERSION:
+            active_environment = completed_entities_archive.archive_completed_entities(
+                environment, codec, stop_table, False
+            )
+
+        content = codec.encode_environment(active_environment, stop_table)
+
+        for update in updates:
+            completed_entities_archive.restore_updated_entity(update)
+            content += codec.encode_update(update, stop_table)
+
+        encoded_segments.append(content)
+
+    return encoded_segments
+
+
+def benchmark_state_compressions(encoded_segments: list[bytes]) -> None:
+    print(f"  {'compression':>11} {'size (bytes)':>14} {'compress (s)':>13} {'decompress (s)':>15}")
+
+    for compression in StateCompression:
+        try:
+            verify_state_compression_is_available(compression)
+        except ValueError as error:
+            print(f"  {compression.value:>11} {error}")
+            continue
+
+        start = time.perf_counter()
+        compressed_segments = [compress_state_file_content(content, compression) for content in encoded_segments]
+        compress_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for content in compressed_segments:
+            decompress_state_file_content(content, compression)
+        decompress_time = time.perf_counter() - start
+
+        size = sum(len(content) for content in compressed_segments)
+
+        print(f"  {compression.value:>11} {size:>14} {compress_time:>13.3f} {decompress_time:>15.3f}")
+
+
+def benchmark_simulation(simulation_id: str) -> None:
+    segments = load_segments(simulation_id)
+    number_of_records = sum(len(updates) + 1 for _, updates in segments)
+
+    print(f"{simulation_id}: {len(segments)} states, {number_of_records} records")
+    print(f"  {'version':>7} {'size (bytes)':>14} {'encode (s)':>11} {'decode (s)':>11} {'encode/record (us)':>19}")
+
+    for version, codec in sorted(SAVE_CODECS.items()):
+        with tempfile.TemporaryDirectory() as directory_path:
+            stop_table = SimulationStopTable(os.path.join(directory_path, "stops"))
+            completed_entities_archive = SimulationCompletedEntitiesArchive(
+                os.path.join(directory_path, "completed_entities")
+            )
+
+            start = time.perf_counter()
+            encoded_segments = encode_segments(codec, segments, stop_table, completed_entities_archive)
+            encode_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for content in encoded_segments:
+                codec.read_json_records(content, stop_table)
+            decode_time = time.perf_counter() - start
+
+            size = sum(len(content) for content in encoded_segments)
+            for file_path in [stop_table.file_path, completed_entities_archive.file_path]:
+                if os.path.exists(file_path):
+                    size += os.path.getsize(file_path)
+
+        print(
+            f"  {version:>7} {size:>14} {encode_time:>11.3f} {decode_time:>11.3f} "
+            f"{encode_time / number_of_records * 1e6:>19.1f}"
+        )
+
+    # The state files are compressed with the latest codec only
+    benchmark_state_compressions(encoded_segments)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the save formats of simulations")
+    parser.add_argument(
+        "data",
+        type=str,
+        nargs="*",
+        default=["instance_medium_*"],
+        help="The data (or glob patterns of data) to benchmark",
+    )
+    parser.add_argument("--max-duration", type=float, help="The maximum duration of new simulations")
+    args = parser.parse_args()
+
+    available_data = get_available_data()
+    all_data = sorted({data for pattern in args.data for data in fnmatch.filter(available_data, pattern)})
+
+    if len(all_data) == 0:
+        print(f"No data matches {args.data} in {os.getcwd()}/data")
+        return
+
+    for data in all_data:
+        simulation_id = find_saved_simulation(data)
+
+        if simulation_id is None:
+            simulation_id, _ = build_simulation_id(f"benchmark_{data}")
+            print(f"Running simulation {simulation_id}")
+            run_simulation(simulation_id, data, args.max_duration, is_offline=True)
+
+        benchmark_simulation(simulation_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import argparse
 import datetime
 import logging
 import os
@@ -82,16 +83,71 @@ CLIENT_ROOM = "client"
 SIMULATION_ROOM = "simulation"
 SCRIPT_ROOM = "script"
 
-# Save the state of the simulation every STATE_SAVE_STEP events
+# A new state of the simulation is saved when the current one has STATE_SAVE_STEP updates, when its updates take
+# STATE_SAVE_MAX_BYTES bytes or when they span STATE_SAVE_MAX_TIME_SPAN seconds of simulated time
 STATE_SAVE_STEP = 1000
+STATE_SAVE_MAX_BYTES = 512 * 1024
+STATE_SAVE_MAX_TIME_SPAN = 1800
+
+# Updates are written to the save file in batches of at most UPDATE_WRITE_BATCH_SIZE updates
+UPDATE_WRITE_BATCH_SIZE = 100
+
+# Buffered updates are written to the save file at least every UPDATE_WRITE_FLUSH_INTERVAL seconds (real time)
+UPDATE_WRITE_FLUSH_INTERVAL = 1.0
+
+# The server runs at most MAX_CONCURRENT_SIMULATIONS simulations at once, the other ones are queued
+MAX_CONCURRENT_SIMULATIONS = os.cpu_count() or 1
+
+# The server sends the progress of a simulation to the clients at most every SIMULATION_PROGRESS_EMIT_INTERVAL seconds
+SIMULATION_PROGRESS_EMIT_INTERVAL = 0.5
+
+# The server keeps at most STATE_CACHE_MAX_SIZE bytes (approximately) of state records in memory
+STATE_CACHE_MAX_SIZE = 256 * 1024 * 1024
+
+# One event out of SIMULATION_LOG_SAMPLING_RATE is written to the log of a simulation with the sampled log level
+SIMULATION_LOG_SAMPLING_RATE = 100
+
+# The log of a simulation is rotated when it exceeds SIMULATION_LOG_MAX_FILE_SIZE bytes,
+# keeping at most SIMULATION_LOG_BACKUP_COUNT previous files
+SIMULATION_LOG_MAX_FILE_SIZE = 10 * 1024 * 1024
+SIMULATION_LOG_BACKUP_COUNT = 2
+
+# Log records of a simulation are written to the file in batches of at most SIMULATION_LOG_BUFFER_SIZE records,
+# and at least every SIMULATION_LOG_FLUSH_INTERVAL seconds (real time)
+SIMULATION_LOG_BUFFER_SIZE = 1000
+SIMULATION_LOG_FLUSH_INTERVAL = 1.0
+
+# The server keeps the last SIMULATION_LOG_HISTORY_SIZE log lines of each simulation in memory,
+# clients fetch them by pages of at most SIMULATION_LOG_PAGE_SIZE lines
+SIMULATION_LOG_HISTORY_SIZE = 10000
+SIMULATION_LOG_PAGE_SIZE = 500
+
+# New log lines of a simulation are sent to the subscribed clients in one message every
+# SIMULATION_LOG_EMIT_INTERVAL seconds
+SIMULATION_LOG_EMIT_INTERVAL = 0.5
+
+# A simulation sends its messages to the server every OUTBOUND_EMIT_INTERVAL seconds, at most
+# OUTBOUND_MAX_MESSAGES_PER_EMIT log messages at a time. At most OUTBOUND_QUEUE_MAX_SIZE log messages are kept
+# while the server is slow or disconnected, the oldest ones are dropped
+OUTBOUND_EMIT_INTERVAL = 0.1
+OUTBOUND_MAX_MESSAGES_PER_EMIT = 1000
+OUTBOUND_QUEUE_MAX_SIZE = 10000
+
+# Tolerance (in degrees) of the simplified polylines of each level of detail, starting at level 1.
+# Level 0 is the polylines as provided by the simulator
+POLYLINES_LEVELS_OF_DETAIL_TOLERANCES = [0.00005, 0.0002, 0.001]
 
 # If the version is identical, the save file can be loaded
-SAVE_VERSION = 9
+SAVE_VERSION = 13
+
+# Older versions of save files that can still be loaded
+COMPATIBLE_SAVE_VERSIONS = [9, 10, 11, 12]
 
 SIMULATION_SAVE_FILE_SEPARATOR = "---"
 
 
 class SimulationStatus(Enum):
+    QUEUED = "queued"
     STARTING = "starting"
     PAUSED = "paused"
     RUNNING = "running"
@@ -103,7 +159,54 @@ class SimulationStatus(Enum):
     FUTURE = "future"
 
 
+class SaveDurability(Enum):
+    """
+    Policy used to write the updates of a simulation to its save file.
+    """
+
+    # Write every update to the save file as soon as it is received
+    FLUSH_PER_UPDATE = "flush-per-update"
+    # Write the updates by batches of UPDATE_WRITE_BATCH_SIZE or every UPDATE_WRITE_FLUSH_INTERVAL seconds
+    FLUSH_PER_BATCH = "flush-per-batch"
+    # Same as FLUSH_PER_BATCH, but also force the save file to disk when a state is completed
+    FSYNC_PER_CHECKPOINT = "fsync-per-checkpoint"
+
+
+class SimulationLogLevel(Enum):
+    """
+    Events written to the log of a simulation. The lifecycle messages of the simulation are always written.
+    """
+
+    # Do not log the events
+    OFF = "off"
+    # Log one event out of SIMULATION_LOG_SAMPLING_RATE
+    SAMPLED = "sampled"
+    # Log every event
+    FULL = "full"
+
+
+# Default log level of the simulations, can be changed with the SIMULATION_LOG_LEVEL environment variable
+SIMULATION_LOG_LEVEL = SimulationLogLevel(environment.get("SIMULATION_LOG_LEVEL", SimulationLogLevel.FULL.value))
+
+
+class StateCompression(Enum):
+    """
+    Compression of the state files of a simulation, applied to each state file once its state is complete.
+    """
+
+    NONE = "none"
+    ZLIB = "zlib"
+    LZMA = "lzma"
+    # Only available if the zstandard package is installed
+    ZSTD = "zstd"
+
+
+# Default compression of the state files, can be changed with the STATE_COMPRESSION environment variable
+STATE_COMPRESSION = StateCompression(environment.get("STATE_COMPRESSION", StateCompression.NONE.value))
+
+
 RUNNING_SIMULATION_STATUSES = [
+    SimulationStatus.QUEUED,
     SimulationStatus.STARTING,
     SimulationStatus.RUNNING,
     SimulationStatus.PAUSED,
@@ -188,3 +291,58 @@ def set_event_on_input(action: str, key: str, event: threading.Event) -> None:
 
     print(f"Received {key}: {action}")
     event.set()
+
+
+def add_save_arguments(parser: argparse.ArgumentParser, include_simulation_arguments: bool = True) -> None:
+    """
+    Add the arguments of how simulations are saved to a command line parser. The save durability and log arguments
+    are only added for commands that run simulations.
+    """
+    if include_simulation_arguments:
+        parser.add_argument(
+            "--save-durability",
+            type=str,
+            choices=[durability.value for durability in SaveDurability],
+            default=SaveDurability.FLUSH_PER_BATCH.value,
+            help="When the updates are written to the save files",
+        )
+        parser.add_argument(
+            "--log-level",
+            type=str,
+            choices=[level.value for level in SimulationLogLevel],
+            default=SIMULATION_LOG_LEVEL.value,
+            help="Which events are written to the logs of the simulations (lifecycle messages are always written)",
+        )
+        parser.add_argument(
+            "--log-sampling-rate",
+            type=int,
+            default=SIMULATION_LOG_SAMPLING_RATE,
+            help="Log one event out of this number with the sampled log level",
+        )
+
+    parser.add_argument(
+        "--state-save-step",
+        type=int,
+        default=STATE_SAVE_STEP,
+        help="Save a new state after this number of updates",
+    )
+    parser.add_argument(
+        "--state-save-max-bytes",
+        type=int,
+        default=STATE_SAVE_MAX_BYTES,
+        help="Save a new state when the updates of the current one take this number of bytes (0 for no limit)",
+    )
+    parser.add_argument(
+        "--state-save-max-time-span",
+        type=float,
+        default=STATE_SAVE_MAX_TIME_SPAN,
+        help="Save a new state when the updates of the current one span this simulated time in seconds "
+        "(0 for no limit)",
+    )
+    parser.add_argument(
+        "--state-compression",
+        type=str,
+        choices=[compression.value for compression in StateCompression],
+        default=STATE_COMPRESSION.value,
+        help="The compression of the state files, applied to each state file once its state is complete",
+    )
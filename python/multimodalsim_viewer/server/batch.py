@@ -0,0 +1,283 @@
+import argparse
+import csv
+import fnmatch
+import math
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from multimodalsim_viewer.common.utils import (
+    add_save_arguments,
+    build_simulation_id,
+    get_available_data,
+    verify_simulation_name,
+)
+from multimodalsim_viewer.server.simulation import (
+    SaveArguments,
+    parse_save_arguments,
+    run_simulation,
+)
+from multimodalsim_viewer.server.simulation_visualization_data_model import (
+    SimulationVisualizationDataManager,
+)
+
+SUMMARY_COLUMNS = [
+    "simulation_id",
+    "data",
+    "max_duration",
+    "status",
+    "wall_time",
+    "events",
+    "events_per_second",
+    "save_size",
+]
+
+# The progress of the running simulations is printed every BATCH_PROGRESS_PRINT_INTERVAL seconds (real time)
+BATCH_PROGRESS_PRINT_INTERVAL = 5.0
+
+
+def run_batch_simulation(
+    simulation_id: str,
+    data: str,
+    max_duration: float | None,
+    save_arguments: SaveArguments,
+    progress_queue: "queue.Queue[tuple[str, float]] | None" = None,
+) -> dict:
+    """
+    Run a simulation of the batch in offline mode and return its row of the summary.
+
+    The progress of the simulation is put in progress_queue at most every BATCH_PROGRESS_PRINT_INTERVAL seconds.
+    """
+    result = {
+        "simulation_id": simulation_id,
+        "data": data,
+        "max_duration": max_duration,
+        "status": "failed",
+        "wall_time": 0.0,
+        "events": 0,
+        "events_per_second": 0.0,
+        "save_size": 0,
+    }
+
+    start_time = time.perf_counter()
+    last_progress_time = -math.inf
+
+    def put_progress(progress: float) -> None:
+        nonlocal last_progress_time
+
+        current_time = time.perf_counter()
+        if progress_queue is None or current_time - last_progress_time < BATCH_PROGRESS_PRINT_INTERVAL:
+            return
+
+        last_progress_time = current_time
+        progress_queue.put((simulation_id, progress))
+
+    try:
+        number_of_events = run_simulation(
+            simulation_id,
+            data,
+            max_duration,
+            is_offline=True,
+            save_durability=save_arguments.save_durability,
+            log_level=save_arguments.log_level,
+            log_sampling_rate=save_arguments.log_sampling_rate,
+            state_save_policy=save_arguments.state_save_policy,
+            state_compression=save_arguments.state_compression,
+            progress_callback=put_progress,
+        )
+    except Exception:  # pylint: disable=broad-exception-caught
+        traceback.print_exc()
+        number_of_events = None
+
+    wall_time = time.perf_counter() - start_time
+
+    result["wall_time"] = wall_time
+
+    if number_of_events is None:
+        return result
+
+    result["events"] = number_of_events
+    result["events_per_second"] = number_of_events / wall_time if wall_time > 0 else 0.0
+    result["save_size"] = SimulationVisualizationDataManager.get_saved_simulation_size(simulation_id)
+
+    # The end time is only saved if the simulation has not crashed
+    simulation_information = SimulationVisualizationDataManager.get_simulation_information(simulation_id)
+    if simulation_information.simulation_end_time is not None:
+        result["status"] = "completed"
+
+    return result
+
+
+def format_summary_row(row: dict) -> list[str]:
+    return [
+        row["simulation_id"],
+        row["data"],
+        "-" if row["max_duration"] is None else f"{row['max_duration']:g}",
+        row["status"],
+        f"{row['wall_time']:.1f}",
+        str(row["events"]),
+        f"{row['events_per_second']:.1f}",
+        str(row["save_size"]),
+    ]
+
+
+def print_summary(rows: list[dict]) -> None:
+    table = [SUMMARY_COLUMNS] + [format_summary_row(row) for row in rows]
+    widths = [max(len(line[index]) for line in table) for index in range(len(SUMMARY_COLUMNS))]
+
+    for line in table:
+        print("  ".join(value.ljust(width) for value, width in zip(line, widths)))
+
+
+def write_summary(rows: list[dict], file_path: str) -> None:
+    with open(file_path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def get_queued_progress(progress_queue: "queue.Queue[tuple[str, float]]") -> dict[str, float]:
+    """
+    Get the last progress put in the queue by each simulation since the previous call.
+    """
+    progress_by_simulation_id = {}
+
+    try:
+        while True:
+            simulation_id, progress = progress_queue.get_nowait()
+            progress_by_simulation_id[simulation_id] = progress
+    except queue.Empty:
+        pass
+
+    return progress_by_simulation_id
+
+
+def run_batch(
+    simulation_ids: list[str], runs: list[tuple[str, float | None]], jobs: int, save_arguments: SaveArguments
+) -> list[dict]:
+    """
+    Run the simulations of the batch on a pool of jobs processes and return their rows of the summary, in the order
+    they finish. The progress of the running simulations is printed every BATCH_PROGRESS_PRINT_INTERVAL seconds.
+    """
+    rows = []
+    progress_by_simulation_id = {}
+    last_progress_print_time = time.perf_counter()
+
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=max(1, jobs)) as executor:
+        progress_queue = manager.Queue()
+
+        pending_futures = {
+            executor.submit(
+                run_batch_simulation,
+                simulation_id,
+                data,
+                max_duration,
+                save_arguments,
+                progress_queue,
+            )
+            for simulation_id, (data, max_duration) in zip(simulation_ids, runs)
+        }
+
+        while len(pending_futures) > 0:
+            done_futures, pending_futures = wait(
+                pending_futures, timeout=BATCH_PROGRESS_PRINT_INTERVAL, return_when=FIRST_COMPLETED
+            )
+
+            progress_by_simulation_id.update(get_queued_progress(progress_queue))
+
+            for future in done_futures:
+                row = future.result()
+                rows.append(row)
+                progress_by_simulation_id.pop(row["simulation_id"], None)
+
+                print(
+                    f"[{len(rows)}/{len(simulation_ids)}] {row['simulation_id']} ({row['data']}) {row['status']} "
+                    f"in {row['wall_time']:.1f} s"
+                )
+
+            current_time = time.perf_counter()
+            if (
+                len(progress_by_simulation_id) > 0
+                and current_time - last_progress_print_time >= BATCH_PROGRESS_PRINT_INTERVAL
+            ):
+                last_progress_print_time = current_time
+                print(
+                    f"[{len(rows)}/{len(simulation_ids)}] running "
+                    + ", ".join(
+                        f"{simulation_id} {progress:.0%}"
+                        for simulation_id, progress in progress_by_simulation_id.items()
+                    )
+                )
+
+    return rows
+
+
+def run_batch_cli():
+    parser = argparse.ArgumentParser(description="Run a batch of simulations in offline mode")
+    parser.add_argument(
+        "data",
+        type=str,
+        nargs="+",
+        help="The data (or glob patterns of data, for example 'instance_*') to simulate",
+    )
+    parser.add_argument(
+        "--max-duration",
+        type=float,
+        nargs="+",
+        default=[None],
+        help="The maximum durations to run each data with (one simulation per data and maximum duration)",
+    )
+    parser.add_argument("--name", type=str, default="batch", help="The prefix of the names of the simulations")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="The number of simulations to run at once (the number of cores by default)",
+    )
+    add_save_arguments(parser)
+    parser.add_argument("--summary", type=str, help="Write the summary to this CSV file")
+
+    args = parser.parse_args()
+
+    save_arguments = parse_save_arguments(args)
+
+    available_data = get_available_data()
+    all_data = sorted({data for pattern in args.data for data in fnmatch.filter(available_data, pattern)})
+
+    if len(all_data) == 0:
+        print(f"No data matches {args.data} in {os.getcwd()}/data")
+        sys.exit(1)
+
+    runs = [(data, max_duration) for data in all_data for max_duration in args.max_duration]
+
+    # Simulation names are limited in length, the data is saved in the simulation information
+    name_error = verify_simulation_name(f"{args.name}_{len(runs)}")
+    if name_error is not None:
+        print(f"Error: {name_error}")
+        sys.exit(1)
+
+    simulation_ids = [build_simulation_id(f"{args.name}_{index}")[0] for index in range(len(runs))]
+
+    print(f"Running {len(runs)} simulations with {args.jobs} jobs")
+
+    rows = run_batch(simulation_ids, runs, args.jobs, save_arguments)
+
+    rows.sort(key=lambda row: simulation_ids.index(row["simulation_id"]))
+
+    print()
+    print_summary(rows)
+
+    if args.summary is not None:
+        write_summary(rows, args.summary)
+        print(f"Summary written to {args.summary}")
+
+    if any(row["status"] != "completed" for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run_batch_cli()
@@ -0,0 +1,41 @@
+import argparse
+import sys
+
+from multimodalsim_viewer.common.utils import add_save_arguments
+from multimodalsim_viewer.server.simulation import parse_save_arguments
+from multimodalsim_viewer.server.simulation_visualization_data_model import (
+    SimulationVisualizationDataManager,
+)
+
+
+def run_compact_cli():
+    parser = argparse.ArgumentParser(
+        description="Save the states of completed simulations again with a new state save policy"
+    )
+    parser.add_argument("simulation_ids", type=str, nargs="+", help="The ids of the simulations to compact")
+    add_save_arguments(parser, include_simulation_arguments=False)
+
+    args = parser.parse_args()
+
+    save_arguments = parse_save_arguments(args)
+
+    has_failed = False
+
+    for simulation_id in args.simulation_ids:
+        try:
+            result = SimulationVisualizationDataManager.compact_simulation(
+                simulation_id, save_arguments.state_save_policy, save_arguments.state_compression
+            )
+        except ValueError as error:
+            print(f"Error: {error}")
+            has_failed = True
+            continue
+
+        print(f"Compacted {result}")
+
+    if has_failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run_compact_cli()
@@ -4,11 +4,19 @@ import shutil
 import tempfile
 import zipfile
 
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, current_app, jsonify, request, send_file
 
-from multimodalsim_viewer.common.utils import get_data_directory_path
+from multimodalsim_viewer.common.utils import (
+    STATE_COMPRESSION,
+    StateCompression,
+    get_data_directory_path,
+)
 from multimodalsim_viewer.server.simulation_visualization_data_model import (
     SimulationVisualizationDataManager,
+    StateSavePolicy,
+)
+from multimodalsim_viewer.server.simulation_visualization_save_codec import (
+    COMPRESSED_STATE_FILE_EXTENSIONS,
 )
 
 http_routes = Blueprint("http_routes", __name__)
@@ -34,7 +42,9 @@ def zip_folder(folder_path, zip_name):
         for root, _, files in os.walk(folder_path):
             for file in files:
                 file_path = os.path.join(root, file)
-                zip_file.write(file_path, os.path.relpath(file_path, folder_path))
+                # Compressed state files would not get smaller, they are stored as is
+                compress_type = zipfile.ZIP_STORED if file.endswith(COMPRESSED_STATE_FILE_EXTENSIONS) else None
+                zip_file.write(file_path, os.path.relpath(file_path, folder_path), compress_type)
 
     return zip_path
 
@@ -122,6 +132,7 @@ def export_saved_simulation(folder_name):
 @http_routes.route("/api/simulation/<folder_name>", methods=["POST"])
 def import_saved_simulation(folder_name):
     folder_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(folder_name)
+    SimulationVisualizationDataManager.clear_cached_simulation(folder_name)
     return handle_zip_upload(folder_path)
 
 
@@ -131,5 +142,34 @@ def delete_saved_simulation(folder_name):
     if not os.path.isdir(folder_path):
         return jsonify({"error": "Folder not found"}), 404
 
+    if folder_name in current_app.extensions["simulation_manager"].compacting_simulation_ids:
+        return jsonify({"error": "The simulation is being compacted"}), 409
+
     shutil.rmtree(folder_path)
+    SimulationVisualizationDataManager.clear_cached_simulation(folder_name)
     return jsonify({"message": f"Folder '{folder_name}' deleted successfully"})
+
+
+@http_routes.route("/api/simulation/<folder_name>/compact", methods=["POST"])
+def compact_saved_simulation(folder_name):
+    if folder_name not in SimulationVisualizationDataManager.get_all_saved_simulation_ids():
+        return jsonify({"error": "Folder not found"}), 404
+
+    # The body is an optional state save policy and state compression, the default ones are used otherwise
+    data = request.get_json(silent=True) or {}
+
+    if not isinstance(data, dict):
+        return jsonify({"error": "The body must be a JSON object"}), 400
+
+    try:
+        state_compression = StateCompression(data.pop("stateCompression", STATE_COMPRESSION.value))
+        state_save_policy = StateSavePolicy.deserialize(data) if data else None
+
+        # Re-encoding every state takes a while, the progress is sent with the changes of the simulation
+        current_app.extensions["simulation_manager"].start_simulation_compaction(
+            folder_name, state_save_policy, state_compression, current_app.extensions["socketio"]
+        )
+    except (ValueError, TypeError) as error:
+        return jsonify({"error": str(error)}), 400
+
+    return jsonify({"message": f"Compaction of '{folder_name}' started"}), 202
@@ -1,15 +1,216 @@
+import logging
 import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+from logging.handlers import MemoryHandler, RotatingFileHandler
 
+from multimodalsim_viewer.common.utils import (
+    SIMULATION_LOG_BACKUP_COUNT,
+    SIMULATION_LOG_BUFFER_SIZE,
+    SIMULATION_LOG_FLUSH_INTERVAL,
+    SIMULATION_LOG_HISTORY_SIZE,
+    SIMULATION_LOG_LEVEL,
+    SIMULATION_LOG_MAX_FILE_SIZE,
+    SIMULATION_LOG_SAMPLING_RATE,
+    SimulationLogLevel,
+)
 
-def register_log(simulation_id, message):
+
+def get_log_directory_path() -> str:
     current_directory = os.path.dirname(os.path.abspath(__file__))
     log_directory_name = "saved_logs"
-    log_directory_path = f"{current_directory}/{log_directory_name}"
-    file_name = f"{simulation_id}.txt"
-    file_path = f"{log_directory_path}/{file_name}"
+    return f"{current_directory}/{log_directory_name}"
+
+
+def get_log_file_path(simulation_id: str) -> str:
+    return f"{get_log_directory_path()}/{simulation_id}.txt"
+
+
+class _BufferedLogHandler(MemoryHandler):
+    """
+    Keep the records in memory until the buffer is full, a record of flush level or higher is logged,
+    or the records have been kept for more than flush_interval seconds.
+
+    A background thread flushes the buffer every flush_interval seconds, so the last records before a quiet period
+    are written without waiting for the next record.
+    """
+
+    flush_interval: float
+    last_flush_time: float
+
+    __stop_event: threading.Event
+    __flush_thread: threading.Thread
+
+    def __init__(self, capacity: int, flush_interval: float, target: logging.Handler) -> None:
+        super().__init__(capacity, flushLevel=logging.INFO, target=target, flushOnClose=True)
+        self.flush_interval = flush_interval
+        self.last_flush_time = time.monotonic()
+
+        self.__stop_event = threading.Event()
+        self.__flush_thread = threading.Thread(target=self.__flush_periodically, name="LogFlush", daemon=True)
+        self.__flush_thread.start()
+
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        return super().shouldFlush(record) or time.monotonic() - self.last_flush_time >= self.flush_interval
+
+    def flush(self) -> None:
+        super().flush()
+        self.last_flush_time = time.monotonic()
+
+    def close(self) -> None:
+        self.__stop_event.set()
+        self.__flush_thread.join()
+        super().close()
+
+    def __flush_periodically(self) -> None:
+        while not self.__stop_event.wait(self.flush_interval):
+            if len(self.buffer) > 0:
+                self.flush()
+
+
+class SimulationLogger:
+    """
+    Log of a simulation, written to saved_logs/<simulation id>.txt.
+
+    The file is kept open, records are written by batches and the file is rotated when it becomes too large.
+    Events are filtered according to the log level, while lifecycle messages are always written immediately.
+    """
+
+    simulation_id: str
+    level: SimulationLogLevel
+    sampling_rate: int
+    number_of_events: int
+
+    __logger: logging.Logger
+    __handler: _BufferedLogHandler
+    __file_handler: RotatingFileHandler
+
+    def __init__(
+        self,
+        simulation_id: str,
+        level: SimulationLogLevel = SIMULATION_LOG_LEVEL,
+        sampling_rate: int = SIMULATION_LOG_SAMPLING_RATE,
+        max_file_size: int = SIMULATION_LOG_MAX_FILE_SIZE,
+        backup_count: int = SIMULATION_LOG_BACKUP_COUNT,
+        buffer_size: int = SIMULATION_LOG_BUFFER_SIZE,
+        flush_interval: float = SIMULATION_LOG_FLUSH_INTERVAL,
+    ) -> None:
+        if sampling_rate < 1:
+            raise ValueError(f"Log sampling rate must be at least 1, got {sampling_rate}")
+
+        self.simulation_id = simulation_id
+        self.level = level
+        self.sampling_rate = sampling_rate
+        self.number_of_events = 0
+
+        os.makedirs(get_log_directory_path(), exist_ok=True)
+
+        # The file is only created when the first record is written
+        self.__file_handler = RotatingFileHandler(
+            get_log_file_path(simulation_id),
+            maxBytes=max_file_size,
+            backupCount=backup_count,
+            encoding="utf-8",
+            delay=True,
+        )
+        self.__file_handler.setFormatter(logging.Formatter("%(message)s"))
+
+        self.__handler = _BufferedLogHandler(buffer_size, flush_interval, self.__file_handler)
+
+        self.__logger = logging.getLogger(f"{__name__}.{simulation_id}")
+        self.__logger.setLevel(logging.DEBUG)
+        # Records of the simulation must not reach the handlers of the root logger
+        self.__logger.propagate = False
+        self.__logger.addHandler(self.__handler)
+
+    def should_log_event(self) -> bool:
+        """
+        Count an event and return whether it should be logged.
+
+        The message of the event should only be built if this returns True.
+        """
+        self.number_of_events += 1
+
+        if self.level == SimulationLogLevel.FULL:
+            return True
+
+        if self.level == SimulationLogLevel.SAMPLED:
+            return (self.number_of_events - 1) % self.sampling_rate == 0
+
+        return False
+
+    def log_event(self, message: str) -> None:
+        self.__logger.debug(message)
+
+    def log_lifecycle(self, message: str) -> None:
+        # Lifecycle messages are at the flush level of the buffer, so they are written right away
+        self.__logger.info(message)
+
+    def close(self) -> None:
+        self.__logger.removeHandler(self.__handler)
+        # Writes the remaining records
+        self.__handler.close()
+        self.__file_handler.close()
+
+
+class SimulationLogBuffer:
+    """
+    Most recent log lines of a simulation, kept in memory by the server.
+
+    Lines are numbered from 0 in the order they are received. The lines received since the last call to
+    pop_pending_lines are also kept apart to be sent to the subscribed clients in a single message.
+    """
+
+    number_of_lines: int
+
+    __lines: deque[str]
+    __pending_lines: deque[str]
+    __lock: threading.Lock
+
+    def __init__(self, max_size: int = SIMULATION_LOG_HISTORY_SIZE) -> None:
+        self.number_of_lines = 0
+
+        self.__lines = deque(maxlen=max_size)
+        self.__pending_lines = deque(maxlen=max_size)
+        self.__lock = threading.Lock()
+
+    def append(self, line: str) -> None:
+        with self.__lock:
+            self.__lines.append(line)
+            self.__pending_lines.append(line)
+            self.number_of_lines += 1
+
+    def pop_pending_lines(self) -> tuple[int, list[str]]:
+        """
+        Get the number of the first line received since the last call and the lines themselves.
+        """
+        with self.__lock:
+            pending_lines = list(self.__pending_lines)
+            self.__pending_lines.clear()
+            return self.number_of_lines - len(pending_lines), pending_lines
+
+    def get_lines(self, before_line_number: int | None, limit: int) -> tuple[int, list[str]]:
+        """
+        Get the number of the first line and at most limit lines that come right before before_line_number
+        (or the last lines if before_line_number is None).
+        """
+        with self.__lock:
+            first_kept_line_number = self.number_of_lines - len(self.__lines)
+
+            end_line_number = self.number_of_lines
+            if before_line_number is not None:
+                end_line_number = max(first_kept_line_number, min(before_line_number, self.number_of_lines))
+
+            start_line_number = max(first_kept_line_number, end_line_number - max(0, limit))
 
-    if not os.path.exists(log_directory_path):
-        os.makedirs(log_directory_path)
+            lines = list(
+                islice(
+                    self.__lines,
+                    start_line_number - first_kept_line_number,
+                    end_line_number - first_kept_line_number,
+                )
+            )
 
-    with open(file_path, "a", encoding="utf-8") as file:
-        file.write(message + "\n")
+            return start_line_number, lines
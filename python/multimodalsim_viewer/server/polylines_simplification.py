@@ -0,0 +1,91 @@
+import math
+
+import polyline
+
+
+def get_simplified_polyline_indices(points: list[tuple[float, float]], tolerance: float) -> list[int]:
+    """
+    Get the indices of the points kept by the Douglas-Peucker algorithm, in order.
+
+    The tolerance is the maximum distance (in degrees of latitude) between a removed point and the simplified
+    polyline. Longitudes are scaled by the cosine of the latitude so that distances are the same in both directions.
+    """
+    if len(points) < 3:
+        return list(range(len(points)))
+
+    longitude_scale = math.cos(math.radians(sum(latitude for latitude, _ in points) / len(points)))
+    scaled_points = [(latitude, longitude * longitude_scale) for latitude, longitude in points]
+
+    is_kept = [False] * len(points)
+    is_kept[0] = True
+    is_kept[-1] = True
+
+    squared_tolerance = tolerance * tolerance
+
+    # Segments are processed with a stack instead of recursion to support long polylines
+    segments = [(0, len(points) - 1)]
+    while len(segments) > 0:
+        start_index, end_index = segments.pop()
+
+        start_y, start_x = scaled_points[start_index]
+        end_y, end_x = scaled_points[end_index]
+        delta_x = end_x - start_x
+        delta_y = end_y - start_y
+        squared_length = delta_x * delta_x + delta_y * delta_y
+
+        farthest_index = None
+        farthest_squared_distance = squared_tolerance
+
+        for index in range(start_index + 1, end_index):
+            point_y, point_x = scaled_points[index]
+
+            # Squared distance between the point and the segment
+            if squared_length == 0:
+                projection = 0
+            else:
+                projection = ((point_x - start_x) * delta_x + (point_y - start_y) * delta_y) / squared_length
+                projection = max(0, min(1, projection))
+
+            distance_x = start_x + projection * delta_x - point_x
+            distance_y = start_y + projection * delta_y - point_y
+            squared_distance = distance_x * distance_x + distance_y * distance_y
+
+            if squared_distance > farthest_squared_distance:
+                farthest_index = index
+                farthest_squared_distance = squared_distance
+
+        if farthest_index is not None:
+            is_kept[farthest_index] = True
+            segments.append((start_index, farthest_index))
+            segments.append((farthest_index, end_index))
+
+    return [index for index, is_point_kept in enumerate(is_kept) if is_point_kept]
+
+
+def simplify_encoded_polyline(
+    encoded_polyline: str, coefficients: list[float], tolerance: float
+) -> tuple[str, list[float]]:
+    """
+    Simplify an encoded polyline and merge the coefficients of its segments accordingly.
+
+    The coefficient of a simplified segment is the sum of the coefficients of the segments it replaces, so vehicles
+    still reach every kept point at the same time.
+    """
+    points = polyline.decode(encoded_polyline)
+
+    indices = get_simplified_polyline_indices(points, tolerance)
+
+    if len(indices) == len(points):
+        return encoded_polyline, coefficients
+
+    simplified_encoded_polyline = polyline.encode([points[index] for index in indices])
+
+    # Coefficients that do not match the segments (for example [1] when they could not be computed) are kept as is
+    if len(coefficients) != len(points) - 1:
+        return simplified_encoded_polyline, coefficients
+
+    simplified_coefficients = [
+        sum(coefficients[start_index:end_index]) for start_index, end_index in zip(indices, indices[1:])
+    ]
+
+    return simplified_encoded_polyline, simplified_coefficients
@@ -9,6 +9,8 @@ from multimodalsim_viewer.common.utils import (
     CLIENT_ROOM,
     HOST,
     SERVER_PORT,
+    SIMULATION_LOG_EMIT_INTERVAL,
+    SIMULATION_LOG_PAGE_SIZE,
     get_available_data,
     get_session_id,
     log,
@@ -31,6 +33,9 @@ def run_server():
 
     simulation_manager = SimulationManager()
 
+    # Used by the HTTP routes
+    app.extensions["simulation_manager"] = simulation_manager
+
     # MARK: Main events
     @socketio.on("connect")
     def on_connect(auth):
@@ -85,19 +90,27 @@ def run_server():
         emit("available-data", get_available_data(), to=CLIENT_ROOM)
 
     @socketio.on("get-missing-simulation-states")
-    def on_client_get_missing_simulation_states(simulation_id, visualization_time, loaded_state_orders):
+    def on_client_get_missing_simulation_states(
+        simulation_id, visualization_time, loaded_state_orders, loaded_state_tail=None, accepted_compressions=None
+    ):
         log(
             f"getting missing simulation states for {simulation_id} "
             f"with visualization time {visualization_time} "
             f"and {len(loaded_state_orders)} loaded state orders",
             "client",
         )
-        simulation_manager.emit_missing_simulation_states(simulation_id, visualization_time, loaded_state_orders)
+        simulation_manager.emit_missing_simulation_states(
+            simulation_id, visualization_time, loaded_state_orders, loaded_state_tail, accepted_compressions
+        )
 
     @socketio.on("get-polylines")
-    def on_client_get_polylines(simulation_id):
-        log(f"getting polylines for {simulation_id}", "client")
-        simulation_manager.emit_simulation_polylines(simulation_id)
+    def on_client_get_polylines(simulation_id, known_version=None, level_of_detail=0):
+        log(
+            f"getting polylines for {simulation_id} after version {known_version} "
+            f"with level of detail {level_of_detail}",
+            "client",
+        )
+        simulation_manager.emit_simulation_polylines(simulation_id, known_version, level_of_detail)
 
     @socketio.on("edit-simulation-configuration")
     def on_client_edit_simulation_configuration(simulation_id, max_duration):
@@ -107,11 +120,30 @@ def run_server():
         )
         simulation_manager.edit_simulation_configuration(simulation_id, max_duration)
 
+    @socketio.on("subscribe-simulation-log")
+    def on_client_subscribe_simulation_log(simulation_id):
+        log(f"subscribing to the log of {simulation_id}", "client")
+        simulation_manager.subscribe_simulation_log(simulation_id)
+
+    @socketio.on("unsubscribe-simulation-log")
+    def on_client_unsubscribe_simulation_log(simulation_id):
+        log(f"unsubscribing from the log of {simulation_id}", "client")
+        simulation_manager.unsubscribe_simulation_log(simulation_id)
+
+    @socketio.on("get-simulation-log")
+    def on_client_get_simulation_log(simulation_id, before_line_number=None, limit=SIMULATION_LOG_PAGE_SIZE):
+        log(f"getting the log of {simulation_id} before line {before_line_number}", "client")
+        simulation_manager.emit_simulation_log_page(simulation_id, before_line_number, limit)
+
     # MARK: Script events
     @socketio.on("terminate")
     def on_script_terminate():
         log("terminating server", "script")
 
+        # Do not start queued simulations when the running ones stop
+        for simulation_id in list(simulation_manager.queued_simulation_ids):
+            simulation_manager.cancel_queued_simulation(simulation_id)
+
         for simulation_id, simulation_handler in simulation_manager.simulations.items():
             if simulation_handler.process is not None:
                 simulation_manager.stop_simulation(simulation_id)
@@ -140,7 +172,9 @@ def run_server():
 
     @socketio.on("log")
     def on_simulation_log(simulation_id, message):
-        log(f"simulation  {simulation_id}: {message}", "simulation", logging.DEBUG)
+        # Only the clients subscribed to the log of the simulation receive the line
+        log(f"simulation  {simulation_id}: {message}", "simulation", logging.DEBUG, should_emit=False)
+        simulation_manager.on_simulation_log(simulation_id, message)
 
     @socketio.on("simulation-update-time")
     def on_simulation_update_time(simulation_id, timestamp):
@@ -161,10 +195,10 @@ def run_server():
         simulation_manager.on_simulation_update_estimated_end_time(simulation_id, estimated_end_time)
 
     @socketio.on("simulation-update-polylines-version")
-    def on_simulation_update_polylines_version(simulation_id):
-        log(f"simulation  {simulation_id} polylines version updated", "simulation")
+    def on_simulation_update_polylines_version(simulation_id, version=None):
+        log(f"simulation  {simulation_id} polylines version updated to {version}", "simulation")
 
-        simulation_manager.on_simulation_update_polylines_version(simulation_id)
+        simulation_manager.on_simulation_update_polylines_version(simulation_id, version)
 
     @socketio.on("simulation-identification")
     def on_simulation_identification(
@@ -197,6 +231,28 @@ def run_server():
 
     log(f"Starting server at {HOST}:{SERVER_PORT}", "server", should_emit=False)
 
+    # MARK: Log lines, throttled changes and queued simulations
+    def emit_pending_messages():
+        while True:
+            socketio.sleep(SIMULATION_LOG_EMIT_INTERVAL)
+
+            # New log lines are sent by batches, to the clients subscribed to the log of the simulation only
+            for simulation_id, first_line_number, lines in simulation_manager.pop_pending_simulation_log_lines():
+                socketio.emit(
+                    "simulation-log-lines",
+                    (simulation_id, first_line_number, lines),
+                    to=SimulationManager.get_simulation_log_room(simulation_id),
+                )
+
+            # A simulation process might have exited before connecting, without freeing its slot with an event
+            simulation_manager.start_queued_simulations_in_freed_slots()
+
+            # The last progress of a simulation might have been skipped by the throttling of the progress updates
+            for simulation_id, changes in simulation_manager.pop_throttled_simulation_changes():
+                socketio.emit("simulation-changed", (simulation_id, changes), to=CLIENT_ROOM)
+
+    socketio.start_background_task(emit_pending_messages)
+
     # MARK: Run server
     socketio.run(app, host=HOST, port=SERVER_PORT)
 
@@ -2,6 +2,7 @@ import argparse
 import os
 import sys
 import threading
+from typing import Callable
 
 import questionary
 from multimodalsim.observer.data_collector import DataContainer, StandardDataCollector
@@ -10,6 +11,13 @@ from multimodalsim.simulator.simulator import Simulator
 from multimodalsim.statistics.data_analyzer import FixedLineDataAnalyzer
 
 from multimodalsim_viewer.common.utils import (
+    SIMULATION_LOG_LEVEL,
+    SIMULATION_LOG_SAMPLING_RATE,
+    STATE_COMPRESSION,
+    SaveDurability,
+    SimulationLogLevel,
+    StateCompression,
+    add_save_arguments,
     build_simulation_id,
     get_available_data,
     get_data_directory_path,
@@ -19,6 +27,12 @@ from multimodalsim_viewer.common.utils import (
 from multimodalsim_viewer.server.simulation_visualization_data_collector import (
     SimulationVisualizationDataCollector,
 )
+from multimodalsim_viewer.server.simulation_visualization_data_model import (
+    StateSavePolicy,
+)
+from multimodalsim_viewer.server.simulation_visualization_save_codec import (
+    verify_state_compression_is_available,
+)
 
 
 def run_simulation(
@@ -27,7 +41,16 @@ def run_simulation(
     max_duration: float | None,
     stop_event: threading.Event | None = None,
     is_offline: bool = False,
-) -> None:
+    save_durability: SaveDurability = SaveDurability.FLUSH_PER_BATCH,
+    log_level: SimulationLogLevel = SIMULATION_LOG_LEVEL,
+    log_sampling_rate: int = SIMULATION_LOG_SAMPLING_RATE,
+    state_save_policy: StateSavePolicy | None = None,
+    state_compression: StateCompression = STATE_COMPRESSION,
+    progress_callback: Callable[[float], None] | None = None,
+) -> int | None:
+    """
+    Run a simulation and return the number of processed events, or None if the data does not exist.
+    """
     data_container = DataContainer()
 
     data_collector = SimulationVisualizationDataCollector(
@@ -37,6 +60,12 @@ def run_simulation(
         input_data_description=data,
         offline=is_offline,
         stop_event=stop_event,
+        save_durability=save_durability,
+        log_level=log_level,
+        log_sampling_rate=log_sampling_rate,
+        state_save_policy=state_save_policy,
+        state_compression=state_compression,
+        progress_callback=progress_callback,
     )
 
     environment_observer = EnvironmentObserver(
@@ -47,7 +76,7 @@ def run_simulation(
 
     if not os.path.exists(simulation_data_directory):
         print(f"Simulation data directory {simulation_data_directory} does not exist")
-        return
+        return None
 
     simulator = Simulator(
         simulation_data_directory,
@@ -70,6 +99,43 @@ def run_simulation(
     if stop_event is not None:
         stop_event.set()
 
+    return data_collector.event_counter
+
+
+class SaveArguments:
+    """
+    How simulations are saved, parsed from the arguments added by add_save_arguments.
+    """
+
+    save_durability: SaveDurability
+    log_level: SimulationLogLevel
+    log_sampling_rate: int
+    state_save_policy: StateSavePolicy
+    state_compression: StateCompression
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        # The save durability and log arguments are not added for commands that do not run simulations
+        self.save_durability = SaveDurability(getattr(args, "save_durability", SaveDurability.FLUSH_PER_BATCH.value))
+        self.log_level = SimulationLogLevel(getattr(args, "log_level", SIMULATION_LOG_LEVEL.value))
+        self.log_sampling_rate = getattr(args, "log_sampling_rate", SIMULATION_LOG_SAMPLING_RATE)
+
+        self.state_save_policy = StateSavePolicy(
+            args.state_save_step, args.state_save_max_bytes or None, args.state_save_max_time_span or None
+        )
+        self.state_compression = StateCompression(args.state_compression)
+        verify_state_compression_is_available(self.state_compression)
+
+
+def parse_save_arguments(args: argparse.Namespace) -> SaveArguments:
+    """
+    Parse the arguments added by add_save_arguments, exiting with an error if they are invalid.
+    """
+    try:
+        return SaveArguments(args)
+    except ValueError as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+
 
 def run_simulation_cli():
 
@@ -82,6 +148,7 @@ def run_simulation_cli():
         action="store_true",
         help="Run the simulation in offline mode (does not connect to the server)",
     )
+    add_save_arguments(parser)
 
     args = parser.parse_args()
 
@@ -89,6 +156,12 @@ def run_simulation_cli():
     data = args.data
     max_duration = args.max_duration
     is_offline = args.offline
+    save_arguments = parse_save_arguments(args)
+    save_durability = save_arguments.save_durability
+    log_level = save_arguments.log_level
+    log_sampling_rate = save_arguments.log_sampling_rate
+    state_save_policy = save_arguments.state_save_policy
+    state_compression = save_arguments.state_compression
 
     name_error = verify_simulation_name(name)
 
@@ -144,13 +217,31 @@ def run_simulation_cli():
 
     input_listener_thread.start()
 
-    run_simulation(simulation_id, data, max_duration, stop_event, is_offline)
+    run_simulation(
+        simulation_id,
+        data,
+        max_duration,
+        stop_event,
+        is_offline,
+        save_durability,
+        log_level,
+        log_sampling_rate,
+        state_save_policy,
+        state_compression,
+    )
 
     print("To run a simulation with the same configuration, use the following command:")
     print(
         f"multimodalsim-simulation  --data {data} "
         f"{f'--max-duration {max_duration}' if max_duration is not None else ''} "
         f"{'--offline' if is_offline else ''} "
+        f"--save-durability {save_durability.value} "
+        f"--log-level {log_level.value} "
+        f"{f'--log-sampling-rate {log_sampling_rate} ' if log_level == SimulationLogLevel.SAMPLED else ''}"
+        f"--state-save-step {state_save_policy.max_updates} "
+        f"--state-save-max-bytes {state_save_policy.max_bytes or 0} "
+        f"--state-save-max-time-span {state_save_policy.max_time_span or 0:g} "
+        f"--state-compression {state_compression.value} "
         f"--name {name}"  # Name last to allow quick name change when re-running the command
     )
 
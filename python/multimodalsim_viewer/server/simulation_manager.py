@@ -1,22 +1,34 @@
 import inspect
 import logging
+import math
 import multiprocessing
+import time
 
-from flask_socketio import emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 
 from multimodalsim_viewer.common.utils import (
     CLIENT_ROOM,
+    COMPATIBLE_SAVE_VERSIONS,
+    MAX_CONCURRENT_SIMULATIONS,
     RUNNING_SIMULATION_STATUSES,
     SAVE_VERSION,
+    SIMULATION_LOG_PAGE_SIZE,
+    SIMULATION_PROGRESS_EMIT_INTERVAL,
     SIMULATION_SAVE_FILE_SEPARATOR,
     SimulationStatus,
+    StateCompression,
     build_simulation_id,
     get_session_id,
     log,
 )
+from multimodalsim_viewer.server.log_manager import SimulationLogBuffer
 from multimodalsim_viewer.server.simulation import run_simulation
 from multimodalsim_viewer.server.simulation_visualization_data_model import (
     SimulationVisualizationDataManager,
+    StateSavePolicy,
+)
+from multimodalsim_viewer.server.simulation_visualization_save_codec import (
+    verify_state_compression_is_available,
 )
 
 
@@ -39,6 +51,12 @@ class SimulationHandler:
 
     polylines_version: int | None
 
+    # Position of the simulation in the queue of simulations waiting to start
+    queue_position: int | None
+
+    # Fraction of the states of the saved simulation compacted so far, None if it is not being compacted
+    compaction_progress: float | None
+
     def __init__(
         self,
         simulation_id: str,
@@ -67,41 +85,197 @@ class SimulationHandler:
 
         self.polylines_version = None
 
+        self.queue_position = None
+
+        self.compaction_progress = None
+
+    def serialize(self) -> dict:
+        serialized_simulation = {
+            "id": self.simulation_id,
+            "name": self.name,
+            "status": self.status.value,
+            "startTime": self.start_time,
+            "data": self.data,
+        }
+
+        if self.simulation_start_time is not None:
+            serialized_simulation["simulationStartTime"] = self.simulation_start_time
+
+        if self.simulation_end_time is not None:
+            serialized_simulation["simulationEndTime"] = self.simulation_end_time
+
+        if self.simulation_time is not None:
+            serialized_simulation["simulationTime"] = self.simulation_time
+
+        if self.simulation_estimated_end_time is not None:
+            serialized_simulation["simulationEstimatedEndTime"] = self.simulation_estimated_end_time
+
+        if self.max_duration is not None:
+            serialized_simulation["configuration"] = {"maxDuration": self.max_duration}
+
+        if self.polylines_version is not None:
+            serialized_simulation["polylinesVersion"] = self.polylines_version
+
+        if self.queue_position is not None:
+            serialized_simulation["queuePosition"] = self.queue_position
+
+        if self.compaction_progress is not None:
+            serialized_simulation["compactionProgress"] = self.compaction_progress
+
+        return serialized_simulation
+
 
 class SimulationManager:
+    # Catalog of the running and saved simulations
     simulations: dict[str, SimulationHandler]
 
-    def __init__(self):
+    # Modification time of the saved simulations directory when it was last listed
+    saved_simulations_modification_time: int | None
+
+    # Saved simulations whose information must be loaded again from their save
+    simulation_ids_to_query: set[str]
+
+    # Inodes of the directories of the saved simulations when they were loaded, to notice the replaced ones
+    saved_simulation_inodes: dict[str, int]
+
+    # Last serialized simulations sent to the clients and when they were sent
+    emitted_simulations: dict[str, dict]
+    emitted_simulation_times: dict[str, float]
+
+    # Minimum time (in seconds) between two progress updates of a simulation
+    progress_emit_interval: float
+
+    # Simulations whose last changes must be sent later, because their progress update has been skipped
+    # or because they changed outside of an event
+    throttled_simulation_ids: set[str]
+
+    # Saved simulations compacted in a background task, they are not loaded again or deleted until it is done
+    compacting_simulation_ids: set[str]
+
+    # Simulations waiting for a free slot to start, in order
+    queued_simulation_ids: list[str]
+    max_concurrent_simulations: int
+
+    # Recent log lines of the simulations, only sent to the clients that subscribed to them
+    simulation_logs: dict[str, SimulationLogBuffer]
+
+    def __init__(
+        self,
+        progress_emit_interval: float = SIMULATION_PROGRESS_EMIT_INTERVAL,
+        max_concurrent_simulations: int = MAX_CONCURRENT_SIMULATIONS,
+    ):
         self.simulations = {}
+        self.saved_simulations_modification_time = None
+        self.simulation_ids_to_query = set()
+        self.saved_simulation_inodes = {}
+        self.emitted_simulations = {}
+        self.emitted_simulation_times = {}
+        self.progress_emit_interval = progress_emit_interval
+        self.throttled_simulation_ids = set()
+        self.compacting_simulation_ids = set()
+        self.queued_simulation_ids = []
+        self.max_concurrent_simulations = max(1, max_concurrent_simulations)
+        self.simulation_logs = {}
 
     def start_simulation(
         self, name: str, data: str, response_event: str, max_duration: float | None
     ) -> SimulationHandler:
         simulation_id, start_time = build_simulation_id(name)
 
-        simulation_process = multiprocessing.Process(target=run_simulation, args=(simulation_id, data, max_duration))
-
+        # The process is created when the simulation leaves the queue
         simulation_handler = SimulationHandler(
             simulation_id,
             name,
             start_time,
             data,
-            SimulationStatus.STARTING,
+            SimulationStatus.QUEUED,
             max_duration,
-            simulation_process,
+            None,
         )
 
         self.simulations[simulation_id] = simulation_handler
 
-        simulation_process.start()
+        # The simulation is started right away if there is a free slot
+        self.queued_simulation_ids.append(simulation_id)
+        self.start_queued_simulations()
 
-        self.emit_simulations()
+        self.emit_simulation_changes(simulation_id)
 
         log(f'Emitting response event "{response_event}"', "server")
         emit(response_event, simulation_id, to=CLIENT_ROOM)
 
         return simulation_handler
 
+    def get_number_of_active_simulations(self) -> int:
+        """
+        Count the simulations started by the server that hold a slot.
+
+        A simulation frees its slot once it is completed or lost, even though its process only exits a little
+        after it disconnects. A process that exited without disconnecting does not hold a slot either.
+        """
+        return sum(
+            1
+            for simulation in self.simulations.values()
+            if simulation.process is not None
+            and simulation.status in RUNNING_SIMULATION_STATUSES
+            and simulation.status != SimulationStatus.LOST
+            and simulation.process.is_alive()
+        )
+
+    def start_queued_simulations(self) -> None:
+        """
+        Start the queued simulations while there are free slots and update the queue positions.
+        """
+        number_of_active_simulations = self.get_number_of_active_simulations()
+
+        while len(self.queued_simulation_ids) > 0 and number_of_active_simulations < self.max_concurrent_simulations:
+            simulation = self.simulations[self.queued_simulation_ids.pop(0)]
+
+            simulation.process = multiprocessing.Process(
+                target=run_simulation, args=(simulation.simulation_id, simulation.data, simulation.max_duration)
+            )
+            simulation.status = SimulationStatus.STARTING
+            simulation.queue_position = None
+            simulation.process.start()
+
+            number_of_active_simulations += 1
+
+            log(f"Starting queued simulation {simulation.simulation_id}", "server")
+
+        for queue_position, simulation_id in enumerate(self.queued_simulation_ids):
+            self.simulations[simulation_id].queue_position = queue_position
+
+    def start_queued_simulations_in_freed_slots(self) -> None:
+        """
+        Start the queued simulations in the slots freed without any event, by a simulation process that exited
+        before connecting to the server for example.
+
+        Called periodically by the server, the changes of the simulations are sent later
+        (see pop_throttled_simulation_changes).
+        """
+        if len(self.queued_simulation_ids) == 0:
+            return
+
+        queued_simulation_ids = list(self.queued_simulation_ids)
+
+        self.start_queued_simulations()
+
+        # The started simulations and the positions of the others have changed
+        if self.queued_simulation_ids != queued_simulation_ids:
+            self.throttled_simulation_ids.update(queued_simulation_ids)
+
+    def cancel_queued_simulation(self, simulation_id: str) -> None:
+        self.queued_simulation_ids.remove(simulation_id)
+
+        # The simulation has not been saved yet
+        del self.simulations[simulation_id]
+
+        self.start_queued_simulations()
+
+        log(f"Queued simulation {simulation_id} cancelled", "server")
+
+        self.emit_simulation_changes()
+
     def on_simulation_start(self, simulation_id, socket_id, simulation_start_time):
         if simulation_id not in self.simulations:
             log(
@@ -117,7 +291,7 @@ class SimulationManager:
         simulation.status = SimulationStatus.RUNNING
         simulation.simulation_start_time = simulation_start_time
 
-        self.emit_simulations()
+        self.emit_simulation_changes(simulation_id)
 
     def stop_simulation(self, simulation_id):
         if simulation_id not in self.simulations:
@@ -129,6 +303,11 @@ class SimulationManager:
             return
 
         simulation = self.simulations[simulation_id]
+
+        if simulation.status == SimulationStatus.QUEUED:
+            self.cancel_queued_simulation(simulation_id)
+            return
+
         simulation.status = SimulationStatus.STOPPING
 
         emit("stop-simulation", to=simulation.socket_id)
@@ -144,6 +323,10 @@ class SimulationManager:
 
         simulation = self.simulations[simulation_id]
 
+        if simulation.status == SimulationStatus.QUEUED:
+            log(f"Queued simulation {simulation_id} cannot be paused", "server", logging.WARN)
+            return
+
         emit("pause-simulation", to=simulation.socket_id)
 
     def on_simulation_pause(self, simulation_id):
@@ -159,7 +342,7 @@ class SimulationManager:
 
         simulation.status = SimulationStatus.PAUSED
 
-        self.emit_simulations()
+        self.emit_simulation_changes(simulation_id)
 
     def resume_simulation(self, simulation_id):
         if simulation_id not in self.simulations:
@@ -172,6 +355,10 @@ class SimulationManager:
 
         simulation = self.simulations[simulation_id]
 
+        if simulation.status == SimulationStatus.QUEUED:
+            log(f"Queued simulation {simulation_id} cannot be resumed", "server", logging.WARN)
+            return
+
         emit("resume-simulation", to=simulation.socket_id)
 
     def on_simulation_resume(self, simulation_id):
@@ -187,7 +374,7 @@ class SimulationManager:
 
         simulation.status = SimulationStatus.RUNNING
 
-        self.emit_simulations()
+        self.emit_simulation_changes(simulation_id)
 
     def edit_simulation_configuration(self, simulation_id: str, max_duration: float | None) -> None:
         if simulation_id not in self.simulations:
@@ -202,9 +389,11 @@ class SimulationManager:
 
         simulation.max_duration = max_duration
 
-        emit("edit-simulation-configuration", (max_duration,), to=simulation.socket_id)
+        # Queued simulations use the new configuration when they are started
+        if simulation.status != SimulationStatus.QUEUED:
+            emit("edit-simulation-configuration", (max_duration,), to=simulation.socket_id)
 
-        self.emit_simulations()
+        self.emit_simulation_changes(simulation_id)
 
         log(
             f"Emitted simulations with new max duration {max_duration} for simulation {simulation_id}",
@@ -238,7 +427,13 @@ class SimulationManager:
 
         simulation.socket_id = None
 
-        self.emit_simulations()
+        # Load the end time and the final polylines version from the save
+        self.simulation_ids_to_query.add(simulation_id)
+
+        # A slot might have been freed
+        self.start_queued_simulations()
+
+        self.emit_simulation_changes()
 
     def on_simulation_update_time(self, simulation_id, timestamp):
         if simulation_id not in self.simulations:
@@ -253,7 +448,7 @@ class SimulationManager:
 
         simulation.simulation_time = timestamp
 
-        self.emit_simulations()
+        self.emit_simulation_changes(simulation_id, is_progress_update=True)
 
     def on_simulation_update_estimated_end_time(self, simulation_id, estimated_end_time):
         if simulation_id not in self.simulations:
@@ -268,9 +463,9 @@ class SimulationManager:
 
         simulation.simulation_estimated_end_time = estimated_end_time
 
-        self.emit_simulations()
+        self.emit_simulation_changes(simulation_id, is_progress_update=True)
 
-    def on_simulation_update_polylines_version(self, simulation_id):
+    def on_simulation_update_polylines_version(self, simulation_id: str, version: int | None = None) -> None:
         if simulation_id not in self.simulations:
             log(
                 f"{__file__} {inspect.currentframe().f_lineno}: Simulation {simulation_id} not found",
@@ -281,9 +476,13 @@ class SimulationManager:
 
         simulation = self.simulations[simulation_id]
 
-        simulation.polylines_version = SimulationVisualizationDataManager.get_polylines_version_with_lock(simulation_id)
+        # Simulations send the version they saved, older ones only notify that it changed
+        if version is None:
+            version = SimulationVisualizationDataManager.get_polylines_version_with_lock(simulation_id)
+
+        simulation.polylines_version = version
 
-        self.emit_simulations()
+        self.emit_simulation_changes(simulation_id)
 
     def on_simulation_identification(
         self,
@@ -333,55 +532,131 @@ class SimulationManager:
 
         simulation.polylines_version = SimulationVisualizationDataManager.get_polylines_version_with_lock(simulation_id)
 
-        self.emit_simulations()
+        self.emit_simulation_changes(simulation_id)
 
     def emit_simulations(self):
+        """
+        Send the whole list of simulations to the client that requested it.
+        """
+        self.query_simulations(should_rescan=True)
+
+        # The rescan might have changed simulations that other clients know
+        self.emit_simulation_changes()
+
+        serialized_simulations = [simulation.serialize() for simulation in self.simulations.values()]
+
+        emit(
+            "simulations",
+            serialized_simulations,
+            to=get_session_id(),
+        )
+
+        log("Emitting simulations", "server")
+
+    def emit_simulation_changes(self, simulation_id: str | None = None, is_progress_update: bool = False):
+        """
+        Send the fields of a simulation (or of all simulations if simulation_id is None) that changed since
+        they were last sent to the clients. Simulations that have been removed are sent with None.
+
+        Progress updates of a simulation are sent at most once every progress_emit_interval seconds,
+        the skipped changes are sent with the next update of the simulation or by pop_throttled_simulation_changes.
+        """
         self.query_simulations()
 
-        serialized_simulations = []
+        for removed_simulation_id in set(self.emitted_simulations) - set(self.simulations):
+            del self.emitted_simulations[removed_simulation_id]
+            self.emitted_simulation_times.pop(removed_simulation_id, None)
+            self.throttled_simulation_ids.discard(removed_simulation_id)
 
-        for simulation_id, simulation in self.simulations.items():
-            serialized_simulation = {
-                "id": simulation_id,
-                "name": simulation.name,
-                "status": simulation.status.value,
-                "startTime": simulation.start_time,
-                "data": simulation.data,
-            }
+            emit("simulation-changed", (removed_simulation_id, None), to=CLIENT_ROOM)
 
-            if simulation.simulation_start_time is not None:
-                serialized_simulation["simulationStartTime"] = simulation.simulation_start_time
+        # New simulations are always sent
+        simulation_ids = [
+            new_simulation_id
+            for new_simulation_id in self.simulations
+            if new_simulation_id not in self.emitted_simulations
+        ]
 
-            if simulation.simulation_end_time is not None:
-                serialized_simulation["simulationEndTime"] = simulation.simulation_end_time
+        if simulation_id is None:
+            simulation_ids = list(self.simulations)
+        elif simulation_id in self.simulations and simulation_id not in simulation_ids:
+            simulation_ids.append(simulation_id)
 
-            if simulation.simulation_time is not None:
-                serialized_simulation["simulationTime"] = simulation.simulation_time
+        current_time = time.monotonic()
 
-            if simulation.simulation_estimated_end_time is not None:
-                serialized_simulation["simulationEstimatedEndTime"] = simulation.simulation_estimated_end_time
+        for changed_simulation_id in simulation_ids:
+            if (
+                is_progress_update
+                and changed_simulation_id == simulation_id
+                and current_time - self.emitted_simulation_times.get(changed_simulation_id, -math.inf)
+                < self.progress_emit_interval
+            ):
+                self.throttled_simulation_ids.add(changed_simulation_id)
+                continue
 
-            if simulation.max_duration is not None:
-                serialized_simulation["configuration"] = {"maxDuration": simulation.max_duration}
+            changes = self.__get_simulation_changes(changed_simulation_id, current_time)
 
-            if simulation.polylines_version is not None:
-                serialized_simulation["polylinesVersion"] = simulation.polylines_version
+            if changes is None:
+                continue
 
-            serialized_simulations.append(serialized_simulation)
+            emit("simulation-changed", (changed_simulation_id, changes), to=CLIENT_ROOM)
 
-        emit(
-            "simulations",
-            serialized_simulations,
-            to=CLIENT_ROOM,
-        )
+    def __get_simulation_changes(self, simulation_id: str, current_time: float) -> dict | None:
+        """
+        Get the fields of a simulation that changed since they were last sent and mark them as sent,
+        or None if nothing changed.
+        """
+        self.throttled_simulation_ids.discard(simulation_id)
 
-        log("Emitting simulations", "server")
+        serialized_simulation = self.simulations[simulation_id].serialize()
+        emitted_simulation = self.emitted_simulations.get(simulation_id, {})
+
+        # Removed fields are sent as None
+        changes = {
+            key: serialized_simulation.get(key, None)
+            for key in serialized_simulation.keys() | emitted_simulation.keys()
+            if serialized_simulation.get(key, None) != emitted_simulation.get(key, None)
+        }
+
+        if len(changes) == 0:
+            return None
+
+        self.emitted_simulations[simulation_id] = serialized_simulation
+        self.emitted_simulation_times[simulation_id] = current_time
+
+        return changes
+
+    def pop_throttled_simulation_changes(self) -> list[tuple[str, dict]]:
+        """
+        Get the changes of the simulations whose last progress update has been skipped, once their
+        progress_emit_interval has elapsed, so that the clients do not keep a stale progress.
+        """
+        current_time = time.monotonic()
+
+        throttled_simulation_changes = []
+
+        for simulation_id in list(self.throttled_simulation_ids):
+            if simulation_id not in self.simulations:
+                self.throttled_simulation_ids.discard(simulation_id)
+                continue
+
+            if current_time - self.emitted_simulation_times.get(simulation_id, -math.inf) < self.progress_emit_interval:
+                continue
+
+            changes = self.__get_simulation_changes(simulation_id, current_time)
+
+            if changes is not None:
+                throttled_simulation_changes.append((simulation_id, changes))
+
+        return throttled_simulation_changes
 
     def emit_missing_simulation_states(
         self,
         simulation_id: str,
         visualization_time: float,
         loaded_state_orders: list[int],
+        loaded_state_tail: tuple[int, int] | None = None,
+        accepted_compressions: list[str] | None = None,
     ) -> None:
         if simulation_id not in self.simulations:
             log(
@@ -402,11 +677,16 @@ class SimulationManager:
                 first_continuous_state_order,
                 last_continuous_state_order,
                 necessary_state_order,
+                state_byte_offsets,
+                appended_state_orders,
+                compressed_states,
             ) = SimulationVisualizationDataManager.get_missing_states(
                 simulation_id,
                 visualization_time,
                 loaded_state_orders,
                 simulation.status not in RUNNING_SIMULATION_STATUSES,
+                loaded_state_tail,
+                accepted_compressions,
             )
 
             emit(
@@ -419,10 +699,20 @@ class SimulationManager:
                     first_continuous_state_order,
                     last_continuous_state_order,
                     necessary_state_order,
+                    state_byte_offsets,
+                    appended_state_orders,
+                    compressed_states,
                 ),
                 to=get_session_id(),
             )
 
+            log(
+                f"State cache: {SimulationVisualizationDataManager.get_state_cache()}",
+                "server",
+                logging.DEBUG,
+                should_emit=False,
+            )
+
         except Exception as e:
             log(
                 f"Error while emitting missing simulation states for {simulation_id}: {e}",
@@ -439,9 +729,16 @@ class SimulationManager:
 
             SimulationVisualizationDataManager.mark_simulation_as_corrupted(simulation_id)
 
-            self.emit_simulations()
+            self.emit_simulation_changes(simulation_id)
 
-    def emit_simulation_polylines(self, simulation_id):
+    def emit_simulation_polylines(
+        self, simulation_id: str, known_version: int | None = None, level_of_detail: int = 0
+    ) -> None:
+        """
+        Send the polylines of the simulation at the requested level of detail to the client that requested them.
+        If the client already has the polylines of known_version at this level of detail, only the polylines
+        added after it are sent (none if nothing changed).
+        """
         if simulation_id not in self.simulations:
             log(
                 f"{__file__} {inspect.currentframe().f_lineno}: Simulation {simulation_id} not found",
@@ -450,29 +747,198 @@ class SimulationManager:
             )
             return
 
-        polylines, version = SimulationVisualizationDataManager.get_polylines(simulation_id)
+        try:
+            polylines, version, is_incremental = SimulationVisualizationDataManager.get_polylines(
+                simulation_id, known_version, level_of_detail
+            )
+        except (ValueError, TypeError) as error:
+            log(
+                f"{__file__} {inspect.currentframe().f_lineno}: Cannot get the polylines of {simulation_id}: {error}",
+                "server",
+                logging.ERROR,
+            )
+            return
+
+        # Each client has its own version of the polylines
+        emit(
+            f"polylines-{simulation_id}",
+            (polylines, version, known_version if is_incremental else None, level_of_detail),
+            to=get_session_id(),
+        )
+
+    def start_simulation_compaction(
+        self,
+        simulation_id: str,
+        state_save_policy: StateSavePolicy | None,
+        state_compression: StateCompression,
+        socketio: SocketIO,
+    ) -> None:
+        """
+        Compact a completed simulation in a background task (see SimulationVisualizationDataManager.compact_simulation).
+
+        The progress of the compaction is sent to the clients with the changes of the simulation.
+        """
+        if (
+            simulation_id not in self.simulations
+            or self.simulations[simulation_id].status != SimulationStatus.COMPLETED
+        ):
+            raise ValueError(f"Simulation {simulation_id} is not completed")
+
+        if simulation_id in self.compacting_simulation_ids:
+            raise ValueError(f"Simulation {simulation_id} is already being compacted")
+
+        verify_state_compression_is_available(state_compression)
+
+        self.compacting_simulation_ids.add(simulation_id)
+        self.__set_compaction_progress(simulation_id, 0)
+
+        socketio.start_background_task(
+            self.__compact_simulation, simulation_id, state_save_policy, state_compression, socketio
+        )
+
+    def __set_compaction_progress(self, simulation_id: str, compaction_progress: float | None) -> None:
+        if simulation_id not in self.simulations:
+            return
+
+        self.simulations[simulation_id].compaction_progress = compaction_progress
 
-        emit(f"polylines-{simulation_id}", (polylines, version), to=CLIENT_ROOM)
+        # Sent by the periodic emit of the server since there is no client event to answer
+        self.throttled_simulation_ids.add(simulation_id)
 
-    def query_simulations(self):
-        all_simulation_ids = SimulationVisualizationDataManager.get_all_saved_simulation_ids()
+    def __compact_simulation(
+        self,
+        simulation_id: str,
+        state_save_policy: StateSavePolicy | None,
+        state_compression: StateCompression,
+        socketio: SocketIO,
+    ) -> None:
+        def on_compaction_progress(compaction_progress: float) -> None:
+            self.__set_compaction_progress(simulation_id, compaction_progress)
+
+            # Handle the other events between two states. The saved simulation is only replaced at the end of the
+            # compaction, without handing over to other events, so they never read a missing simulation.
+            socketio.sleep(0)
 
-        for simulation_id, _ in list(self.simulations.items()):
-            if simulation_id not in all_simulation_ids and self.simulations[simulation_id].status not in [
-                SimulationStatus.RUNNING,
-                SimulationStatus.PAUSED,
-                SimulationStatus.STOPPING,
-                SimulationStatus.STARTING,
-                SimulationStatus.LOST,
-            ]:
-                del self.simulations[simulation_id]
+        try:
+            result = SimulationVisualizationDataManager.compact_simulation(
+                simulation_id, state_save_policy, state_compression, on_compaction_progress
+            )
+            log(f"Compacted {result}", "server", should_emit=False)
+        except (ValueError, OSError) as error:
+            log(f"Cannot compact simulation {simulation_id}: {error}", "server", logging.ERROR, should_emit=False)
+        finally:
+            self.compacting_simulation_ids.discard(simulation_id)
+            self.__set_compaction_progress(simulation_id, None)
 
-        for simulation_id in all_simulation_ids:
+            # Load the new save version and state save policy
+            self.simulation_ids_to_query.add(simulation_id)
+
+    @staticmethod
+    def get_simulation_log_room(simulation_id: str) -> str:
+        return f"simulation-log-{simulation_id}"
+
+    def on_simulation_log(self, simulation_id: str, message: str) -> None:
+        if simulation_id not in self.simulation_logs:
+            self.simulation_logs[simulation_id] = SimulationLogBuffer()
+
+        self.simulation_logs[simulation_id].append(message)
+
+    def subscribe_simulation_log(self, simulation_id: str) -> None:
+        """
+        Send the new log lines of the simulation to the client that requested it, until it unsubscribes.
+        """
+        join_room(SimulationManager.get_simulation_log_room(simulation_id))
+
+    def unsubscribe_simulation_log(self, simulation_id: str) -> None:
+        leave_room(SimulationManager.get_simulation_log_room(simulation_id))
+
+    def emit_simulation_log_page(
+        self, simulation_id: str, before_line_number: int | None, limit: int = SIMULATION_LOG_PAGE_SIZE
+    ) -> None:
+        """
+        Send to the client that requested it the log lines of the simulation that come right before
+        before_line_number (or the last lines if before_line_number is None).
+        """
+        first_line_number, lines, number_of_lines = 0, [], 0
+
+        if simulation_id in self.simulation_logs:
+            simulation_log = self.simulation_logs[simulation_id]
+            first_line_number, lines = simulation_log.get_lines(
+                before_line_number, min(limit, SIMULATION_LOG_PAGE_SIZE)
+            )
+            number_of_lines = simulation_log.number_of_lines
+
+        emit(
+            "simulation-log-page",
+            (simulation_id, first_line_number, lines, number_of_lines),
+            to=get_session_id(),
+        )
+
+    def pop_pending_simulation_log_lines(self) -> list[tuple[str, int, list[str]]]:
+        """
+        Get the log lines received since the last call for each simulation, with the number of the first line.
+        """
+        pending_simulation_log_lines = []
+
+        for simulation_id, simulation_log in list(self.simulation_logs.items()):
+            first_line_number, lines = simulation_log.pop_pending_lines()
+
+            if len(lines) > 0:
+                pending_simulation_log_lines.append((simulation_id, first_line_number, lines))
+
+        return pending_simulation_log_lines
+
+    def query_simulations(self, should_rescan: bool = False):
+        """
+        Update the catalog of simulations from the saved simulations.
+
+        The saved simulations are only listed again when a simulation has been added or removed (the
+        modification time of the directory changed) and only the new simulations and the simulations
+        marked to be queried are loaded, unless should_rescan is True.
+        """
+        modification_time = SimulationVisualizationDataManager.get_saved_simulations_directory_modification_time()
+
+        if should_rescan or modification_time != self.saved_simulations_modification_time:
+            self.saved_simulations_modification_time = modification_time
+
+            all_simulation_ids = SimulationVisualizationDataManager.get_all_saved_simulation_ids()
+
+            for simulation_id, _ in list(self.simulations.items()):
+                if simulation_id not in all_simulation_ids and self.simulations[simulation_id].status not in [
+                    SimulationStatus.QUEUED,
+                    SimulationStatus.RUNNING,
+                    SimulationStatus.PAUSED,
+                    SimulationStatus.STOPPING,
+                    SimulationStatus.STARTING,
+                    SimulationStatus.LOST,
+                ]:
+                    del self.simulations[simulation_id]
+                    self.simulation_logs.pop(simulation_id, None)
+                    self.saved_simulation_inodes.pop(simulation_id, None)
+
+            for simulation_id in all_simulation_ids:
+                # A compaction replaces the directory of the simulation, its cached states are outdated
+                if (
+                    simulation_id in self.saved_simulation_inodes
+                    and SimulationVisualizationDataManager.get_saved_simulation_directory_inode(simulation_id)
+                    != self.saved_simulation_inodes[simulation_id]
+                ):
+                    SimulationVisualizationDataManager.clear_cached_simulation(simulation_id)
+                    self.simulation_ids_to_query.add(simulation_id)
+
+                if should_rescan or simulation_id not in self.simulations:
+                    self.simulation_ids_to_query.add(simulation_id)
+
+        simulation_ids_to_query = self.simulation_ids_to_query
+        self.simulation_ids_to_query = set()
+
+        for simulation_id in simulation_ids_to_query:
             # Non valid save files might throw an exception
             self.query_simulation(simulation_id)
 
     def query_simulation(self, simulation_id) -> None:
         if simulation_id in self.simulations and self.simulations[simulation_id].status in [
+            SimulationStatus.QUEUED,
             SimulationStatus.RUNNING,
             SimulationStatus.PAUSED,
             SimulationStatus.STOPPING,
@@ -481,6 +947,14 @@ class SimulationManager:
         ]:
             return
 
+        # Loaded again once compacted
+        if simulation_id in self.compacting_simulation_ids:
+            return
+
+        self.saved_simulation_inodes[simulation_id] = (
+            SimulationVisualizationDataManager.get_saved_simulation_directory_inode(simulation_id)
+        )
+
         is_corrupted = SimulationVisualizationDataManager.is_simulation_corrupted(simulation_id)
 
         if not is_corrupted:
@@ -496,7 +970,7 @@ class SimulationManager:
                 version = simulation_information.version
 
                 status = SimulationStatus.COMPLETED
-                if version < SAVE_VERSION:
+                if version < SAVE_VERSION and version not in COMPATIBLE_SAVE_VERSIONS:
                     status = SimulationStatus.OUTDATED
                 elif version > SAVE_VERSION:
                     status = SimulationStatus.FUTURE
@@ -533,6 +1007,10 @@ class SimulationManager:
                     # The simulation is not running but the end time is not set
                     raise Exception("Simulation is corrupted")
 
+                # Simulations saved before sealing existed or imported from elsewhere are sealed when loaded
+                if status == SimulationStatus.COMPLETED:
+                    SimulationVisualizationDataManager.seal_simulation(simulation_id)
+
                 self.simulations[simulation_id] = simulation
 
             except Exception:
@@ -0,0 +1,174 @@
+import threading
+from collections import deque
+
+from socketio import Client
+from socketio.exceptions import SocketIOError
+
+from multimodalsim_viewer.common.utils import (
+    OUTBOUND_EMIT_INTERVAL,
+    OUTBOUND_MAX_MESSAGES_PER_EMIT,
+    OUTBOUND_QUEUE_MAX_SIZE,
+)
+
+
+class SimulationOutboundChannel:
+    """
+    Queue of the messages sent by a simulation to the server, emitted by a background thread so that the
+    simulation never waits for the server.
+
+    There are three kinds of messages:
+    - ordered messages are never dropped (lifecycle notifications)
+    - droppable messages are dropped, oldest first, when max_queue_size of them are queued (logs)
+    - latest messages only keep the last value sent for an event (progress of the simulation)
+
+    Ordered and droppable messages share a single queue, so they are sent in the order they were queued.
+    Messages are emitted every emit_interval seconds while the client is connected, at most
+    max_messages_per_emit droppable messages at a time. The messages queued after them wait for the next emit.
+    """
+
+    sio: Client
+    emit_interval: float
+    max_queue_size: int
+    max_messages_per_emit: int
+
+    # Metrics
+    sent_messages: int
+    coalesced_messages: int
+    dropped_messages: int
+
+    # Ordered and droppable messages, with whether they can be dropped
+    __queued_messages: deque[tuple[str, object, bool]]
+    __droppable_message_count: int
+    __latest_messages: dict[str, object]
+
+    __lock: threading.Lock
+    __stop_event: threading.Event
+    __thread: threading.Thread | None
+
+    def __init__(
+        self,
+        sio: Client,
+        emit_interval: float = OUTBOUND_EMIT_INTERVAL,
+        max_queue_size: int = OUTBOUND_QUEUE_MAX_SIZE,
+        max_messages_per_emit: int = OUTBOUND_MAX_MESSAGES_PER_EMIT,
+    ) -> None:
+        self.sio = sio
+        self.emit_interval = emit_interval
+        self.max_queue_size = max_queue_size
+        self.max_messages_per_emit = max_messages_per_emit
+
+        self.sent_messages = 0
+        self.coalesced_messages = 0
+        self.dropped_messages = 0
+
+        self.__queued_messages = deque()
+        self.__droppable_message_count = 0
+        self.__latest_messages = {}
+
+        self.__lock = threading.Lock()
+        self.__stop_event = threading.Event()
+        self.__thread = None
+
+    def start(self) -> None:
+        self.__thread = threading.Thread(target=self.__run, name="OutboundChannel", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background thread and emit the remaining messages if the client is still connected.
+        """
+        self.__stop_event.set()
+
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+        while self.emit_pending_messages():
+            pass
+
+        with self.__lock:
+            # The messages that could not be sent are lost
+            self.dropped_messages += len(self.__queued_messages) + len(self.__latest_messages)
+            self.__queued_messages.clear()
+            self.__droppable_message_count = 0
+            self.__latest_messages.clear()
+
+    # MARK: +- Send
+    def send(self, event: str, data: object) -> None:
+        with self.__lock:
+            self.__queued_messages.append((event, data, False))
+
+    def send_latest(self, event: str, data: object) -> None:
+        with self.__lock:
+            if event in self.__latest_messages:
+                self.coalesced_messages += 1
+
+            self.__latest_messages[event] = data
+
+    def send_droppable(self, event: str, data: object) -> None:
+        with self.__lock:
+            if self.__droppable_message_count >= self.max_queue_size:
+                self.__drop_oldest_droppable_message()
+
+            self.__queued_messages.append((event, data, True))
+            self.__droppable_message_count += 1
+
+    def __drop_oldest_droppable_message(self) -> None:
+        # The oldest droppable message is almost always the first one, ordered messages are rare
+        for index, (_, _, is_droppable) in enumerate(self.__queued_messages):
+            if is_droppable:
+                del self.__queued_messages[index]
+                self.__droppable_message_count -= 1
+                self.dropped_messages += 1
+                return
+
+    # MARK: +- Emit
+    def emit_pending_messages(self) -> bool:
+        """
+        Emit the pending messages if the client is connected and return whether messages remain.
+        """
+        if not self.sio.connected:
+            return False
+
+        with self.__lock:
+            messages = []
+            droppable_message_count = 0
+
+            while len(self.__queued_messages) > 0:
+                event, data, is_droppable = self.__queued_messages[0]
+
+                if is_droppable:
+                    if droppable_message_count >= self.max_messages_per_emit:
+                        break
+
+                    droppable_message_count += 1
+
+                self.__queued_messages.popleft()
+                messages.append((event, data))
+
+            self.__droppable_message_count -= droppable_message_count
+
+            messages.extend(self.__latest_messages.items())
+            self.__latest_messages.clear()
+
+            has_remaining_messages = len(self.__queued_messages) > 0
+
+        for event, data in messages:
+            try:
+                self.sio.emit(event, data)
+                self.sent_messages += 1
+            except SocketIOError:
+                # The connection has been lost while emitting
+                self.dropped_messages += 1
+
+        return has_remaining_messages and self.sio.connected
+
+    def __run(self) -> None:
+        while not self.__stop_event.wait(self.emit_interval):
+            self.emit_pending_messages()
+
+    def __str__(self) -> str:
+        return (
+            f"{self.sent_messages} messages sent, {self.coalesced_messages} coalesced, "
+            f"{self.dropped_messages} dropped"
+        )
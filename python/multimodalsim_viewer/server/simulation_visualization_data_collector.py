@@ -1,5 +1,5 @@
 import threading
-from typing import Optional
+from typing import Any, Callable, Optional
 
 from multimodalsim.observer.data_collector import DataCollector
 from multimodalsim.simulator.environment import Environment
@@ -18,6 +18,7 @@ from multimodalsim.simulator.passenger_event import (
     PassengerToBoard,
 )
 from multimodalsim.simulator.simulation import Simulation
+from multimodalsim.simulator.vehicle import Route
 from multimodalsim.simulator.vehicle_event import (
     VehicleAlighted,
     VehicleArrival,
@@ -36,24 +37,38 @@ from socketio import Client
 from multimodalsim_viewer.common.utils import (
     HOST,
     SERVER_PORT,
-    STATE_SAVE_STEP,
+    SIMULATION_LOG_LEVEL,
+    SIMULATION_LOG_SAMPLING_RATE,
+    STATE_COMPRESSION,
+    UPDATE_WRITE_BATCH_SIZE,
+    UPDATE_WRITE_FLUSH_INTERVAL,
+    SaveDurability,
+    SimulationLogLevel,
     SimulationStatus,
+    StateCompression,
     build_simulation_id,
 )
-from multimodalsim_viewer.server.log_manager import register_log
+from multimodalsim_viewer.server.log_manager import SimulationLogger
+from multimodalsim_viewer.server.simulation_outbound_channel import (
+    SimulationOutboundChannel,
+)
 from multimodalsim_viewer.server.simulation_visualization_data_model import (
+    PassengerLegsDeltaUpdate,
     PassengerLegsUpdate,
     PassengerStatusUpdate,
+    RouteStopIndices,
     SimulationInformation,
+    SimulationStateWriter,
     SimulationVisualizationDataManager,
+    StateSavePolicy,
     StatisticUpdate,
     Update,
     UpdateType,
     VehicleStatusUpdate,
+    VehicleStopsDeltaUpdate,
     VehicleStopsUpdate,
     VisualizedEnvironment,
     VisualizedPassenger,
-    VisualizedStop,
     VisualizedVehicle,
 )
 
@@ -62,9 +77,11 @@ from multimodalsim_viewer.server.simulation_visualization_data_model import (
 class SimulationVisualizationDataCollector(DataCollector):
     simulation_id: str
     update_counter: int
+    event_counter: int
     visualized_environment: VisualizedEnvironment
     simulation_information: SimulationInformation
-    current_save_file_path: str
+    state_writer: SimulationStateWriter
+    state_save_policy: StateSavePolicy
 
     max_duration: float | None
     """
@@ -84,17 +101,31 @@ class SimulationVisualizationDataCollector(DataCollector):
 
     # Communication
     sio: Client | None = None
+    # Messages to the server are queued and sent by a background thread
+    outbound_channel: SimulationOutboundChannel | None = None
     stop_event: threading.Event | None = None
     connection_thread: threading.Thread | None = None
+    # Called with the progress of the simulation (from 0 to 1) when its time changes, used when it runs offline
+    progress_callback: Callable[[float], None] | None = None
     _simulation: Simulation | None = None
     status: SimulationStatus | None = None
 
     # Polylines
-    saved_polylines_coordinates_pairs: set[str] = set()
+    # Coordinates (latitude, longitude, latitude, longitude) of the stop pairs whose polylines are saved
+    saved_polylines_coordinates_pairs: set[tuple[float, float, float, float]]
+    # Coordinates of the stops of each vehicle when its polylines were last checked
+    vehicles_stops_coordinates: dict[str, tuple[tuple[float | None, float | None], ...]]
+
+    # Stop indices of the routes where the trips board and alight, by vehicle id
+    # The routes do not change while an event is processed, so the indices are cleared before each event
+    route_stop_indices: dict[str, RouteStopIndices]
 
     # Estimated end time
     last_estimated_end_time: float | None = None
 
+    # Logs
+    logger: SimulationLogger
+
     def __init__(
         self,
         data_analyzer: DataAnalyzer,
@@ -105,6 +136,14 @@ class SimulationVisualizationDataCollector(DataCollector):
         max_duration: float | None = None,
         offline: bool = False,
         stop_event: threading.Event | None = None,
+        save_durability: SaveDurability = SaveDurability.FLUSH_PER_BATCH,
+        update_write_batch_size: int = UPDATE_WRITE_BATCH_SIZE,
+        update_write_flush_interval: float = UPDATE_WRITE_FLUSH_INTERVAL,
+        log_level: SimulationLogLevel = SIMULATION_LOG_LEVEL,
+        log_sampling_rate: int = SIMULATION_LOG_SAMPLING_RATE,
+        state_save_policy: StateSavePolicy | None = None,
+        state_compression: StateCompression = STATE_COMPRESSION,
+        progress_callback: Callable[[float], None] | None = None,
     ) -> None:
         super().__init__()
 
@@ -113,13 +152,18 @@ class SimulationVisualizationDataCollector(DataCollector):
 
         self.simulation_id = simulation_id
         self.update_counter = 0
+        self.event_counter = 0
         self.visualized_environment = VisualizedEnvironment()
 
+        self.state_save_policy = state_save_policy if state_save_policy is not None else StateSavePolicy()
+
         self.simulation_information = SimulationInformation(
-            simulation_id, input_data_description, None, None, None, None
+            simulation_id, input_data_description, None, None, None, None, self.state_save_policy, state_compression
         )
 
-        self.current_save_file_path = None
+        self.state_writer = SimulationStateWriter(
+            simulation_id, save_durability, update_write_batch_size, update_write_flush_interval, state_compression
+        )
 
         self.max_duration = max_duration
 
@@ -132,6 +176,15 @@ class SimulationVisualizationDataCollector(DataCollector):
         self.last_statistics_update_time = None
 
         self.stop_event = stop_event
+        self.progress_callback = progress_callback
+
+        self.saved_polylines_coordinates_pairs = set()
+        self.vehicles_stops_coordinates = {}
+
+        self.route_stop_indices = {}
+
+        self.logger = SimulationLogger(simulation_id, log_level, log_sampling_rate)
+        self.log(f"Simulation created with data {input_data_description}", is_lifecycle_message=True)
 
         if not offline:
             self.initialize_communication()
@@ -147,27 +200,31 @@ class SimulationVisualizationDataCollector(DataCollector):
         self.sio = sio
         self.status = SimulationStatus.RUNNING
 
+        self.outbound_channel = SimulationOutboundChannel(sio)
+        self.outbound_channel.start()
+
         @sio.on("pause-simulation")
         def pause_simulator():
             if self._simulation is not None:
                 self._simulation.pause()
                 self.status = SimulationStatus.PAUSED
-                if self.is_connected:
-                    self.sio.emit("simulation-pause", self.simulation_id)
+                self.log("Simulation paused", is_lifecycle_message=True)
+                self.outbound_channel.send("simulation-pause", self.simulation_id)
 
         @sio.on("resume-simulation")
         def resume_simulator():
             if self._simulation is not None:
                 self._simulation.resume()
                 self.status = SimulationStatus.RUNNING
-                if self.is_connected:
-                    self.sio.emit("simulation-resume", self.simulation_id)
+                self.log("Simulation resumed", is_lifecycle_message=True)
+                self.outbound_channel.send("simulation-resume", self.simulation_id)
 
         @sio.on("stop-simulation")
         def stop_simulator():
             if self._simulation is not None:
                 self._simulation.stop()
                 self.status = SimulationStatus.STOPPING
+                self.log("Simulation stopping", is_lifecycle_message=True)
 
         @sio.on("connect")
         def on_connect():
@@ -202,7 +259,7 @@ class SimulationVisualizationDataCollector(DataCollector):
             )
 
             if new_estimated_end_time != self.visualized_environment.estimated_end_time:
-                self.sio.emit(
+                self.outbound_channel.send_latest(
                     "simulation-update-estimated-end-time",
                     (self.simulation_id, new_estimated_end_time),
                 )
@@ -231,6 +288,22 @@ class SimulationVisualizationDataCollector(DataCollector):
         self.sio.disconnect()
         self.sio.wait()
 
+    # MARK: +- Logs
+    def log(self, message: str, is_lifecycle_message: bool = False) -> None:
+        if is_lifecycle_message:
+            self.logger.log_lifecycle(message)
+        else:
+            self.logger.log_event(message)
+
+        if self.outbound_channel is None:
+            return
+
+        # Event messages can be dropped if the server does not keep up
+        if is_lifecycle_message:
+            self.outbound_channel.send("log", (self.simulation_id, message))
+        else:
+            self.outbound_channel.send_droppable("log", (self.simulation_id, message))
+
     # MARK: +- Collect
     def collect(
         self,
@@ -255,11 +328,13 @@ class SimulationVisualizationDataCollector(DataCollector):
         if current_event is None:
             return
 
-        message = self.process_event(current_event, env)
-        register_log(self.simulation_id, message)
+        self.event_counter += 1
 
-        if self.is_connected:
-            self.sio.emit("log", (self.simulation_id, message))
+        self.process_event(current_event, env)
+
+        # The message is only built if the event is logged
+        if self.logger.should_log_event():
+            self.log(self.get_event_log_message(current_event))
 
         if (
             self.last_statistics_update_time is None
@@ -283,6 +358,7 @@ class SimulationVisualizationDataCollector(DataCollector):
         if self.update_counter == 0:
             # Add the simulation start time to the simulation information
             self.simulation_information.simulation_start_time = update.timestamp
+            self.log(f"Simulation started at {update.timestamp}", is_lifecycle_message=True)
 
             # Save the simulation information
             SimulationVisualizationDataManager.set_simulation_information(
@@ -290,13 +366,14 @@ class SimulationVisualizationDataCollector(DataCollector):
             )
 
             # Notify the server that the simulation has started and send the simulation start time
-            if self.is_connected:
-                self.sio.emit("simulation-start", (self.simulation_id, update.timestamp))
-
-        if self.visualized_environment.timestamp != update.timestamp:
-            # Notify the server that the simulation time has been updated
-            if self.is_connected:
-                self.sio.emit(
+            if self.outbound_channel is not None:
+                self.outbound_channel.send("simulation-start", (self.simulation_id, update.timestamp))
+
+        has_time_changed = self.visualized_environment.timestamp != update.timestamp
+        if has_time_changed:
+            # Notify the server that the simulation time has been updated, only the last time is sent
+            if self.outbound_channel is not None:
+                self.outbound_channel.send_latest(
                     "simulation-update-time",
                     (
                         self.simulation_id,
@@ -317,51 +394,41 @@ class SimulationVisualizationDataCollector(DataCollector):
         )
         if estimated_end_time != self.visualized_environment.estimated_end_time:
             # Notify the server that the simulation estimated end time has been updated
-            if self.is_connected:
-                self.sio.emit(
+            if self.outbound_channel is not None:
+                self.outbound_channel.send_latest(
                     "simulation-update-estimated-end-time",
                     (self.simulation_id, estimated_end_time),
                 )
             self.visualized_environment.estimated_end_time = estimated_end_time
 
-        # Save the state of the simulation every SAVE_STATE_STEP events before applying the update
-        if self.update_counter % STATE_SAVE_STEP == 0:
-            self.current_save_file_path = SimulationVisualizationDataManager.save_state(
-                self.simulation_id, self.visualized_environment
+        if has_time_changed and self.progress_callback is not None:
+            start_time = self.simulation_information.simulation_start_time
+            self.progress_callback(
+                min(1, (update.timestamp - start_time) / (estimated_end_time - start_time))
+                if estimated_end_time > start_time
+                else 1
             )
 
-        if update.update_type == UpdateType.CREATE_PASSENGER:
-            self.visualized_environment.add_passenger(update.data)
-        elif update.update_type == UpdateType.CREATE_VEHICLE:
-            self.visualized_environment.add_vehicle(update.data)
-            data: VisualizedVehicle = update.data
-            if data.polylines is not None:
-                self.update_polylines_if_needed(data)
-        elif update.update_type == UpdateType.UPDATE_PASSENGER_STATUS:
-            passenger = self.visualized_environment.get_passenger(update.data.passenger_id)
-            passenger.status = update.data.status
-        elif update.update_type == UpdateType.UPDATE_PASSENGER_LEGS:
-            passenger = self.visualized_environment.get_passenger(update.data.passenger_id)
-            legs_update: PassengerLegsUpdate = update.data
-            passenger.previous_legs = legs_update.previous_legs
-            passenger.next_legs = legs_update.next_legs
-            passenger.current_leg = legs_update.current_leg
-        elif update.update_type == UpdateType.UPDATE_VEHICLE_STATUS:
-            vehicle = self.visualized_environment.get_vehicle(update.data.vehicle_id)
-            vehicle.status = update.data.status
-        elif update.update_type == UpdateType.UPDATE_VEHICLE_STOPS:
+        # Save a new state of the simulation before applying the update when the current one is full
+        if self.state_writer.file_path is None or self.state_save_policy.is_state_full(
+            self.state_writer.update_count,
+            self.state_writer.updates_byte_length,
+            update.timestamp - self.state_writer.state_timestamp,
+        ):
+            self.state_writer.start_state(self.visualized_environment)
+
+        self.visualized_environment.apply_update(update)
+
+        if update.update_type in [
+            UpdateType.CREATE_VEHICLE,
+            UpdateType.UPDATE_VEHICLE_STOPS,
+            UpdateType.UPDATE_VEHICLE_STOPS_DELTA,
+        ]:
             vehicle = self.visualized_environment.get_vehicle(update.data.vehicle_id)
-            stops_update: VehicleStopsUpdate = update.data
-            vehicle.previous_stops = stops_update.previous_stops
-            vehicle.next_stops = stops_update.next_stops
-            vehicle.current_stop = stops_update.current_stop
             if vehicle.polylines is not None:
                 self.update_polylines_if_needed(vehicle)
-        elif update.update_type == UpdateType.UPDATE_STATISTIC:
-            statistic_update: StatisticUpdate = update.data
-            self.visualized_environment.statistic = statistic_update.statistic
 
-        SimulationVisualizationDataManager.save_update(self.current_save_file_path, update)
+        self.state_writer.write_update(update)
 
         self.update_counter += 1
 
@@ -374,45 +441,46 @@ class SimulationVisualizationDataCollector(DataCollector):
         if len(stops) < 2:
             return
 
+        # The stops of a vehicle rarely change, its polylines are only checked again if they did
+        stops_coordinates = tuple((stop.latitude, stop.longitude) for stop in stops)
+        if self.vehicles_stops_coordinates.get(vehicle.vehicle_id, None) == stops_coordinates:
+            return
+
         # Notify if their are not enough polylines
         if len(polylines) < len(stops) - 1:
             raise ValueError(f"Vehicle {vehicle.vehicle_id} has not enough polylines for its stops")
 
-        stops_pairs: list[tuple[tuple[VisualizedStop, VisualizedStop], tuple[str, list[float]]]] = zip(
-            [(stops[i], stops[i + 1]) for i in range(len(stops) - 1)],
+        polylines_to_save: dict[str, tuple[str, list[float]]] = {}
+
+        for (first_latitude, first_longitude), (second_latitude, second_longitude), polyline in zip(
+            stops_coordinates,
+            stops_coordinates[1:],
             polylines.values(),
             strict=False,  # There may be more polylines than stops
-        )
+        ):
+            if first_latitude is None or first_longitude is None or second_latitude is None or second_longitude is None:
+                raise ValueError(f"Vehicle {vehicle.vehicle_id} has stops without coordinates")
 
-        polylines_to_save: dict[str, tuple[str, list[float]]] = {}
+            coordinates_pair = (first_latitude, first_longitude, second_latitude, second_longitude)
 
-        for stop_pair, polyline in stops_pairs:
-            first_stop, second_stop = stop_pair
+            if coordinates_pair in self.saved_polylines_coordinates_pairs:
+                continue
 
-            if (
-                first_stop.latitude is None
-                or first_stop.longitude is None
-                or second_stop.latitude is None
-                or second_stop.longitude is None
-            ):
-                raise ValueError(f"Vehicle {vehicle.vehicle_id} has stops without coordinates")
+            self.saved_polylines_coordinates_pairs.add(coordinates_pair)
 
-            coordinates_pair = (
-                f"{first_stop.latitude},{first_stop.longitude},{second_stop.latitude},{second_stop.longitude}"
-            )
+            # The polylines are identified by the string of their coordinates in the save
+            polylines_to_save[f"{first_latitude},{first_longitude},{second_latitude},{second_longitude}"] = polyline
 
-            if coordinates_pair not in self.saved_polylines_coordinates_pairs:
-                polylines_to_save[coordinates_pair] = polyline
-                self.saved_polylines_coordinates_pairs.add(coordinates_pair)
+        self.vehicles_stops_coordinates[vehicle.vehicle_id] = stops_coordinates
 
-        if len(polylines_to_save) > 0:
-            SimulationVisualizationDataManager.set_polylines(self.simulation_id, polylines_to_save)
+        if len(polylines_to_save) == 0:
+            return
 
-        if self.is_connected:
-            self.sio.emit(
-                "simulation-update-polylines-version",
-                self.simulation_id,
-            )
+        version = SimulationVisualizationDataManager.set_polylines(self.simulation_id, polylines_to_save)
+
+        # Notify the server only when new polylines have been saved
+        if self.outbound_channel is not None:
+            self.outbound_channel.send_latest("simulation-update-polylines-version", (self.simulation_id, version))
 
     # MARK: +- Flush
     def flush(self, environment) -> None:
@@ -427,17 +495,7 @@ class SimulationVisualizationDataCollector(DataCollector):
                 ),
                 environment,
             )
-            previous_passenger = self.visualized_environment.get_passenger(event.state_machine.owner.id)
-            self.add_update(
-                Update(
-                    UpdateType.UPDATE_PASSENGER_LEGS,
-                    PassengerLegsUpdate.from_trip_environment_and_previous_passenger(
-                        event.state_machine.owner, environment, previous_passenger
-                    ),
-                    event.time,
-                ),
-                environment,
-            )
+            self.add_update(self.__get_passenger_legs_update(event, environment), environment)
 
         for event in self.vehicle_notification_event_queue:
             vehicle = event._VehicleNotification__vehicle
@@ -458,258 +516,242 @@ class SimulationVisualizationDataCollector(DataCollector):
         self.passenger_assignment_event_queue = []
         self.vehicle_notification_event_queue = []
 
+    def __get_passenger_legs_update(
+        self, event: PassengerAssignment | PassengerToBoard | PassengerAlighting, environment: Environment
+    ) -> Update:
+        trip = event.state_machine.owner
+        previous_passenger = self.visualized_environment.get_passenger(trip.id)
+
+        legs_update = PassengerLegsUpdate.from_trip_environment_and_previous_passenger(
+            trip, environment, previous_passenger, self.route_stop_indices
+        )
+
+        # Only the legs that changed since the last update of the passenger are saved
+        legs_delta_update = PassengerLegsDeltaUpdate.from_legs_update_and_previous_passenger(
+            legs_update, previous_passenger
+        )
+
+        if legs_delta_update is not None:
+            return Update(UpdateType.UPDATE_PASSENGER_LEGS_DELTA, legs_delta_update, event.time)
+
+        return Update(UpdateType.UPDATE_PASSENGER_LEGS, legs_update, event.time)
+
     @property
     def has_to_flush(self) -> bool:
         return len(self.passenger_assignment_event_queue) > 0 or len(self.vehicle_notification_event_queue) > 0
 
     # MARK: +- Process Event
-    def process_event(self, event: Event, environment: Environment) -> str:
+    def process_event(self, event: Event, environment: Environment) -> None:
+        self.route_stop_indices.clear()
+
         # In case that a queued event is not linked to EnvironmentIdle
         if self.has_to_flush and event.time > self.last_queued_event_time:
             self.flush(environment)
 
-        # Optimize
-        if isinstance(event, Optimize):
-            # Do nothing ?
-            return f"{event.time} TODO Optimize"
-
-        # EnvironmentUpdate
-        if isinstance(event, EnvironmentUpdate):
-            # Do nothing ?
-            return f"{event.time} TODO EnvironmentUpdate"
-
-        # EnvironmentIdle
-        if isinstance(event, EnvironmentIdle):
-            self.flush(environment)
-            return f"{event.time} TODO EnvironmentIdle"
-
-        # PassengerRelease
-        if isinstance(event, PassengerRelease):
-            passenger = VisualizedPassenger.from_trip_and_environment(event.trip, environment)
-            self.add_update(
-                Update(
-                    UpdateType.CREATE_PASSENGER,
-                    passenger,
-                    event.time,
-                ),
-                environment,
-            )
-            return f"{event.time} TODO PassengerRelease"
+        handler, _ = SimulationVisualizationDataCollector.get_event_handler(type(event))
+        handler(self, event, environment)
+
+    @staticmethod
+    def get_event_log_message(event: Event) -> str:
+        _, event_name = SimulationVisualizationDataCollector.get_event_handler(type(event))
+        return f"{event.time} TODO {event_name}"
+
+    @staticmethod
+    def get_event_handler(event_type: type) -> tuple[Callable[[Any, Event, Environment], None], str]:
+        """
+        Get the handler of a type of event and the name of the event type it is registered for.
+
+        The handler is resolved once per event type and cached.
+        """
+        cached_handler = SimulationVisualizationDataCollector.__event_handlers_by_type.get(event_type, None)
+        if cached_handler is not None:
+            return cached_handler
+
+        for registered_event_type, handler in SimulationVisualizationDataCollector.__EVENT_HANDLERS:
+            if issubclass(event_type, registered_event_type):
+                cached_handler = (handler, registered_event_type.__name__)
+                SimulationVisualizationDataCollector.__event_handlers_by_type[event_type] = cached_handler
+                return cached_handler
+
+        raise NotImplementedError(f"Event {event_type} not implemented")
+
+    @staticmethod
+    def get_handled_event_types() -> list[type]:
+        """
+        Get the types of events that have a handler, in the order they are matched.
+        """
+        return [event_type for event_type, _ in SimulationVisualizationDataCollector.__EVENT_HANDLERS]
+
+    # MARK: +- Event handlers
+    # Every handler takes the event and the environment, even if it does not use them
+    # pylint: disable=unused-argument
+
+    def __process_ignored_event(self, event: Event, environment: Environment) -> None:
+        pass
+
+    def __process_environment_idle(self, event: EnvironmentIdle, environment: Environment) -> None:
+        self.flush(environment)
+
+    def __process_passenger_release(self, event: PassengerRelease, environment: Environment) -> None:
+        passenger = VisualizedPassenger.from_trip_and_environment(event.trip, environment, self.route_stop_indices)
+        self.add_update(
+            Update(
+                UpdateType.CREATE_PASSENGER,
+                passenger,
+                event.time,
+            ),
+            environment,
+        )
 
-        # PassengerAssignment
-        if isinstance(event, PassengerAssignment):
-            self.passenger_assignment_event_queue.append(event)
-            self.last_queued_event_time = event.time
-            return f"{event.time} TODO PassengerAssignment"
+    def __process_passenger_assignment(self, event: PassengerAssignment, environment: Environment) -> None:
+        self.passenger_assignment_event_queue.append(event)
+        self.last_queued_event_time = event.time
 
-        # PassengerReady
-        if isinstance(event, PassengerReady):
-            self.add_update(
-                Update(
-                    UpdateType.UPDATE_PASSENGER_STATUS,
-                    PassengerStatusUpdate.from_trip(
-                        event.state_machine.owner,
-                    ),
-                    event.time,
+    def __process_passenger_ready(self, event: PassengerReady, environment: Environment) -> None:
+        self.add_update(
+            Update(
+                UpdateType.UPDATE_PASSENGER_STATUS,
+                PassengerStatusUpdate.from_trip(
+                    event.state_machine.owner,
                 ),
-                environment,
-            )
-            return f"{event.time} TODO PassengerReady"
-
-        # PassengerToBoard
-        if isinstance(event, PassengerToBoard):
-            self.add_update(
-                Update(
-                    UpdateType.UPDATE_PASSENGER_STATUS,
-                    PassengerStatusUpdate.from_trip(
-                        event.state_machine.owner,
-                    ),
-                    event.time,
-                ),
-                environment,
-            )
-            previous_passenger = self.visualized_environment.get_passenger(event.state_machine.owner.id)
-            self.add_update(
-                Update(
-                    UpdateType.UPDATE_PASSENGER_LEGS,
-                    PassengerLegsUpdate.from_trip_environment_and_previous_passenger(
-                        event.state_machine.owner, environment, previous_passenger
-                    ),
-                    event.time,
-                ),
-                environment,
-            )
-            return f"{event.time} TODO PassengerToBoard"
-
-        # PassengerAlighting
-        if isinstance(event, PassengerAlighting):
-            self.add_update(
-                Update(
-                    UpdateType.UPDATE_PASSENGER_STATUS,
-                    PassengerStatusUpdate.from_trip(
-                        event.state_machine.owner,
-                    ),
-                    event.time,
-                ),
-                environment,
-            )
-            previous_passenger = self.visualized_environment.get_passenger(event.state_machine.owner.id)
-            self.add_update(
-                Update(
-                    UpdateType.UPDATE_PASSENGER_LEGS,
-                    PassengerLegsUpdate.from_trip_environment_and_previous_passenger(
-                        event.state_machine.owner, environment, previous_passenger
-                    ),
-                    event.time,
-                ),
-                environment,
-            )
-            return f"{event.time} TODO PassengerAlighting"
-
-        # VehicleWaiting
-        if isinstance(event, VehicleWaiting):
-            self.add_update(
-                Update(
-                    UpdateType.UPDATE_VEHICLE_STATUS,
-                    VehicleStatusUpdate.from_vehicle(event.state_machine.owner),
-                    event.time,
-                ),
-                environment,
-            )
-            return f"{event.time} TODO VehicleWaiting"
+                event.time,
+            ),
+            environment,
+        )
 
-        # VehicleBoarding
-        if isinstance(event, VehicleBoarding):
-            self.add_update(
-                Update(
-                    UpdateType.UPDATE_VEHICLE_STATUS,
-                    VehicleStatusUpdate.from_vehicle(
-                        event.state_machine.owner,
-                    ),
-                    event.time,
+    def __process_passenger_boarding_or_alighting(
+        self, event: PassengerToBoard | PassengerAlighting, environment: Environment
+    ) -> None:
+        self.add_update(
+            Update(
+                UpdateType.UPDATE_PASSENGER_STATUS,
+                PassengerStatusUpdate.from_trip(
+                    event.state_machine.owner,
                 ),
-                environment,
-            )
-            return f"{event.time} TODO VehicleBoarding"
-
-        # VehicleDeparture
-        if isinstance(event, VehicleDeparture):
-            route = event._VehicleDeparture__route
-            vehicle = event.state_machine.owner
+                event.time,
+            ),
+            environment,
+        )
+        self.add_update(self.__get_passenger_legs_update(event, environment), environment)
 
-            self.add_update(
-                Update(
-                    UpdateType.UPDATE_VEHICLE_STATUS,
-                    VehicleStatusUpdate.from_vehicle(
-                        event.state_machine.owner,
-                    ),
-                    event.time,
+    def __process_vehicle_status_change(
+        self, event: VehicleWaiting | VehicleBoarding | VehicleComplete, environment: Environment
+    ) -> None:
+        self.add_update(
+            Update(
+                UpdateType.UPDATE_VEHICLE_STATUS,
+                VehicleStatusUpdate.from_vehicle(
+                    event.state_machine.owner,
                 ),
-                environment,
-            )
+                event.time,
+            ),
+            environment,
+        )
 
-            self.add_update(
-                Update(
-                    UpdateType.UPDATE_VEHICLE_STOPS,
-                    VehicleStopsUpdate.from_vehicle_and_route(vehicle, route),
-                    event.time,
-                ),
-                environment,
-            )
-            return f"{event.time} TODO VehicleDeparture"
+    def __process_vehicle_departure(self, event: VehicleDeparture, environment: Environment) -> None:
+        self.__add_vehicle_status_and_stops_updates(event, event._VehicleDeparture__route, environment)
 
-        # VehicleArrival
-        if isinstance(event, VehicleArrival):
-            route = event._VehicleArrival__route
-            vehicle = event.state_machine.owner
+    def __process_vehicle_arrival(self, event: VehicleArrival, environment: Environment) -> None:
+        self.__add_vehicle_status_and_stops_updates(event, event._VehicleArrival__route, environment)
 
-            self.add_update(
-                Update(
-                    UpdateType.UPDATE_VEHICLE_STATUS,
-                    VehicleStatusUpdate.from_vehicle(
-                        event.state_machine.owner,
-                    ),
-                    event.time,
-                ),
-                environment,
-            )
+    def __add_vehicle_status_and_stops_updates(
+        self, event: VehicleDeparture | VehicleArrival, route: Route, environment: Environment
+    ) -> None:
+        vehicle = event.state_machine.owner
 
-            self.add_update(
-                Update(
-                    UpdateType.UPDATE_VEHICLE_STOPS,
-                    VehicleStopsUpdate.from_vehicle_and_route(vehicle, route),
-                    event.time,
+        self.add_update(
+            Update(
+                UpdateType.UPDATE_VEHICLE_STATUS,
+                VehicleStatusUpdate.from_vehicle(
+                    event.state_machine.owner,
                 ),
-                environment,
-            )
-
-            return f"{event.time} TODO VehicleArrival"
+                event.time,
+            ),
+            environment,
+        )
 
-        # VehicleComplete
-        if isinstance(event, VehicleComplete):
-            self.add_update(
-                Update(
-                    UpdateType.UPDATE_VEHICLE_STATUS,
-                    VehicleStatusUpdate.from_vehicle(
-                        event.state_machine.owner,
-                    ),
-                    event.time,
-                ),
-                environment,
-            )
-            return f"{event.time} TODO VehicleComplete"
+        # Departures and arrivals usually only move the current stop, only the change is saved
+        stops_delta_update = VehicleStopsDeltaUpdate.from_vehicle_route_and_previous_vehicle(
+            vehicle, route, self.visualized_environment.get_vehicle(vehicle.id)
+        )
 
-        # VehicleReady
-        if isinstance(event, VehicleReady):
-            vehicle = VisualizedVehicle.from_vehicle_and_route(event.vehicle, event._VehicleReady__route)
-            self.add_update(
-                Update(
-                    UpdateType.CREATE_VEHICLE,
-                    vehicle,
-                    event.time,
-                ),
-                environment,
+        if stops_delta_update is not None:
+            stops_update = Update(UpdateType.UPDATE_VEHICLE_STOPS_DELTA, stops_delta_update, event.time)
+        else:
+            stops_update = Update(
+                UpdateType.UPDATE_VEHICLE_STOPS, VehicleStopsUpdate.from_vehicle_and_route(vehicle, route), event.time
             )
-            return f"{event.time} TODO VehicleReady"
-
-        # VehicleNotification
-        if isinstance(event, VehicleNotification):
-            self.vehicle_notification_event_queue.append(event)
-            self.last_queued_event_time = event.time
-            return f"{event.time} TODO VehicleNotification"
 
-        # VehicleBoarded
-        if isinstance(event, VehicleBoarded):
-            return f"{event.time} TODO VehicleBoarded"
+        self.add_update(stops_update, environment)
 
-        # VehicleAlighted
-        if isinstance(event, VehicleAlighted):
-            return f"{event.time} TODO VehicleAlighted"
-
-        # VehicleUpdatePositionEvent
-        if isinstance(event, VehicleUpdatePositionEvent):
-            # Do nothing ?
-            return f"{event.time} TODO VehicleUpdatePositionEvent"
-
-        # RecurrentTimeSyncEvent
-        if isinstance(event, RecurrentTimeSyncEvent):
-            # Do nothing ?
-            return f"{event.time} TODO RecurrentTimeSyncEvent"
-
-        # Hold
-        if isinstance(event, Hold):
-            # Do nothing ?
-            return f"{event.time} TODO Hold"
+    def __process_vehicle_ready(self, event: VehicleReady, environment: Environment) -> None:
+        vehicle = VisualizedVehicle.from_vehicle_and_route(event.vehicle, event._VehicleReady__route)
+        self.add_update(
+            Update(
+                UpdateType.CREATE_VEHICLE,
+                vehicle,
+                event.time,
+            ),
+            environment,
+        )
 
-        raise NotImplementedError(f"Event {event} not implemented")
+    def __process_vehicle_notification(self, event: VehicleNotification, environment: Environment) -> None:
+        self.vehicle_notification_event_queue.append(event)
+        self.last_queued_event_time = event.time
+
+    # pylint: enable=unused-argument
+
+    # Handlers of the events, an event is handled by the first entry its type is a subclass of
+    __EVENT_HANDLERS: list[tuple[type, Callable[[Any, Event, Environment], None]]] = [
+        (Optimize, __process_ignored_event),
+        (EnvironmentUpdate, __process_ignored_event),
+        (EnvironmentIdle, __process_environment_idle),
+        (PassengerRelease, __process_passenger_release),
+        (PassengerAssignment, __process_passenger_assignment),
+        (PassengerReady, __process_passenger_ready),
+        (PassengerToBoard, __process_passenger_boarding_or_alighting),
+        (PassengerAlighting, __process_passenger_boarding_or_alighting),
+        (VehicleWaiting, __process_vehicle_status_change),
+        (VehicleBoarding, __process_vehicle_status_change),
+        (VehicleDeparture, __process_vehicle_departure),
+        (VehicleArrival, __process_vehicle_arrival),
+        (VehicleComplete, __process_vehicle_status_change),
+        (VehicleReady, __process_vehicle_ready),
+        (VehicleNotification, __process_vehicle_notification),
+        (VehicleBoarded, __process_ignored_event),
+        (VehicleAlighted, __process_ignored_event),
+        (VehicleUpdatePositionEvent, __process_ignored_event),
+        (RecurrentTimeSyncEvent, __process_ignored_event),
+        (Hold, __process_ignored_event),
+    ]
+
+    # Handlers resolved from __EVENT_HANDLERS by concrete event type
+    __event_handlers_by_type: dict[type, tuple[Callable[[Any, Event, Environment], None], str]] = {}
 
     # MARK: +- Clean Up
     def clean_up(self, env):
+        # Write the remaining buffered updates before marking the simulation as ended
+        self.state_writer.close()
+
         self.simulation_information.simulation_end_time = self.visualized_environment.timestamp
         self.simulation_information.last_update_order = self.visualized_environment.order
 
         SimulationVisualizationDataManager.set_simulation_information(self.simulation_id, self.simulation_information)
 
+        # Nothing is written to the simulation after this point
+        SimulationVisualizationDataManager.seal_simulation(self.simulation_id)
+
+        self.log(
+            f"Simulation ended at {self.simulation_information.simulation_end_time} "
+            f"after {self.event_counter} events",
+            is_lifecycle_message=True,
+        )
+
+        # Send the last messages before disconnecting
+        if self.outbound_channel is not None:
+            self.outbound_channel.stop()
+            self.logger.log_lifecycle(f"Outbound messages: {self.outbound_channel}")
+
         if self.stop_event is not None:
             self.stop_event.set()
 
@@ -721,3 +763,5 @@ class SimulationVisualizationDataCollector(DataCollector):
 
         if self.sio is not None:
             self.sio.wait()
+
+        self.logger.close()
@@ -1,10 +1,21 @@
+import bisect
 import json
 import math
 import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import nullcontext
 from enum import Enum
+from itertools import chain
+from typing import BinaryIO, Callable
 
 import multimodalsim.optimization.dispatcher  # To avoid circular import error
-from filelock import FileLock
+from filelock import FileLock, Timeout
 from multimodalsim.simulator.environment import Environment
 from multimodalsim.simulator.request import Leg, Trip
 from multimodalsim.simulator.stop import Stop
@@ -12,8 +23,30 @@ from multimodalsim.simulator.vehicle import Route, Vehicle
 from multimodalsim.state_machine.status import PassengerStatus, VehicleStatus
 
 from multimodalsim_viewer.common.utils import (
+    COMPATIBLE_SAVE_VERSIONS,
+    POLYLINES_LEVELS_OF_DETAIL_TOLERANCES,
     SAVE_VERSION,
     SIMULATION_SAVE_FILE_SEPARATOR,
+    STATE_CACHE_MAX_SIZE,
+    STATE_COMPRESSION,
+    STATE_SAVE_MAX_BYTES,
+    STATE_SAVE_MAX_TIME_SPAN,
+    STATE_SAVE_STEP,
+    UPDATE_WRITE_BATCH_SIZE,
+    UPDATE_WRITE_FLUSH_INTERVAL,
+    SaveDurability,
+    StateCompression,
+)
+from multimodalsim_viewer.server.polylines_simplification import (
+    simplify_encoded_polyline,
+)
+from multimodalsim_viewer.server.simulation_visualization_save_codec import (
+    SaveCodec,
+    compress_state_file_content,
+    decompress_state_file_content,
+    get_compressed_state_file_extension,
+    get_save_codec,
+    verify_state_compression_is_available,
 )
 
 
@@ -93,6 +126,51 @@ class Serializable:
         raise NotImplementedError()
 
 
+# MARK: Route Stop Indices
+class RouteStopIndices:
+    """
+    Indices of the stops of a route (previous stops, current stop and next stops) where each trip boards and alights.
+
+    A trip has one index per leg it has on the vehicle of the route, in the order of the stops.
+    """
+
+    boarding_stop_indices: dict[Trip, list[int]]
+    alighting_stop_indices: dict[Trip, list[int]]
+
+    def __init__(self, route: Route) -> None:
+        self.boarding_stop_indices = {}
+        self.alighting_stop_indices = {}
+
+        all_stops = route.previous_stops + ([route.current_stop] if route.current_stop is not None else [])
+        all_stops += route.next_stops
+
+        for index, stop in enumerate(all_stops):
+            for trip in chain(stop.passengers_to_board, stop.boarding_passengers, stop.boarded_passengers):
+                trip_stop_indices = self.boarding_stop_indices.setdefault(trip, [])
+                # A trip can be in several lists of the same stop
+                if len(trip_stop_indices) == 0 or trip_stop_indices[-1] != index:
+                    trip_stop_indices.append(index)
+
+            for trip in chain(stop.passengers_to_alight, stop.alighting_passengers, stop.alighted_passengers):
+                trip_stop_indices = self.alighting_stop_indices.setdefault(trip, [])
+                if len(trip_stop_indices) == 0 or trip_stop_indices[-1] != index:
+                    trip_stop_indices.append(index)
+
+    def get_boarding_stop_index(self, trip: Trip, same_vehicle_leg_index: int) -> int | None:
+        """
+        Get the index of the stop where the trip boards for its leg of the given index among its legs on the vehicle.
+        """
+        trip_stop_indices = self.boarding_stop_indices.get(trip, [])
+        return trip_stop_indices[same_vehicle_leg_index] if same_vehicle_leg_index < len(trip_stop_indices) else None
+
+    def get_alighting_stop_index(self, trip: Trip, same_vehicle_leg_index: int) -> int | None:
+        """
+        Get the index of the stop where the trip alights for its leg of the given index among its legs on the vehicle.
+        """
+        trip_stop_indices = self.alighting_stop_indices.get(trip, [])
+        return trip_stop_indices[same_vehicle_leg_index] if same_vehicle_leg_index < len(trip_stop_indices) else None
+
+
 # MARK: Leg
 class VisualizedLeg(Serializable):
     assigned_vehicle_id: str | None
@@ -125,7 +203,14 @@ class VisualizedLeg(Serializable):
         environment: Environment,
         trip: Trip,
         previous_leg: Leg | None = None,
+        route_stop_indices: dict[str, RouteStopIndices] | None = None,
     ) -> "VisualizedLeg":
+        """
+        Build the visualized leg of a trip.
+
+        The stop indices of the routes are cached in route_stop_indices (by vehicle id) when it is given. The cache
+        must be cleared whenever the routes change.
+        """
         boarding_stop_index = None
         alighting_stop_index = None
 
@@ -136,39 +221,23 @@ class VisualizedLeg(Serializable):
         all_legs = trip.previous_legs + ([trip.current_leg] if trip.current_leg else []) + trip.next_legs
 
         same_vehicle_leg_index = 0
-        for i, other_leg in enumerate(all_legs):
+        for other_leg in all_legs:
             if other_leg.assigned_vehicle == leg.assigned_vehicle:
                 if other_leg == leg:
                     break
                 same_vehicle_leg_index += 1
 
         if route is not None:
-            all_stops = route.previous_stops.copy()
-            if route.current_stop is not None:
-                all_stops.append(route.current_stop)
-            all_stops += route.next_stops
-
-            trip_found_count = 0
-
-            for i, stop in enumerate(all_stops):
-                if boarding_stop_index is None and trip in (
-                    stop.passengers_to_board + stop.boarding_passengers + stop.boarded_passengers
-                ):
-                    if trip_found_count == same_vehicle_leg_index:
-                        boarding_stop_index = i
-                        break
-                    trip_found_count += 1
-
-            trip_found_count = 0
+            if route_stop_indices is None:
+                stop_indices = RouteStopIndices(route)
+            else:
+                stop_indices = route_stop_indices.get(leg.assigned_vehicle.id, None)
+                if stop_indices is None:
+                    stop_indices = RouteStopIndices(route)
+                    route_stop_indices[leg.assigned_vehicle.id] = stop_indices
 
-            for i, stop in enumerate(all_stops):
-                if alighting_stop_index is None and trip in (
-                    stop.passengers_to_alight + stop.alighting_passengers + stop.alighted_passengers
-                ):
-                    if trip_found_count == same_vehicle_leg_index:
-                        alighting_stop_index = i
-                        break
-                    trip_found_count += 1
+            boarding_stop_index = stop_indices.get_boarding_stop_index(trip, same_vehicle_leg_index)
+            alighting_stop_index = stop_indices.get_alighting_stop_index(trip, same_vehicle_leg_index)
 
         assigned_vehicle_id = leg.assigned_vehicle.id if leg.assigned_vehicle is not None else None
 
@@ -263,16 +332,25 @@ class VisualizedPassenger(Serializable):
         self.next_legs = next_legs
 
     @classmethod
-    def from_trip_and_environment(cls, trip: Trip, environment: Environment) -> "VisualizedPassenger":
+    def from_trip_and_environment(
+        cls,
+        trip: Trip,
+        environment: Environment,
+        route_stop_indices: dict[str, RouteStopIndices] | None = None,
+    ) -> "VisualizedPassenger":
         previous_legs = [
-            VisualizedLeg.from_leg_environment_and_trip(leg, environment, trip) for leg in trip.previous_legs
+            VisualizedLeg.from_leg_environment_and_trip(leg, environment, trip, None, route_stop_indices)
+            for leg in trip.previous_legs
         ]
         current_leg = (
-            VisualizedLeg.from_leg_environment_and_trip(trip.current_leg, environment, trip)
+            VisualizedLeg.from_leg_environment_and_trip(trip.current_leg, environment, trip, None, route_stop_indices)
             if trip.current_leg is not None
             else None
         )
-        next_legs = [VisualizedLeg.from_leg_environment_and_trip(leg, environment, trip) for leg in trip.next_legs]
+        next_legs = [
+            VisualizedLeg.from_leg_environment_and_trip(leg, environment, trip, None, route_stop_indices)
+            for leg in trip.next_legs
+        ]
 
         return cls(
             trip.id,
@@ -573,6 +651,41 @@ class VisualizedEnvironment(Serializable):
             return self.vehicles[vehicle_id]
         raise ValueError(f"Vehicle {vehicle_id} not found")
 
+    def apply_update(self, update: "Update") -> None:
+        if update.update_type == UpdateType.CREATE_PASSENGER:
+            self.add_passenger(update.data)
+        elif update.update_type == UpdateType.CREATE_VEHICLE:
+            self.add_vehicle(update.data)
+        elif update.update_type == UpdateType.UPDATE_PASSENGER_STATUS:
+            passenger = self.get_passenger(update.data.passenger_id)
+            passenger.status = update.data.status
+        elif update.update_type == UpdateType.UPDATE_PASSENGER_LEGS:
+            passenger = self.get_passenger(update.data.passenger_id)
+            legs_update: PassengerLegsUpdate = update.data
+            passenger.previous_legs = legs_update.previous_legs
+            passenger.next_legs = legs_update.next_legs
+            passenger.current_leg = legs_update.current_leg
+        elif update.update_type == UpdateType.UPDATE_PASSENGER_LEGS_DELTA:
+            passenger = self.get_passenger(update.data.passenger_id)
+            legs_delta_update: PassengerLegsDeltaUpdate = update.data
+            legs_delta_update.apply(passenger)
+        elif update.update_type == UpdateType.UPDATE_VEHICLE_STATUS:
+            vehicle = self.get_vehicle(update.data.vehicle_id)
+            vehicle.status = update.data.status
+        elif update.update_type == UpdateType.UPDATE_VEHICLE_STOPS:
+            vehicle = self.get_vehicle(update.data.vehicle_id)
+            stops_update: VehicleStopsUpdate = update.data
+            vehicle.previous_stops = stops_update.previous_stops
+            vehicle.next_stops = stops_update.next_stops
+            vehicle.current_stop = stops_update.current_stop
+        elif update.update_type == UpdateType.UPDATE_VEHICLE_STOPS_DELTA:
+            vehicle = self.get_vehicle(update.data.vehicle_id)
+            stops_delta_update: VehicleStopsDeltaUpdate = update.data
+            stops_delta_update.apply(vehicle)
+        elif update.update_type == UpdateType.UPDATE_STATISTIC:
+            statistic_update: StatisticUpdate = update.data
+            self.statistic = statistic_update.statistic
+
     def serialize(self) -> dict:
         return {
             "passengers": [passenger.serialize() for passenger in self.passengers.values()],
@@ -624,6 +737,8 @@ class UpdateType(Enum):
     UPDATE_VEHICLE_STATUS = "updateVehicleStatus"
     UPDATE_VEHICLE_STOPS = "updateVehicleStops"
     UPDATE_STATISTIC = "updateStatistic"
+    UPDATE_VEHICLE_STOPS_DELTA = "updateVehicleStopsDelta"
+    UPDATE_PASSENGER_LEGS_DELTA = "updatePassengerLegsDelta"
 
 
 class StatisticUpdate(Serializable):
@@ -643,7 +758,7 @@ class StatisticUpdate(Serializable):
         if "statistic" not in data:
             raise ValueError("Invalid data for StatisticUpdate")
 
-        return StatisticUpdate(data.statistic)
+        return StatisticUpdate(data["statistic"])
 
 
 class PassengerStatusUpdate(Serializable):
@@ -701,6 +816,7 @@ class PassengerLegsUpdate(Serializable):
         trip: Trip,
         environment: Environment,
         previous_passenger: VisualizedPassenger,
+        route_stop_indices: dict[str, RouteStopIndices] | None = None,
     ) -> "PassengerLegsUpdate":
         all_previous_legs = (
             previous_passenger.previous_legs
@@ -715,14 +831,18 @@ class PassengerLegsUpdate(Serializable):
             if current_index < len(all_previous_legs):
                 previous_leg = all_previous_legs[current_index]
                 current_index += 1
-            previous_legs.append(VisualizedLeg.from_leg_environment_and_trip(leg, environment, trip, previous_leg))
+            previous_legs.append(
+                VisualizedLeg.from_leg_environment_and_trip(leg, environment, trip, previous_leg, route_stop_indices)
+            )
 
         previous_leg = None
         if trip.current_leg is not None and current_index < len(all_previous_legs):
             previous_leg = all_previous_legs[current_index]
             current_index += 1
         current_leg = (
-            VisualizedLeg.from_leg_environment_and_trip(trip.current_leg, environment, trip, previous_leg)
+            VisualizedLeg.from_leg_environment_and_trip(
+                trip.current_leg, environment, trip, previous_leg, route_stop_indices
+            )
             if trip.current_leg is not None
             else None
         )
@@ -733,7 +853,9 @@ class PassengerLegsUpdate(Serializable):
             if current_index < len(all_previous_legs):
                 next_leg = all_previous_legs[current_index]
                 current_index += 1
-            next_legs.append(VisualizedLeg.from_leg_environment_and_trip(leg, environment, trip, next_leg))
+            next_legs.append(
+                VisualizedLeg.from_leg_environment_and_trip(leg, environment, trip, next_leg, route_stop_indices)
+            )
 
         return cls(trip.id, previous_legs, current_leg, next_legs)
 
@@ -768,6 +890,142 @@ class PassengerLegsUpdate(Serializable):
         return PassengerLegsUpdate(passenger_id, previous_legs, current_leg, next_legs)
 
 
+class PassengerLegsDeltaUpdate(Serializable):
+    """
+    Change of the legs of a passenger since its last update.
+
+    The legs of the passenger are seen as a single list (previous legs, current leg and next legs). The update moves
+    the cursor that splits this list and only contains the legs whose fields changed or that were added.
+    """
+
+    passenger_id: str
+    number_of_previous_legs: int
+    has_current_leg: bool
+    number_of_legs: int
+    changed_legs: dict[int, VisualizedLeg]
+
+    def __init__(
+        self,
+        passenger_id: str,
+        number_of_previous_legs: int,
+        has_current_leg: bool,
+        number_of_legs: int,
+        changed_legs: dict[int, VisualizedLeg],
+    ) -> None:
+        self.passenger_id = passenger_id
+        self.number_of_previous_legs = number_of_previous_legs
+        self.has_current_leg = has_current_leg
+        self.number_of_legs = number_of_legs
+        self.changed_legs = changed_legs
+
+    @staticmethod
+    def __is_same_leg(leg: VisualizedLeg, other_leg: VisualizedLeg) -> bool:
+        return (
+            leg.assigned_vehicle_id == other_leg.assigned_vehicle_id
+            and leg.boarding_stop_index == other_leg.boarding_stop_index
+            and leg.alighting_stop_index == other_leg.alighting_stop_index
+            and leg.boarding_time == other_leg.boarding_time
+            and leg.alighting_time == other_leg.alighting_time
+            and leg.assigned_time == other_leg.assigned_time
+        )
+
+    @classmethod
+    def from_legs_update_and_previous_passenger(
+        cls,
+        legs_update: PassengerLegsUpdate,
+        previous_passenger: VisualizedPassenger,
+    ) -> "PassengerLegsDeltaUpdate | None":
+        """
+        Get the change of the legs of the passenger, or None if most of them changed (the full update is smaller).
+        """
+        legs = (
+            legs_update.previous_legs
+            + ([legs_update.current_leg] if legs_update.current_leg is not None else [])
+            + legs_update.next_legs
+        )
+        previous_legs = (
+            previous_passenger.previous_legs
+            + ([previous_passenger.current_leg] if previous_passenger.current_leg is not None else [])
+            + previous_passenger.next_legs
+        )
+
+        changed_legs = {
+            index: leg
+            for index, leg in enumerate(legs)
+            if index >= len(previous_legs) or not cls.__is_same_leg(leg, previous_legs[index])
+        }
+
+        if len(changed_legs) > len(legs) // 2:
+            return None
+
+        return cls(
+            legs_update.passenger_id,
+            len(legs_update.previous_legs),
+            legs_update.current_leg is not None,
+            len(legs),
+            changed_legs,
+        )
+
+    def apply(self, passenger: VisualizedPassenger) -> None:
+        legs = (
+            passenger.previous_legs
+            + ([passenger.current_leg] if passenger.current_leg is not None else [])
+            + passenger.next_legs
+        )[: self.number_of_legs]
+        for index, leg in self.changed_legs.items():
+            if index < len(legs):
+                legs[index] = leg
+            else:
+                legs.append(leg)
+
+        if len(legs) != self.number_of_legs:
+            raise ValueError(f"Invalid legs delta for passenger {self.passenger_id}")
+
+        number_of_current_legs = 1 if self.has_current_leg else 0
+
+        passenger.previous_legs = legs[: self.number_of_previous_legs]
+        passenger.current_leg = legs[self.number_of_previous_legs] if self.has_current_leg else None
+        passenger.next_legs = legs[self.number_of_previous_legs + number_of_current_legs :]
+
+    def serialize(self) -> dict:
+        return {
+            "id": self.passenger_id,
+            "previousLegsCount": self.number_of_previous_legs,
+            "hasCurrentLeg": self.has_current_leg,
+            "legsCount": self.number_of_legs,
+            "changedLegs": [
+                {"index": index, "leg": leg.serialize()} for index, leg in sorted(self.changed_legs.items())
+            ],
+        }
+
+    @staticmethod
+    def deserialize(data: str) -> "PassengerLegsDeltaUpdate":
+        if isinstance(data, str):
+            data = json.loads(data.replace("'", '"'))
+
+        if (
+            "id" not in data
+            or "previousLegsCount" not in data
+            or "hasCurrentLeg" not in data
+            or "legsCount" not in data
+            or "changedLegs" not in data
+        ):
+            raise ValueError("Invalid data for PassengerLegsDeltaUpdate")
+
+        passenger_id = str(data["id"])
+        number_of_previous_legs = int(data["previousLegsCount"])
+        has_current_leg = bool(data["hasCurrentLeg"])
+        number_of_legs = int(data["legsCount"])
+        changed_legs = {
+            int(changed_leg["index"]): VisualizedLeg.deserialize(changed_leg["leg"])
+            for changed_leg in data["changedLegs"]
+        }
+
+        return PassengerLegsDeltaUpdate(
+            passenger_id, number_of_previous_legs, has_current_leg, number_of_legs, changed_legs
+        )
+
+
 class VehicleStatusUpdate(Serializable):
     vehicle_id: str
     status: VehicleStatus
@@ -855,6 +1113,136 @@ class VehicleStopsUpdate(Serializable):
         return VehicleStopsUpdate(vehicle_id, previous_stops, current_stop, next_stops)
 
 
+class VehicleStopsDeltaUpdate(Serializable):
+    """
+    Change of the stops of a vehicle since its last update.
+
+    The stops of the vehicle are seen as a single list (previous stops, current stop and next stops). The update moves
+    the cursor that splits this list and only contains the stops that changed or were added, so its size does not
+    depend on the length of the route.
+    """
+
+    vehicle_id: str
+    number_of_previous_stops: int
+    has_current_stop: bool
+    number_of_stops: int
+    changed_stops: dict[int, VisualizedStop]
+
+    def __init__(
+        self,
+        vehicle_id: str,
+        number_of_previous_stops: int,
+        has_current_stop: bool,
+        number_of_stops: int,
+        changed_stops: dict[int, VisualizedStop],
+    ) -> None:
+        self.vehicle_id = vehicle_id
+        self.number_of_previous_stops = number_of_previous_stops
+        self.has_current_stop = has_current_stop
+        self.number_of_stops = number_of_stops
+        self.changed_stops = changed_stops
+
+    @staticmethod
+    def __is_same_stop(stop: VisualizedStop, other_stop: VisualizedStop) -> bool:
+        return (
+            stop.arrival_time == other_stop.arrival_time
+            and stop.departure_time == other_stop.departure_time
+            and stop.latitude == other_stop.latitude
+            and stop.longitude == other_stop.longitude
+            and stop.capacity == other_stop.capacity
+            and stop.label == other_stop.label
+        )
+
+    @classmethod
+    def from_vehicle_route_and_previous_vehicle(
+        cls, vehicle: Vehicle, route: Route, previous_vehicle: VisualizedVehicle
+    ) -> "VehicleStopsDeltaUpdate | None":
+        """
+        Get the change of the stops of the vehicle, or None if most of them changed (the route has been
+        planned again).
+        """
+        stops_update = VehicleStopsUpdate.from_vehicle_and_route(vehicle, route)
+
+        stops = (
+            stops_update.previous_stops
+            + ([stops_update.current_stop] if stops_update.current_stop is not None else [])
+            + stops_update.next_stops
+        )
+        previous_stops = previous_vehicle.all_stops
+
+        changed_stops = {
+            index: stop
+            for index, stop in enumerate(stops)
+            if index >= len(previous_stops) or not cls.__is_same_stop(stop, previous_stops[index])
+        }
+
+        if len(changed_stops) > len(stops) // 2:
+            return None
+
+        return cls(
+            stops_update.vehicle_id,
+            len(stops_update.previous_stops),
+            stops_update.current_stop is not None,
+            len(stops),
+            changed_stops,
+        )
+
+    def apply(self, vehicle: VisualizedVehicle) -> None:
+        stops = vehicle.all_stops[: self.number_of_stops]
+        for index, stop in self.changed_stops.items():
+            if index < len(stops):
+                stops[index] = stop
+            else:
+                stops.append(stop)
+
+        if len(stops) != self.number_of_stops:
+            raise ValueError(f"Invalid stops delta for vehicle {self.vehicle_id}")
+
+        number_of_current_stops = 1 if self.has_current_stop else 0
+
+        vehicle.previous_stops = stops[: self.number_of_previous_stops]
+        vehicle.current_stop = stops[self.number_of_previous_stops] if self.has_current_stop else None
+        vehicle.next_stops = stops[self.number_of_previous_stops + number_of_current_stops :]
+
+    def serialize(self) -> dict:
+        return {
+            "id": self.vehicle_id,
+            "previousStopsCount": self.number_of_previous_stops,
+            "hasCurrentStop": self.has_current_stop,
+            "stopsCount": self.number_of_stops,
+            "changedStops": [
+                {"index": index, "stop": stop.serialize()} for index, stop in sorted(self.changed_stops.items())
+            ],
+        }
+
+    @staticmethod
+    def deserialize(data: str) -> "VehicleStopsDeltaUpdate":
+        if isinstance(data, str):
+            data = json.loads(data.replace("'", '"'))
+
+        if (
+            "id" not in data
+            or "previousStopsCount" not in data
+            or "hasCurrentStop" not in data
+            or "stopsCount" not in data
+            or "changedStops" not in data
+        ):
+            raise ValueError("Invalid data for VehicleStopsDeltaUpdate")
+
+        vehicle_id = str(data["id"])
+        number_of_previous_stops = int(data["previousStopsCount"])
+        has_current_stop = bool(data["hasCurrentStop"])
+        number_of_stops = int(data["stopsCount"])
+        changed_stops = {
+            int(changed_stop["index"]): VisualizedStop.deserialize(changed_stop["stop"])
+            for changed_stop in data["changedStops"]
+        }
+
+        return VehicleStopsDeltaUpdate(
+            vehicle_id, number_of_previous_stops, has_current_stop, number_of_stops, changed_stops
+        )
+
+
 class Update(Serializable):
     update_type: UpdateType
     data: Serializable
@@ -906,6 +1294,10 @@ class Update(Serializable):
             update_data = VehicleStopsUpdate.deserialize(update_data)
         elif update_type == UpdateType.UPDATE_STATISTIC:
             update_data = StatisticUpdate.deserialize(update_data)
+        elif update_type == UpdateType.UPDATE_VEHICLE_STOPS_DELTA:
+            update_data = VehicleStopsDeltaUpdate.deserialize(update_data)
+        elif update_type == UpdateType.UPDATE_PASSENGER_LEGS_DELTA:
+            update_data = PassengerLegsDeltaUpdate.deserialize(update_data)
 
         update = Update(update_type, update_data, timestamp)
         update.order = data["order"]
@@ -959,6 +1351,73 @@ class VisualizedState(VisualizedEnvironment):
         return state
 
 
+# MARK: State Save Policy
+class StateSavePolicy(Serializable):
+    """
+    Limits of the states of a simulation, a new state is saved as soon as the current one reaches one of them.
+
+    The byte and time span limits are optional.
+    """
+
+    max_updates: int
+    max_bytes: int | None
+    max_time_span: float | None
+
+    def __init__(
+        self,
+        max_updates: int = STATE_SAVE_STEP,
+        max_bytes: int | None = STATE_SAVE_MAX_BYTES,
+        max_time_span: float | None = STATE_SAVE_MAX_TIME_SPAN,
+    ) -> None:
+        if max_updates < 1:
+            raise ValueError(f"The maximum number of updates of a state must be at least 1, got {max_updates}")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError(f"The maximum size of a state must be at least 1 byte, got {max_bytes}")
+        if max_time_span is not None and max_time_span <= 0:
+            raise ValueError(f"The maximum time span of a state must be positive, got {max_time_span}")
+
+        self.max_updates = max_updates
+        self.max_bytes = max_bytes
+        self.max_time_span = max_time_span
+
+    def is_state_full(self, update_count: int, updates_byte_length: int, time_span: float) -> bool:
+        """
+        Get whether a new state should be saved before the next update, given the number of updates of the current
+        state, their size in bytes and the simulated time between the state and the next update.
+        """
+        # A state always has at least one update
+        if update_count == 0:
+            return False
+
+        return (
+            update_count >= self.max_updates
+            or (self.max_bytes is not None and updates_byte_length >= self.max_bytes)
+            or (self.max_time_span is not None and time_span >= self.max_time_span)
+        )
+
+    def serialize(self) -> dict:
+        serialized = {"maxUpdates": self.max_updates}
+        if self.max_bytes is not None:
+            serialized["maxBytes"] = self.max_bytes
+        if self.max_time_span is not None:
+            serialized["maxTimeSpan"] = self.max_time_span
+        return serialized
+
+    @staticmethod
+    def deserialize(data: str) -> "StateSavePolicy":
+        if isinstance(data, str):
+            data = json.loads(data.replace("'", '"'))
+
+        if "maxUpdates" not in data:
+            raise ValueError("Invalid data for StateSavePolicy")
+
+        return StateSavePolicy(
+            int(data["maxUpdates"]),
+            data.get("maxBytes", None),
+            data.get("maxTimeSpan", None),
+        )
+
+
 # MARK: Simulation Information
 class SimulationInformation(Serializable):
     version: int
@@ -969,6 +1428,10 @@ class SimulationInformation(Serializable):
     simulation_start_time: float | None
     simulation_end_time: float | None
     last_update_order: int | None
+    # None for the simulations saved before the policy could be configured
+    state_save_policy: StateSavePolicy | None
+    # None for the simulations saved before the state files could be compressed
+    state_compression: StateCompression | None
 
     def __init__(
         self,
@@ -978,6 +1441,8 @@ class SimulationInformation(Serializable):
         simulation_end_time: str | None,
         last_update_order: int | None,
         version: int | None,
+        state_save_policy: StateSavePolicy | None = None,
+        state_compression: StateCompression | None = None,
     ) -> None:
         self.version = version
         if self.version is None:
@@ -992,6 +1457,8 @@ class SimulationInformation(Serializable):
         self.simulation_start_time = simulation_start_time
         self.simulation_end_time = simulation_end_time
         self.last_update_order = last_update_order
+        self.state_save_policy = state_save_policy
+        self.state_compression = state_compression
 
     def serialize(self) -> dict:
         serialized = {
@@ -1007,6 +1474,10 @@ class SimulationInformation(Serializable):
             serialized["simulationEndTime"] = self.simulation_end_time
         if self.last_update_order is not None:
             serialized["lastUpdateOrder"] = self.last_update_order
+        if self.state_save_policy is not None:
+            serialized["stateSavePolicy"] = self.state_save_policy.serialize()
+        if self.state_compression is not None:
+            serialized["stateCompression"] = self.state_compression.value
         return serialized
 
     @staticmethod
@@ -1025,6 +1496,14 @@ class SimulationInformation(Serializable):
         simulation_end_time = data.get("simulationEndTime", None)
         last_update_order = data.get("lastUpdateOrder", None)
 
+        state_save_policy = data.get("stateSavePolicy", None)
+        if state_save_policy is not None:
+            state_save_policy = StateSavePolicy.deserialize(state_save_policy)
+
+        state_compression = data.get("stateCompression", None)
+        if state_compression is not None:
+            state_compression = StateCompression(state_compression)
+
         return SimulationInformation(
             simulation_id,
             simulation_data,
@@ -1032,124 +1511,822 @@ class SimulationInformation(Serializable):
             simulation_end_time,
             last_update_order,
             version,
+            state_save_policy,
+            state_compression,
         )
 
 
-# TODO Send it to client
-# def get_size(start_path: str) -> int:
-#     total_size = 0
-#     for directory_path, _, file_names in os.walk(start_path):
-#         for file_name in file_names:
-#             file_path = os.path.join(directory_path, file_name)
-#             total_size += os.path.getsize(file_path)
-#     return total_size
-
-
-# MARK: SVDM
-class SimulationVisualizationDataManager:
+# MARK: State Index
+class StateIndexEntry:
     """
-    This class manage reads and writes of simulation data for visualization.
+    Entry of the state index of a simulation.
+
+    Entries are appended when a state is started and when it is completed. The last entry of an order
+    replaces the previous ones.
     """
 
-    __CORRUPTED_FILE_NAME = ".corrupted"
-    __SAVED_SIMULATIONS_DIRECTORY_NAME = "saved_simulations"
-    __SIMULATION_INFORMATION_FILE_NAME = "simulation_information.json"
-    __STATES_DIRECTORY_NAME = "states"
-    __POLYLINES_DIRECTORY_NAME = "polylines"
-    __POLYLINES_FILE_NAME = "polylines"
-    __POLYLINES_VERSION_FILE_NAME = "version"
+    STRUCT = struct.Struct("<QdQQ")
 
-    __STATES_ORDER_MINIMUM_LENGTH = 8
-    __STATES_TIMESTAMP_MINIMUM_LENGTH = 8
+    order: int
+    timestamp: float
+    byte_length: int
+    update_count: int
 
-    # Only send a maximum of __MAX_STATES_AT_ONCE states at once
-    # This should be at least 2
-    __MAX_STATES_AT_ONCE = 2
+    def __init__(self, order: int, timestamp: float, byte_length: int, update_count: int) -> None:
+        self.order = order
+        self.timestamp = timestamp
+        self.byte_length = byte_length
+        self.update_count = update_count
 
-    # The client keeps a maximum of __MAX_STATES_IN_CLIENT_BEFORE_NECESSARY + __MAX_STATES_IN_CLIENT_AFTER_NECESSARY + 1
-    # states in memory
-    # The current one, the previous __MAX_STATES_IN_CLIENT_BEFORE_NECESSARY and
-    # the next __MAX_STATES_IN_CLIENT_AFTER_NECESSARY
-    # __MAX_STATES_IN_CLIENT_BEFORE_NECESSARY = 24
-    # __MAX_STATES_IN_CLIENT_AFTER_NECESSARY = 50
+    def pack(self) -> bytes:
+        return StateIndexEntry.STRUCT.pack(self.order, self.timestamp, self.byte_length, self.update_count)
 
-    # MARK: +- Format
-    @staticmethod
-    def __format_json_readable(data: dict, file: str) -> str:
-        return json.dump(data, file, indent=2, separators=(",", ": "), sort_keys=True)
 
-    @staticmethod
-    def __format_json_one_line(data: dict, file: str) -> str:
-        # Add new line before if not empty
-        if file.tell() != 0:
-            file.write("\n")
-        return json.dump(data, file, separators=(",", ":"))
+class SimulationStateIndex:
+    """
+    In-memory copy of the state index of a simulation, refreshed incrementally from the index file.
+    """
 
-    # MARK: +- File paths
-    @staticmethod
-    def get_saved_simulations_directory_path() -> str:
-        current_directory = os.path.dirname(os.path.abspath(__file__))
-        directory_path = f"{current_directory}/{SimulationVisualizationDataManager.__SAVED_SIMULATIONS_DIRECTORY_NAME}"
+    file_path: str
+    entries_by_order: dict[int, StateIndexEntry]
 
-        if not os.path.exists(directory_path):
-            os.makedirs(directory_path)
+    # Sorted by (timestamp, order)
+    sorted_states: list[tuple[int, float]]
+    sorted_timestamps: list[float]
 
-        return directory_path
+    # Refreshed after the simulation has been sealed, the index cannot change anymore
+    is_complete: bool
 
-    @staticmethod
-    def get_all_saved_simulation_ids() -> list[str]:
-        directory_path = SimulationVisualizationDataManager.get_saved_simulations_directory_path()
-        return os.listdir(directory_path)
+    __file_offset: int
+    __file_identifier: int | None
 
-    @staticmethod
-    def get_saved_simulation_directory_path(simulation_id: str) -> str:
-        directory_path = SimulationVisualizationDataManager.get_saved_simulations_directory_path()
-        simulation_directory_path = f"{directory_path}/{simulation_id}"
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.is_complete = False
+        self.__reset()
 
-        if not os.path.exists(simulation_directory_path):
-            os.makedirs(simulation_directory_path)
+    def __reset(self) -> None:
+        self.entries_by_order = {}
+        self.sorted_states = []
+        self.sorted_timestamps = []
+        self.__file_offset = 0
+        self.__file_identifier = None
 
-        return simulation_directory_path
+    def add_entry(self, entry: StateIndexEntry) -> None:
+        if entry.order not in self.entries_by_order:
+            position = bisect.bisect_right(
+                self.sorted_states, (entry.timestamp, entry.order), key=lambda x: (x[1], x[0])
+            )
+            self.sorted_states.insert(position, (entry.order, entry.timestamp))
+            self.sorted_timestamps.insert(position, entry.timestamp)
 
-    # MARK: +- Corrupted
-    @staticmethod
-    def is_simulation_corrupted(simulation_id: str) -> bool:
-        simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
-            simulation_id
-        )
+        self.entries_by_order[entry.order] = entry
 
-        return os.path.exists(f"{simulation_directory_path}/{SimulationVisualizationDataManager.__CORRUPTED_FILE_NAME}")
+    def refresh(self) -> None:
+        """
+        Read the entries appended to the index file since the last refresh.
+        """
+        if not os.path.exists(self.file_path):
+            # The first state of the simulation has not been saved yet
+            self.__reset()
+            return
 
-    @staticmethod
-    def mark_simulation_as_corrupted(simulation_id: str) -> None:
-        simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
-            simulation_id
-        )
+        file_stat = os.stat(self.file_path)
 
-        file_path = f"{simulation_directory_path}/{SimulationVisualizationDataManager.__CORRUPTED_FILE_NAME}"
+        # The simulation has been replaced (deleted and imported again for example)
+        if file_stat.st_ino != self.__file_identifier or file_stat.st_size < self.__file_offset:
+            self.__reset()
+            self.__file_identifier = file_stat.st_ino
 
-        with open(file_path, "w", encoding="utf-8") as file:
-            file.write("")
+        if file_stat.st_size == self.__file_offset:
+            return
 
-    # MARK: +- Simulation Information
-    @staticmethod
-    def get_saved_simulation_information_file_path(simulation_id: str) -> str:
-        simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
-            simulation_id
-        )
-        file_path = (
-            f"{simulation_directory_path}/{SimulationVisualizationDataManager.__SIMULATION_INFORMATION_FILE_NAME}"
-        )
+        with open(self.file_path, "rb") as file:
+            file.seek(self.__file_offset)
+            content = file.read()
 
-        if not os.path.exists(file_path):
-            with open(file_path, "w", encoding="utf-8") as file:
-                file.write("")
+        # Only read complete entries, the last one might still be written
+        complete_length = len(content) - len(content) % StateIndexEntry.STRUCT.size
 
-        return file_path
+        for order, timestamp, byte_length, update_count in StateIndexEntry.STRUCT.iter_unpack(
+            content[:complete_length]
+        ):
+            self.add_entry(StateIndexEntry(order, timestamp, byte_length, update_count))
 
-    @staticmethod
-    def set_simulation_information(simulation_id: str, simulation_information: SimulationInformation) -> None:
-        file_path = SimulationVisualizationDataManager.get_saved_simulation_information_file_path(simulation_id)
+        self.__file_offset += complete_length
+
+    def get_necessary_state_index(self, visualization_time: float) -> int:
+        """
+        Index in sorted_states of the last state before the visualization time (or the first state).
+        """
+        return max(0, bisect.bisect_right(self.sorted_timestamps, visualization_time) - 1)
+
+
+# MARK: Stop Table
+class SimulationStopTable:
+    """
+    Locations of the stops of a simulation, saved once in the stop table file and identified by their line number.
+
+    States and updates only save the id of the location of a stop and the times of the visit. The writer of the
+    simulation adds the new locations while the readers refresh their copy incrementally from the file.
+    """
+
+    file_path: str
+    locations: list[dict]
+
+    # Refreshed after the simulation has been sealed, the table cannot change anymore
+    is_complete: bool
+
+    __stop_ids_by_location: dict[tuple, int]
+    __file_offset: int
+    __file_identifier: int | None
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.is_complete = False
+        self.__reset()
+
+    def __reset(self) -> None:
+        self.locations = []
+        self.__stop_ids_by_location = {}
+        self.__file_offset = 0
+        self.__file_identifier = None
+
+    @staticmethod
+    def __get_location_key(location: dict) -> tuple:
+        position = location.get("position", {})
+        return (
+            position.get("latitude", None),
+            position.get("longitude", None),
+            location.get("capacity", None),
+            location.get("label", None),
+        )
+
+    def __add_location(self, location: dict) -> int:
+        stop_id = len(self.locations)
+        self.locations.append(location)
+        self.__stop_ids_by_location[SimulationStopTable.__get_location_key(location)] = stop_id
+        return stop_id
+
+    def get_stop_id(self, stop: VisualizedStop) -> int:
+        """
+        Get the id of the location of a stop and save the location if it is new.
+
+        Should only be called by the writer of the simulation.
+        """
+        # Same fields as VisualizedStop.serialize without the times
+        location = {}
+        if stop.latitude is not None and stop.longitude is not None:
+            location["position"] = {"latitude": stop.latitude, "longitude": stop.longitude}
+        if stop.capacity is not None:
+            location["capacity"] = stop.capacity
+        location["label"] = stop.label
+
+        stop_id = self.__stop_ids_by_location.get(SimulationStopTable.__get_location_key(location), None)
+        if stop_id is not None:
+            return stop_id
+
+        # The location is written before the records that refer to it
+        line = (json.dumps(location, separators=(",", ":")) + "\n").encode("utf-8")
+        with open(self.file_path, "ab") as file:
+            file.write(line)
+
+        self.__file_offset += len(line)
+
+        return self.__add_location(location)
+
+    def get_location(self, stop_id: int) -> dict:
+        if stop_id >= len(self.locations):
+            raise ValueError(f"Stop {stop_id} not found in {self.file_path}")
+        return self.locations[stop_id]
+
+    def refresh(self) -> None:
+        """
+        Read the locations appended to the stop table file since the last refresh.
+        """
+        if not os.path.exists(self.file_path):
+            self.__reset()
+            return
+
+        file_stat = os.stat(self.file_path)
+
+        # The simulation has been replaced (deleted and imported again for example)
+        if file_stat.st_ino != self.__file_identifier or file_stat.st_size < self.__file_offset:
+            self.__reset()
+            self.__file_identifier = file_stat.st_ino
+
+        if file_stat.st_size == self.__file_offset:
+            return
+
+        with open(self.file_path, "rb") as file:
+            file.seek(self.__file_offset)
+            content = file.read()
+
+        # Only read complete lines, the last one might still be written
+        complete_length = content.rfind(b"\n") + 1
+
+        for line in content[:complete_length].splitlines():
+            self.__add_location(json.loads(line))
+
+        self.__file_offset += complete_length
+
+
+# MARK: Completed Entities Archive
+class SimulationCompletedEntitiesArchive:
+    """
+    Complete passengers and vehicles of a simulation, saved once in the archive file instead of in every state.
+
+    Each record of the archive is the creation update of an entity (see SaveCodec) whose order is the order of the
+    first state that does not contain the entity anymore. An entity that changes after being archived is saved in the
+    following states again, and archived again once they do not contain it anymore. The readers refresh their copy
+    incrementally from the file.
+    """
+
+    file_path: str
+    orders: list[int]
+    records: list[dict]
+
+    # Entities that are not saved in the states anymore, only known by the writer of the simulation
+    archived_passenger_ids: set[str]
+    archived_vehicle_ids: set[str]
+
+    # Refreshed after the simulation has been sealed, the archive cannot change anymore
+    is_complete: bool
+
+    __file_offset: int
+    __file_identifier: int | None
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.is_complete = False
+        self.archived_passenger_ids = set()
+        self.archived_vehicle_ids = set()
+        self.__reset()
+
+    def archive_completed_entities(
+        self, environment: VisualizedEnvironment, codec: SaveCodec, stop_table: SimulationStopTable, should_sync: bool
+    ) -> VisualizedEnvironment:
+        """
+        Archive the passengers and vehicles that are complete since the last state and get the environment without
+        the archived ones.
+
+        Should only be called by the writer of the simulation, before writing the state of the environment.
+        """
+        records = []
+
+        for passenger in environment.passengers.values():
+            if (
+                passenger.status == PassengerStatus.COMPLETE
+                and passenger.passenger_id not in self.archived_passenger_ids
+            ):
+                records.append(
+                    self.__encode_record(UpdateType.CREATE_PASSENGER, passenger, environment, codec, stop_table)
+                )
+                self.archived_passenger_ids.add(passenger.passenger_id)
+
+        for vehicle in environment.vehicles.values():
+            if vehicle.status == VehicleStatus.COMPLETE and vehicle.vehicle_id not in self.archived_vehicle_ids:
+                records.append(self.__encode_record(UpdateType.CREATE_VEHICLE, vehicle, environment, codec, stop_table))
+                self.archived_vehicle_ids.add(vehicle.vehicle_id)
+
+        if len(records) > 0:
+            with FileLock(f"{self.file_path}.lock"):
+                with open(self.file_path, "ab") as file:
+                    file.write(b"".join(records))
+                    file.flush()
+
+                    if should_sync:
+                        os.fsync(file.fileno())
+
+        active_environment = VisualizedEnvironment()
+        active_environment.passengers = {
+            passenger_id: passenger
+            for passenger_id, passenger in environment.passengers.items()
+            if passenger_id not in self.archived_passenger_ids
+        }
+        active_environment.vehicles = {
+            vehicle_id: vehicle
+            for vehicle_id, vehicle in environment.vehicles.items()
+            if vehicle_id not in self.archived_vehicle_ids
+        }
+        active_environment.statistic = environment.statistic
+        active_environment.timestamp = environment.timestamp
+        active_environment.estimated_end_time = environment.estimated_end_time
+        active_environment.order = environment.order
+
+        return active_environment
+
+    @staticmethod
+    def __encode_record(
+        update_type: UpdateType,
+        entity: VisualizedPassenger | VisualizedVehicle,
+        environment: VisualizedEnvironment,
+        codec: SaveCodec,
+        stop_table: SimulationStopTable,
+    ) -> bytes:
+        update = Update(update_type, entity, environment.timestamp)
+        update.order = environment.order
+        return codec.encode_update(update, stop_table)
+
+    def restore_updated_entity(self, update: Update) -> None:
+        """
+        Save the entity of the update in the next states again if it has been archived.
+
+        Should only be called by the writer of the simulation, for each update.
+        """
+        if update.update_type in (
+            UpdateType.CREATE_PASSENGER,
+            UpdateType.UPDATE_PASSENGER_STATUS,
+            UpdateType.UPDATE_PASSENGER_LEGS,
+            UpdateType.UPDATE_PASSENGER_LEGS_DELTA,
+        ):
+            self.archived_passenger_ids.discard(update.data.passenger_id)
+        elif update.update_type in (
+            UpdateType.CREATE_VEHICLE,
+            UpdateType.UPDATE_VEHICLE_STATUS,
+            UpdateType.UPDATE_VEHICLE_STOPS,
+            UpdateType.UPDATE_VEHICLE_STOPS_DELTA,
+        ):
+            self.archived_vehicle_ids.discard(update.data.vehicle_id)
+
+    def __reset(self) -> None:
+        self.orders = []
+        self.records = []
+        self.__file_offset = 0
+        self.__file_identifier = None
+
+    def refresh(self, codec: SaveCodec, stop_table: SimulationStopTable, is_sealed: bool = False) -> None:
+        """
+        Read the records appended to the archive file since the last refresh.
+
+        The archive of a sealed simulation is read without the file lock.
+        """
+        if not os.path.exists(self.file_path):
+            self.__reset()
+            return
+
+        with nullcontext() if is_sealed else FileLock(f"{self.file_path}.lock"):
+            # The writer only writes complete records while holding the lock
+            file_stat = os.stat(self.file_path)
+
+            # The simulation has been replaced (deleted and imported again for example)
+            if file_stat.st_ino != self.__file_identifier or file_stat.st_size < self.__file_offset:
+                self.__reset()
+                self.__file_identifier = file_stat.st_ino
+
+            if file_stat.st_size == self.__file_offset:
+                return
+
+            with open(self.file_path, "rb") as file:
+                file.seek(self.__file_offset)
+                content = file.read()
+
+        # Refresh after the records since the locations are saved before the records that refer to them
+        stop_table.refresh()
+
+        for record in codec.iter_records(content, stop_table):
+            self.orders.append(record["order"])
+            self.records.append(record)
+
+        self.__file_offset += len(content)
+
+    def get_entities(self, order: int) -> tuple[list[dict], list[dict]]:
+        """
+        Get the serialized passengers and vehicles archived by the state of the given order.
+        """
+        passengers = {}
+        vehicles = {}
+
+        # The records are appended in the order of the states
+        for record in self.records[: bisect.bisect_right(self.orders, order)]:
+            if record["type"] == UpdateType.CREATE_PASSENGER.value:
+                passengers[record["data"]["id"]] = record["data"]
+            elif record["type"] == UpdateType.CREATE_VEHICLE.value:
+                vehicles[record["data"]["id"]] = record["data"]
+
+        return list(passengers.values()), list(vehicles.values())
+
+
+# MARK: State Cache
+class StateCacheEntry:
+    """
+    Records of a state file read by the server.
+    """
+
+    records: list[str]
+    byte_offset: int
+    is_complete: bool
+    size: int
+
+    # Records of a complete state compressed once for the clients that accept it.
+    # Much smaller than the records, so they are not counted in the size.
+    __compressed_records: bytes | None
+
+    def __init__(self, records: list[str], byte_offset: int, is_complete: bool) -> None:
+        self.records = records
+        self.byte_offset = byte_offset
+        self.is_complete = is_complete
+        self.size = sum(len(record) for record in records)
+
+        self.__compressed_records = None
+
+    def get_compressed_records(self) -> bytes:
+        """
+        Get the records as a zlib compressed JSON array.
+        """
+        if self.__compressed_records is None:
+            self.__compressed_records = zlib.compress(f"[{','.join(self.records)}]".encode("utf-8"))
+
+        return self.__compressed_records
+
+
+class StateCache:
+    """
+    LRU cache of the records of the state files, shared by all the clients.
+
+    Entries are keyed by (simulation id, state order) and evicted when the total size of the records
+    exceeds max_size.
+    """
+
+    max_size: int
+    size: int
+    hits: int
+    misses: int
+
+    __entries: OrderedDict[tuple[str, int], StateCacheEntry]
+    __lock: threading.Lock
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.__entries)} states, {self.size}/{self.max_size} bytes, "
+            f"{self.hits} hits, {self.misses} misses"
+        )
+
+    def get(self, simulation_id: str, order: int) -> StateCacheEntry | None:
+        with self.__lock:
+            entry = self.__entries.get((simulation_id, order))
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.__entries.move_to_end((simulation_id, order))
+            return entry
+
+    def put(self, simulation_id: str, order: int, entry: StateCacheEntry) -> None:
+        with self.__lock:
+            previous_entry = self.__entries.pop((simulation_id, order), None)
+            if previous_entry is not None:
+                self.size -= previous_entry.size
+
+            # Do not evict everything for a state that does not fit
+            if entry.size > self.max_size:
+                return
+
+            self.__entries[(simulation_id, order)] = entry
+            self.size += entry.size
+
+            while self.size > self.max_size:
+                _, evicted_entry = self.__entries.popitem(last=False)
+                self.size -= evicted_entry.size
+
+    def invalidate(self, simulation_id: str, order: int | None = None) -> None:
+        """
+        Remove a state of a simulation from the cache, or all of its states if order is None.
+        """
+        with self.__lock:
+            keys = [key for key in self.__entries if key[0] == simulation_id and (order is None or key[1] == order)]
+
+            for key in keys:
+                self.size -= self.__entries.pop(key).size
+
+
+# MARK: Compaction Result
+class SimulationCompactionResult:
+    """
+    Size on disk and number of states of a simulation before and after its compaction.
+    """
+
+    simulation_id: str
+    size_before: int
+    size_after: int
+    state_count_before: int
+    state_count_after: int
+
+    def __init__(
+        self, simulation_id: str, size_before: int, size_after: int, state_count_before: int, state_count_after: int
+    ) -> None:
+        self.simulation_id = simulation_id
+        self.size_before = size_before
+        self.size_after = size_after
+        self.state_count_before = state_count_before
+        self.state_count_after = state_count_after
+
+    def serialize(self) -> dict:
+        return {
+            "simulationId": self.simulation_id,
+            "sizeBefore": self.size_before,
+            "sizeAfter": self.size_after,
+            "stateCountBefore": self.state_count_before,
+            "stateCountAfter": self.state_count_after,
+        }
+
+    def __str__(self) -> str:
+        return (
+            f"{self.simulation_id}: {self.state_count_before} states ({self.size_before} bytes) -> "
+            f"{self.state_count_after} states ({self.size_after} bytes)"
+        )
+
+
+# MARK: SVDM
+class SimulationVisualizationDataManager:
+    """
+    This class manage reads and writes of simulation data for visualization.
+    """
+
+    __CORRUPTED_FILE_NAME = ".corrupted"
+    __SEALED_FILE_NAME = ".sealed"
+    __SAVED_SIMULATIONS_DIRECTORY_NAME = "saved_simulations"
+    __SIMULATION_INFORMATION_FILE_NAME = "simulation_information.json"
+    __STATES_DIRECTORY_NAME = "states"
+    __STATES_INDEX_FILE_NAME = "states_index"
+    __STOPS_FILE_NAME = "stops"
+    __COMPLETED_ENTITIES_FILE_NAME = "completed_entities"
+    __POLYLINES_DIRECTORY_NAME = "polylines"
+    __POLYLINES_FILE_NAME = "polylines"
+    __POLYLINES_VERSION_FILE_NAME = "version"
+    __POLYLINES_VERSIONS_INDEX_FILE_NAME = "versions_index"
+
+    # Directories of the saved simulations that start with this prefix are not simulations
+    __HIDDEN_DIRECTORY_PREFIX = "."
+    __COMPACTING_DIRECTORY_SUFFIX = ".compacting"
+    __REPLACED_DIRECTORY_SUFFIX = ".replaced"
+
+    __STATES_ORDER_MINIMUM_LENGTH = 8
+    __STATES_TIMESTAMP_MINIMUM_LENGTH = 8
+
+    # Saves of older versions do not have a state index
+    __STATES_INDEX_MINIMUM_VERSION = 10
+
+    # Saves of older versions keep the complete entities in every state
+    COMPLETED_ENTITIES_ARCHIVE_MINIMUM_VERSION = 12
+
+    # Saves of older versions never compress their state files
+    __STATE_COMPRESSION_MINIMUM_VERSION = 13
+
+    # Compression of the complete states sent to the clients that accept it
+    # (the deflate format of the DecompressionStream of the browsers, which is the zlib format)
+    CLIENT_STATE_COMPRESSION = "deflate"
+
+    # Cache of the state indexes by simulation id
+    __state_indexes: dict[str, SimulationStateIndex] = {}
+
+    # Cache of the stop tables by simulation id
+    __stop_tables: dict[str, SimulationStopTable] = {}
+
+    # Cache of the completed entities archives by simulation id
+    __completed_entities_archives: dict[str, SimulationCompletedEntitiesArchive] = {}
+
+    # Cache of the records of the state files
+    __state_cache = StateCache(STATE_CACHE_MAX_SIZE)
+
+    # Sealed simulations never change, their information can be kept in memory
+    # A compaction replaces the directory of a sealed simulation, possibly in another process, so the inode of the
+    # directory is kept to notice it
+    __sealed_simulation_inodes: dict[str, int] = {}
+    __sealed_simulation_informations: dict[str, SimulationInformation] = {}
+
+    # Only send a maximum of __MAX_STATES_AT_ONCE states at once
+    # This should be at least 2
+    __MAX_STATES_AT_ONCE = 2
+
+    # The client keeps a maximum of __MAX_STATES_IN_CLIENT_BEFORE_NECESSARY + __MAX_STATES_IN_CLIENT_AFTER_NECESSARY + 1
+    # states in memory
+    # The current one, the previous __MAX_STATES_IN_CLIENT_BEFORE_NECESSARY and
+    # the next __MAX_STATES_IN_CLIENT_AFTER_NECESSARY
+    # __MAX_STATES_IN_CLIENT_BEFORE_NECESSARY = 24
+    # __MAX_STATES_IN_CLIENT_AFTER_NECESSARY = 50
+
+    # MARK: +- Format
+    @staticmethod
+    def __format_json_readable(data: dict, file: str) -> str:
+        return json.dump(data, file, indent=2, separators=(",", ": "), sort_keys=True)
+
+    @staticmethod
+    def __format_json_one_line(data: dict, file: str) -> str:
+        # Add new line before if not empty
+        if file.tell() != 0:
+            file.write("\n")
+        return json.dump(data, file, separators=(",", ":"))
+
+    # MARK: +- File paths
+    @staticmethod
+    def get_saved_simulations_directory_path() -> str:
+        current_directory = os.path.dirname(os.path.abspath(__file__))
+        directory_path = f"{current_directory}/{SimulationVisualizationDataManager.__SAVED_SIMULATIONS_DIRECTORY_NAME}"
+
+        if not os.path.exists(directory_path):
+            os.makedirs(directory_path)
+
+        return directory_path
+
+    @staticmethod
+    def get_saved_simulations_directory_modification_time() -> int:
+        """
+        Changes when a saved simulation is added or removed.
+        """
+        directory_path = SimulationVisualizationDataManager.get_saved_simulations_directory_path()
+        return os.stat(directory_path).st_mtime_ns
+
+    @staticmethod
+    def get_all_saved_simulation_ids() -> list[str]:
+        directory_path = SimulationVisualizationDataManager.get_saved_simulations_directory_path()
+        return [
+            file_name
+            for file_name in os.listdir(directory_path)
+            if not file_name.startswith(SimulationVisualizationDataManager.__HIDDEN_DIRECTORY_PREFIX)
+        ]
+
+    # The paths of a simulation are only created by its writer (see create_saved_simulation_directory), so that
+    # reading a simulation that is deleted or replaced never creates an empty one in its place
+
+    @staticmethod
+    def get_saved_simulation_directory_path(simulation_id: str) -> str:
+        directory_path = SimulationVisualizationDataManager.get_saved_simulations_directory_path()
+        return f"{directory_path}/{simulation_id}"
+
+    @staticmethod
+    def create_saved_simulation_directory(simulation_id: str) -> None:
+        """
+        Create the directories of a simulation that starts being written.
+        """
+        os.makedirs(
+            SimulationVisualizationDataManager.get_saved_simulation_states_folder_path(simulation_id), exist_ok=True
+        )
+        os.makedirs(
+            SimulationVisualizationDataManager.get_saved_simulation_polylines_directory_path(simulation_id),
+            exist_ok=True,
+        )
+
+    @staticmethod
+    def get_saved_simulation_directory_inode(simulation_id: str) -> int | None:
+        """
+        Changes when the directory of the simulation is replaced, for example by a compaction.
+
+        None if the simulation is not saved.
+        """
+        simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
+            simulation_id
+        )
+
+        if not os.path.exists(simulation_directory_path):
+            return None
+
+        return os.stat(simulation_directory_path).st_ino
+
+    @staticmethod
+    def get_saved_simulation_size(simulation_id: str) -> int:
+        simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
+            simulation_id
+        )
+
+        total_size = 0
+        for current_directory_path, _, file_names in os.walk(simulation_directory_path):
+            for file_name in file_names:
+                total_size += os.path.getsize(os.path.join(current_directory_path, file_name))
+
+        return total_size
+
+    # MARK: +- Corrupted
+    @staticmethod
+    def is_simulation_corrupted(simulation_id: str) -> bool:
+        simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
+            simulation_id
+        )
+
+        return os.path.exists(f"{simulation_directory_path}/{SimulationVisualizationDataManager.__CORRUPTED_FILE_NAME}")
+
+    @staticmethod
+    def mark_simulation_as_corrupted(simulation_id: str) -> None:
+        simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
+            simulation_id
+        )
+
+        # Deleted or being replaced by a compaction
+        if not os.path.exists(simulation_directory_path):
+            return
+
+        file_path = f"{simulation_directory_path}/{SimulationVisualizationDataManager.__CORRUPTED_FILE_NAME}"
+
+        with open(file_path, "w", encoding="utf-8") as file:
+            file.write("")
+
+    # MARK: +- Sealed
+
+    # A simulation is sealed when its run has ended (or when it is loaded by the server after its run).
+    # Sealed simulations are immutable: they are read without file locks and cannot be written anymore.
+
+    @staticmethod
+    def is_simulation_sealed(simulation_id: str) -> bool:
+        """
+        Check if a simulation is sealed.
+
+        The cached data of a sealed simulation whose directory has been replaced since it was sealed is cleared.
+        """
+        simulation_directory_inode = SimulationVisualizationDataManager.get_saved_simulation_directory_inode(
+            simulation_id
+        )
+
+        sealed_simulation_inode = SimulationVisualizationDataManager.__sealed_simulation_inodes.get(simulation_id, None)
+
+        if sealed_simulation_inode is not None:
+            if sealed_simulation_inode == simulation_directory_inode:
+                return True
+
+            SimulationVisualizationDataManager.clear_cached_simulation(simulation_id)
+
+        # Deleted or being replaced by a compaction
+        if simulation_directory_inode is None:
+            return False
+
+        simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
+            simulation_id
+        )
+
+        is_sealed = os.path.exists(
+            f"{simulation_directory_path}/{SimulationVisualizationDataManager.__SEALED_FILE_NAME}"
+        )
+
+        if is_sealed:
+            SimulationVisualizationDataManager.__sealed_simulation_inodes[simulation_id] = simulation_directory_inode
+
+        return is_sealed
+
+    @staticmethod
+    def seal_simulation(simulation_id: str) -> None:
+        """
+        Should only be called once nothing writes to the simulation anymore.
+        """
+        if SimulationVisualizationDataManager.is_simulation_sealed(simulation_id):
+            return
+
+        # Build the missing state index of older saves now since the simulation cannot be written afterwards
+        SimulationVisualizationDataManager.get_state_index(simulation_id)
+
+        # The polylines cannot change anymore, their levels of detail are only built once
+        SimulationVisualizationDataManager.build_polylines_levels_of_detail(simulation_id)
+
+        simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
+            simulation_id
+        )
+        states_folder_path = SimulationVisualizationDataManager.get_saved_simulation_states_folder_path(simulation_id)
+
+        # Lock files are not used to read sealed simulations
+        for folder_path in [simulation_directory_path, states_folder_path]:
+            if not os.path.exists(folder_path):
+                continue
+
+            for file_name in os.listdir(folder_path):
+                if file_name.endswith(".lock"):
+                    os.remove(f"{folder_path}/{file_name}")
+
+        file_path = f"{simulation_directory_path}/{SimulationVisualizationDataManager.__SEALED_FILE_NAME}"
+
+        with open(file_path, "w", encoding="utf-8") as file:
+            file.write("")
+
+        SimulationVisualizationDataManager.__sealed_simulation_inodes[simulation_id] = os.stat(
+            simulation_directory_path
+        ).st_ino
+
+    @staticmethod
+    def verify_simulation_is_not_sealed(simulation_id: str) -> None:
+        if SimulationVisualizationDataManager.is_simulation_sealed(simulation_id):
+            raise ValueError(f"Simulation {simulation_id} is sealed and cannot be modified")
+
+    # MARK: +- Simulation Information
+    @staticmethod
+    def get_saved_simulation_information_file_path(simulation_id: str) -> str:
+        simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
+            simulation_id
+        )
+        return f"{simulation_directory_path}/{SimulationVisualizationDataManager.__SIMULATION_INFORMATION_FILE_NAME}"
+
+    @staticmethod
+    def set_simulation_information(simulation_id: str, simulation_information: SimulationInformation) -> None:
+        SimulationVisualizationDataManager.verify_simulation_is_not_sealed(simulation_id)
+
+        file_path = SimulationVisualizationDataManager.get_saved_simulation_information_file_path(simulation_id)
 
         lock = FileLock(f"{file_path}.lock")
 
@@ -1159,14 +2336,20 @@ class SimulationVisualizationDataManager:
 
     @staticmethod
     def get_simulation_information(simulation_id: str) -> SimulationInformation:
-        file_path = SimulationVisualizationDataManager.get_saved_simulation_information_file_path(simulation_id)
+        is_sealed = SimulationVisualizationDataManager.is_simulation_sealed(simulation_id)
 
-        lock = FileLock(f"{file_path}.lock")
+        sealed_simulation_information = SimulationVisualizationDataManager.__sealed_simulation_informations.get(
+            simulation_id, None
+        )
+        if sealed_simulation_information is not None:
+            return sealed_simulation_information
+
+        file_path = SimulationVisualizationDataManager.get_saved_simulation_information_file_path(simulation_id)
 
         simulation_information = None
         should_update_simulation_information = False
 
-        with lock:
+        with nullcontext() if is_sealed else FileLock(f"{file_path}.lock"):
             with open(file_path, "r", encoding="utf-8") as file:
                 data = file.read()
 
@@ -1185,6 +2368,9 @@ class SimulationVisualizationDataManager:
                     simulation_information.name = name
                     simulation_information.start_time = start_time
 
+        if is_sealed:
+            SimulationVisualizationDataManager.__sealed_simulation_informations[simulation_id] = simulation_information
+
         if simulation_information is not None and should_update_simulation_information:
             SimulationVisualizationDataManager.set_simulation_information(simulation_id, simulation_information)
 
@@ -1196,15 +2382,20 @@ class SimulationVisualizationDataManager:
         simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
             simulation_id
         )
-        folder_path = f"{simulation_directory_path}/{SimulationVisualizationDataManager.__STATES_DIRECTORY_NAME}"
-
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path)
+        return f"{simulation_directory_path}/{SimulationVisualizationDataManager.__STATES_DIRECTORY_NAME}"
 
-        return folder_path
+    @staticmethod
+    def get_save_codec(simulation_id: str) -> SaveCodec:
+        """
+        Get the codec of the state files from the version of the simulation.
+        """
+        simulation_information = SimulationVisualizationDataManager.get_simulation_information(simulation_id)
+        return get_save_codec(simulation_information.version)
 
     @staticmethod
-    def get_saved_simulation_state_file_path(simulation_id: str, order: int, timestamp: float) -> str:
+    def get_saved_simulation_state_file_path(
+        simulation_id: str, order: int, timestamp: float, file_extension: str
+    ) -> str:
         folder_path = SimulationVisualizationDataManager.get_saved_simulation_states_folder_path(simulation_id)
 
         padded_order = str(order).zfill(SimulationVisualizationDataManager.__STATES_ORDER_MINIMUM_LENGTH)
@@ -1212,51 +2403,335 @@ class SimulationVisualizationDataManager:
             SimulationVisualizationDataManager.__STATES_TIMESTAMP_MINIMUM_LENGTH
         )
 
-        # States and updates are stored in a .jsonl file to speed up reads and writes
-        # Each line is a state (the first line) or an update (the following lines)
-        file_path = f"{folder_path}/{padded_order}-{padded_timestamp}.jsonl"
+        # States and updates are stored in a single file to speed up reads and writes
+        # Each record is a state (the first record) or an update (the following records)
+        # The format of the records depends on the save version (see SaveCodec)
+        return f"{folder_path}/{padded_order}-{padded_timestamp}{file_extension}"
+
+    @staticmethod
+    def get_state_file_compression(state_file_path: str, codec: SaveCodec) -> StateCompression:
+        """
+        Get the compression of a state file from the compressed file that replaces it once its state is complete.
+        """
+        if codec.version < SimulationVisualizationDataManager.__STATE_COMPRESSION_MINIMUM_VERSION:
+            return StateCompression.NONE
+
+        for compression in StateCompression:
+            if compression == StateCompression.NONE:
+                continue
+
+            if os.path.exists(f"{state_file_path}{get_compressed_state_file_extension(compression)}"):
+                return compression
+
+        return StateCompression.NONE
+
+    @staticmethod
+    def get_sorted_states(simulation_id: str) -> list[tuple[int, float]]:
+        folder_path = SimulationVisualizationDataManager.get_saved_simulation_states_folder_path(simulation_id)
+
+        # The first state of the simulation has not been saved yet
+        if not os.path.exists(folder_path):
+            return []
+
+        # Filter out lock files and the compressed files that are still written
+        all_states_files = [
+            path for path in os.listdir(folder_path) if not path.endswith(".lock") and not path.endswith(".tmp")
+        ]
+
+        # A state file and its compressed file both exist while it is compressed
+        states = set()
+        for state_file in all_states_files:
+            order, timestamp = state_file.split("-")
+            states.add((int(order), float(timestamp.split(".")[0])))
+
+        return sorted(states, key=lambda x: (x[1], x[0]))
+
+    @staticmethod
+    def read_state_records(
+        simulation_id: str, order: int, timestamp: float, codec: SaveCodec, byte_offset: int = 0
+    ) -> tuple[list[str], int] | None:
+        """
+        Read the records of a state file starting at byte_offset.
+
+        Return the records as JSON strings and the byte offset of the end of the last record,
+        or None if the state file is shorter than byte_offset.
+
+        Compressed state files are decompressed, byte offsets are offsets in the uncompressed content.
+        """
+        state_file_path = SimulationVisualizationDataManager.get_saved_simulation_state_file_path(
+            simulation_id, order, timestamp, codec.state_file_extension
+        )
+
+        is_sealed = SimulationVisualizationDataManager.is_simulation_sealed(simulation_id)
+
+        with nullcontext() if is_sealed else FileLock(f"{state_file_path}.lock"):
+            # The state writer compresses the state file while holding the lock
+            compression = SimulationVisualizationDataManager.get_state_file_compression(state_file_path, codec)
+
+            if compression == StateCompression.NONE:
+                # The state writer only writes complete records while holding the lock
+                with open(state_file_path, "rb") as file:
+                    file_size = file.seek(0, os.SEEK_END)
+
+                    if byte_offset > file_size:
+                        return None
+
+                    file.seek(byte_offset)
+                    content = file.read()
+            else:
+                with open(f"{state_file_path}{get_compressed_state_file_extension(compression)}", "rb") as file:
+                    content = decompress_state_file_content(file.read(), compression)
+
+                if byte_offset > len(content):
+                    return None
+
+                content = content[byte_offset:]
+
+        # Read after the records since the locations are saved before the records that refer to them
+        stop_table = SimulationVisualizationDataManager.get_stop_table(simulation_id)
+
+        records = codec.read_json_records(content, stop_table)
+
+        if (
+            byte_offset == 0
+            and len(records) > 0
+            and codec.version >= SimulationVisualizationDataManager.COMPLETED_ENTITIES_ARCHIVE_MINIMUM_VERSION
+        ):
+            records[0] = SimulationVisualizationDataManager.add_completed_entities_to_state_record(
+                simulation_id, records[0], codec
+            )
+
+        return records, byte_offset + len(content)
+
+    @staticmethod
+    def get_state_cache() -> StateCache:
+        return SimulationVisualizationDataManager.__state_cache
+
+    @staticmethod
+    def get_cached_state_records(
+        simulation_id: str, order: int, timestamp: float, codec: SaveCodec, is_state_complete: bool
+    ) -> StateCacheEntry:
+        """
+        Read the records of a state file through the state cache.
+
+        Complete states are served from memory. For the state that is still written, only the records
+        appended since the cached read are read from the state file.
+        """
+        state_cache = SimulationVisualizationDataManager.__state_cache
+
+        entry = state_cache.get(simulation_id, order)
+
+        if entry is not None and entry.is_complete:
+            return entry
+
+        tail = None
+        if entry is not None:
+            tail = SimulationVisualizationDataManager.read_state_records(
+                simulation_id, order, timestamp, codec, entry.byte_offset
+            )
+
+        if tail is not None:
+            appended_records, byte_offset = tail
+            records = entry.records + appended_records
+        else:
+            # Not cached or the state file does not match the cached records anymore
+            records, byte_offset = SimulationVisualizationDataManager.read_state_records(
+                simulation_id, order, timestamp, codec
+            )
+
+        entry = StateCacheEntry(records, byte_offset, is_state_complete)
+        state_cache.put(simulation_id, order, entry)
+
+        return entry
+
+    @staticmethod
+    def clear_cached_simulation(simulation_id: str) -> None:
+        """
+        Forget the cached index and states of a simulation that has been deleted or replaced.
+        """
+        SimulationVisualizationDataManager.__state_indexes.pop(simulation_id, None)
+        SimulationVisualizationDataManager.__stop_tables.pop(simulation_id, None)
+        SimulationVisualizationDataManager.__completed_entities_archives.pop(simulation_id, None)
+        SimulationVisualizationDataManager.__state_cache.invalidate(simulation_id)
+        SimulationVisualizationDataManager.__sealed_simulation_inodes.pop(simulation_id, None)
+        SimulationVisualizationDataManager.__sealed_simulation_informations.pop(simulation_id, None)
+
+    # MARK: +- Stop table
+    @staticmethod
+    def get_saved_simulation_stops_file_path(simulation_id: str) -> str:
+        simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
+            simulation_id
+        )
+        return f"{simulation_directory_path}/{SimulationVisualizationDataManager.__STOPS_FILE_NAME}"
+
+    @staticmethod
+    def get_stop_table(simulation_id: str) -> SimulationStopTable:
+        """
+        Get the up to date stop table of a simulation.
+
+        The table is loaded once and only the new locations are read afterwards.
+        """
+        is_sealed = SimulationVisualizationDataManager.is_simulation_sealed(simulation_id)
+
+        stop_table = SimulationVisualizationDataManager.__stop_tables.get(simulation_id, None)
+
+        if stop_table is not None and stop_table.is_complete:
+            return stop_table
+
+        if stop_table is None:
+            stop_table = SimulationStopTable(
+                SimulationVisualizationDataManager.get_saved_simulation_stops_file_path(simulation_id)
+            )
+            SimulationVisualizationDataManager.__stop_tables[simulation_id] = stop_table
+
+        stop_table.refresh()
+
+        # The stop table of a sealed simulation is complete once refreshed after the sealing,
+        # even if it was loaded while the simulation was running
+        stop_table.is_complete = is_sealed
+
+        return stop_table
+
+    # MARK: +- Completed entities archive
+    @staticmethod
+    def get_saved_simulation_completed_entities_file_path(simulation_id: str) -> str:
+        simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
+            simulation_id
+        )
+        return f"{simulation_directory_path}/{SimulationVisualizationDataManager.__COMPLETED_ENTITIES_FILE_NAME}"
+
+    @staticmethod
+    def get_completed_entities_archive(simulation_id: str, codec: SaveCodec) -> SimulationCompletedEntitiesArchive:
+        """
+        Get the up to date completed entities archive of a simulation.
+
+        The archive is loaded once and only the new records are read afterwards.
+        """
+        is_sealed = SimulationVisualizationDataManager.is_simulation_sealed(simulation_id)
+
+        archive = SimulationVisualizationDataManager.__completed_entities_archives.get(simulation_id, None)
+
+        if archive is not None and archive.is_complete:
+            return archive
+
+        if archive is None:
+            archive = SimulationCompletedEntitiesArchive(
+                SimulationVisualizationDataManager.get_saved_simulation_completed_entities_file_path(simulation_id)
+            )
+            SimulationVisualizationDataManager.__completed_entities_archives[simulation_id] = archive
+
+        archive.refresh(codec, SimulationVisualizationDataManager.get_stop_table(simulation_id), is_sealed)
+
+        # The archive of a sealed simulation is complete once refreshed after the sealing
+        archive.is_complete = is_sealed
+
+        return archive
+
+    @staticmethod
+    def add_completed_entities_to_state_record(simulation_id: str, state_record: str, codec: SaveCodec) -> str:
+        """
+        Add the passengers and vehicles archived by a state to its record, so the client receives the full
+        environment.
+        """
+        state = json.loads(state_record)
+
+        archive = SimulationVisualizationDataManager.get_completed_entities_archive(simulation_id, codec)
+        archived_passengers, archived_vehicles = archive.get_entities(state["order"])
+
+        if len(archived_passengers) == 0 and len(archived_vehicles) == 0:
+            return state_record
+
+        # Entities saved in the state are more recent than their archived copy
+        passenger_ids = {passenger["id"] for passenger in state["passengers"]}
+        vehicle_ids = {vehicle["id"] for vehicle in state["vehicles"]}
+
+        state["passengers"] += [passenger for passenger in archived_passengers if passenger["id"] not in passenger_ids]
+        state["vehicles"] += [vehicle for vehicle in archived_vehicles if vehicle["id"] not in vehicle_ids]
+
+        return json.dumps(state, separators=(",", ":"))
+
+    # MARK: +- States index
+    @staticmethod
+    def get_saved_simulation_states_index_file_path(simulation_id: str) -> str:
+        simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
+            simulation_id
+        )
+        return f"{simulation_directory_path}/{SimulationVisualizationDataManager.__STATES_INDEX_FILE_NAME}"
+
+    @staticmethod
+    def append_state_index_entry(simulation_id: str, entry: StateIndexEntry) -> None:
+        """
+        Should only be called by the writer of the simulation.
+        """
+        SimulationVisualizationDataManager.verify_simulation_is_not_sealed(simulation_id)
+
+        file_path = SimulationVisualizationDataManager.get_saved_simulation_states_index_file_path(simulation_id)
+
+        with open(file_path, "ab") as file:
+            file.write(entry.pack())
+
+    @staticmethod
+    def build_state_index(simulation_id: str) -> None:
+        """
+        Build the state index of a simulation saved before the state index existed from its state files.
+        """
+        codec = SimulationVisualizationDataManager.get_save_codec(simulation_id)
+
+        entries = []
+        for order, timestamp in SimulationVisualizationDataManager.get_sorted_states(simulation_id):
+            file_path = SimulationVisualizationDataManager.get_saved_simulation_state_file_path(
+                simulation_id, order, timestamp, codec.state_file_extension
+            )
+
+            with FileLock(f"{file_path}.lock"):
+                with open(file_path, "rb") as file:
+                    content = file.read()
 
-        if not os.path.exists(file_path):
-            with open(file_path, "w", encoding="utf-8") as file:
-                file.write("")
+            update_count = max(0, sum(1 for _ in codec.iter_records(content)) - 1)
+            entries.append(StateIndexEntry(order, timestamp, len(content), update_count))
+
+        # Write the whole index at once to avoid partial indexes
+        file_path = SimulationVisualizationDataManager.get_saved_simulation_states_index_file_path(simulation_id)
+        temporary_file_path = f"{file_path}.tmp"
+
+        with open(temporary_file_path, "wb") as file:
+            file.write(b"".join(entry.pack() for entry in entries))
 
-        return file_path
+        os.replace(temporary_file_path, file_path)
 
     @staticmethod
-    def get_sorted_states(simulation_id: str) -> list[tuple[int, float]]:
-        folder_path = SimulationVisualizationDataManager.get_saved_simulation_states_folder_path(simulation_id)
+    def get_state_index(simulation_id: str) -> SimulationStateIndex:
+        """
+        Get the up to date state index of a simulation.
 
-        all_states_files = [
-            path for path in os.listdir(folder_path) if path.endswith(".jsonl")
-        ]  # Filter out lock files
+        The index is loaded once and only the new entries are read afterwards.
+        """
+        file_path = SimulationVisualizationDataManager.get_saved_simulation_states_index_file_path(simulation_id)
 
-        states = []
-        for state_file in all_states_files:
-            order, timestamp = state_file.split("-")
-            states.append((int(order), float(timestamp.split(".")[0])))
+        if (
+            not os.path.exists(file_path)
+            and SimulationVisualizationDataManager.get_save_codec(simulation_id).version
+            < SimulationVisualizationDataManager.__STATES_INDEX_MINIMUM_VERSION
+        ):
+            SimulationVisualizationDataManager.build_state_index(simulation_id)
 
-        return sorted(states, key=lambda x: (x[1], x[0]))
+        is_sealed = SimulationVisualizationDataManager.is_simulation_sealed(simulation_id)
 
-    @staticmethod
-    def save_state(simulation_id: str, environment: VisualizedEnvironment) -> str:
-        file_path = SimulationVisualizationDataManager.get_saved_simulation_state_file_path(
-            simulation_id, environment.order, environment.timestamp
-        )
+        state_index = SimulationVisualizationDataManager.__state_indexes.get(simulation_id, None)
 
-        lock = FileLock(f"{file_path}.lock")
+        if state_index is not None and state_index.is_complete:
+            return state_index
 
-        with lock:
-            with open(file_path, "w", encoding="utf-8") as file:
-                SimulationVisualizationDataManager.__format_json_one_line(environment.serialize(), file)
+        if state_index is None:
+            state_index = SimulationStateIndex(file_path)
+            SimulationVisualizationDataManager.__state_indexes[simulation_id] = state_index
 
-        return file_path
+        state_index.refresh()
 
-    @staticmethod
-    def save_update(file_path: str, update: Update) -> None:
-        lock = FileLock(f"{file_path}.lock")
-        with lock:
-            with open(file_path, "a", encoding="utf-8") as file:
-                SimulationVisualizationDataManager.__format_json_one_line(update.serialize(), file)
+        # The index of a sealed simulation is complete once refreshed after the sealing
+        state_index.is_complete = is_sealed
+
+        return state_index
 
     @staticmethod
     def get_missing_states(
@@ -1264,33 +2739,45 @@ class SimulationVisualizationDataManager:
         visualization_time: float,
         loaded_state_orders: list[int],
         is_simulation_complete: bool,
-    ) -> tuple[list[str], dict[list[str]], list[int], bool, int, int, int]:
-        sorted_states = SimulationVisualizationDataManager.get_sorted_states(simulation_id)
+        loaded_state_tail: tuple[int, int] | None = None,
+        accepted_compressions: list[str] | None = None,
+    ) -> tuple[list[str], dict[list[str]], list[int], bool, int, int, int, dict[int, int], list[int], dict[int, bytes]]:
+        """
+        Get the states the client is missing around the visualization time.
 
-        if len(sorted_states) == 0:
-            return ([], {}, [], False, 0, 0, 0)
+        The last state loaded by the client might still be written. If the client sends its tail
+        (the order of its last state and the byte offset it has read up to), only the updates appended
+        since then are sent for that state and its order is listed in the appended state orders.
+        The byte offset reached in each state read is returned so the client can send it back.
 
-        necessary_state_index = None
+        If the client accepts the CLIENT_STATE_COMPRESSION compression, the records of the complete states
+        are sent compressed in the compressed states (see StateCacheEntry.get_compressed_records).
+        """
+        state_index = SimulationVisualizationDataManager.get_state_index(simulation_id)
+        sorted_states = state_index.sorted_states
 
-        for index, (order, state_timestamp) in enumerate(sorted_states):
-            if necessary_state_index is None and state_timestamp > visualization_time:
-                necessary_state_index = index
-                break
+        if len(sorted_states) == 0:
+            return ([], {}, [], False, 0, 0, 0, {}, [], {})
 
-        if necessary_state_index is None:
-            # If the visualization time is after the last state then
-            # The last state is necessary
-            necessary_state_index = len(sorted_states) - 1
-        else:
-            # Else we need the state before the first state with greater timestamp
-            necessary_state_index -= 1
+        accepts_compressed_states = (
+            accepted_compressions is not None
+            and SimulationVisualizationDataManager.CLIENT_STATE_COMPRESSION in accepted_compressions
+        )
 
-        # Handle negative indexes
-        necessary_state_index = max(0, necessary_state_index)
+        codec = SimulationVisualizationDataManager.get_save_codec(simulation_id)
+
+        # We need the state before the first state with greater timestamp
+        # or the last state if the visualization time is after the last state
+        necessary_state_index = state_index.get_necessary_state_index(visualization_time)
 
         state_orders_to_keep = []
         missing_states = []
         missing_updates = {}
+        state_byte_offsets = {}
+        appended_state_orders = []
+        compressed_states = {}
+
+        last_loaded_state_order = max(loaded_state_orders) if len(loaded_state_orders) > 0 else None
 
         last_state_index_in_client = -1
         all_state_indexes_in_client = []
@@ -1336,7 +2823,7 @@ class SimulationVisualizationDataManager:
 
             # If the client already has the state, skip it
             # except the last state that might have changed
-            if order in loaded_state_orders and not order == max(loaded_state_orders):
+            if order in loaded_state_orders and not order == last_loaded_state_order:
                 state_orders_to_keep.append(order)
 
                 all_state_indexes_in_client.append(index)
@@ -1345,35 +2832,62 @@ class SimulationVisualizationDataManager:
 
                 continue
 
+            # Only send the updates appended to the last state since the client read it
+            if (
+                order == last_loaded_state_order
+                and loaded_state_tail is not None
+                and loaded_state_tail[0] == order
+                and loaded_state_tail[1] > 0
+            ):
+                tail = SimulationVisualizationDataManager.read_state_records(
+                    simulation_id, order, state_timestamp, codec, loaded_state_tail[1]
+                )
+
+                # Send the whole state if the file does not match the tail of the client
+                if tail is not None:
+                    records, byte_offset = tail
+
+                    if len(records) == 0:
+                        state_orders_to_keep.append(order)
+                    else:
+                        appended_state_orders.append(order)
+                        missing_updates[order] = records
+                        state_byte_offsets[order] = byte_offset
+
+                    all_state_indexes_in_client.append(index)
+
+                    last_state_index_in_client = max(last_state_index_in_client, index)
+
+                    continue
+
             # Don't add states if the max number of states is reached
             # but continue the loop to know which states need to be kept
-            if len(missing_states) >= SimulationVisualizationDataManager.__MAX_STATES_AT_ONCE:
+            if len(missing_states) + len(compressed_states) >= SimulationVisualizationDataManager.__MAX_STATES_AT_ONCE:
                 continue
 
-            state_file_path = SimulationVisualizationDataManager.get_saved_simulation_state_file_path(
-                simulation_id, order, state_timestamp
-            )
-
-            lock = FileLock(f"{state_file_path}.lock")
+            # States are immutable once the next state is started or the simulation is complete
+            is_state_complete = is_simulation_complete or index < len(sorted_states) - 1
 
-            with lock:
-                with open(state_file_path, "r", encoding="utf-8") as file:
-                    environment_data = file.readline()
-                    missing_states.append(environment_data)
+            entry = SimulationVisualizationDataManager.get_cached_state_records(
+                simulation_id, order, state_timestamp, codec, is_state_complete
+            )
 
-                    updates_data = file.readlines()
-                    current_state_updates = []
-                    for update_data in updates_data:
-                        current_state_updates.append(update_data)
+            if accepts_compressed_states and is_state_complete:
+                compressed_states[order] = entry.get_compressed_records()
+            else:
+                missing_states.append(entry.records[0])
+                missing_updates[order] = entry.records[1:]
 
-                    missing_updates[order] = current_state_updates
+            state_byte_offsets[order] = entry.byte_offset
 
-                    all_state_indexes_in_client.append(index)
+            all_state_indexes_in_client.append(index)
 
-                    last_state_index_in_client = max(last_state_index_in_client, index)
+            last_state_index_in_client = max(last_state_index_in_client, index)
 
         client_has_last_state = last_state_index_in_client == len(sorted_states) - 1
-        client_has_max_states = len(missing_states) + len(state_orders_to_keep) >= len(indexes_to_load)
+        client_has_max_states = len(missing_states) + len(compressed_states) + len(state_orders_to_keep) + len(
+            appended_state_orders
+        ) >= len(indexes_to_load)
 
         should_request_more_states = (is_simulation_complete and not client_has_max_states) or (
             not is_simulation_complete and (client_has_last_state or not client_has_max_states)
@@ -1411,6 +2925,9 @@ class SimulationVisualizationDataManager:
             first_continuous_state_order,
             last_continuous_state_order,
             necessary_state_order,
+            state_byte_offsets,
+            appended_state_orders,
+            compressed_states,
         )
 
     # MARK: +- Polylines
@@ -1418,8 +2935,14 @@ class SimulationVisualizationDataManager:
     # The polylines are saved with the following structure :
     # polylines/
     #   version
+    #   versions_index
+    #     <version> <byte offset of the first polyline of the version in polylines.jsonl>
     #   polylines.jsonl
     #     { "coordinatesString": "string", "encodedPolyline": "string", "coefficients": [float] }
+    #   polylines_lod_<level of detail>.jsonl (only for sealed simulations)
+    #     Same as polylines.jsonl, with the polylines simplified with the tolerance of the level of detail
+    #
+    # Saves made before the versions index was added do not have it, their polylines are always read entirely.
 
     @staticmethod
     def get_saved_simulation_polylines_lock(simulation_id: str) -> FileLock:
@@ -1433,29 +2956,20 @@ class SimulationVisualizationDataManager:
         simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
             simulation_id
         )
-        directory_path = f"{simulation_directory_path}/{SimulationVisualizationDataManager.__POLYLINES_DIRECTORY_NAME}"
-
-        if not os.path.exists(directory_path):
-            os.makedirs(directory_path)
-
-        return directory_path
+        return f"{simulation_directory_path}/{SimulationVisualizationDataManager.__POLYLINES_DIRECTORY_NAME}"
 
     @staticmethod
     def get_saved_simulation_polylines_version_file_path(simulation_id: str) -> str:
         directory_path = SimulationVisualizationDataManager.get_saved_simulation_polylines_directory_path(simulation_id)
-        file_path = f"{directory_path}/{SimulationVisualizationDataManager.__POLYLINES_VERSION_FILE_NAME}"
-
-        if not os.path.exists(file_path):
-            with open(file_path, "w", encoding="utf-8") as file:
-                file.write(str(0))
-
-        return file_path
+        return f"{directory_path}/{SimulationVisualizationDataManager.__POLYLINES_VERSION_FILE_NAME}"
 
     @staticmethod
     def set_polylines_version(simulation_id: str, version: int) -> None:
         """
         Should always be called in a lock.
         """
+        SimulationVisualizationDataManager.verify_simulation_is_not_sealed(simulation_id)
+
         file_path = SimulationVisualizationDataManager.get_saved_simulation_polylines_version_file_path(simulation_id)
 
         with open(file_path, "w", encoding="utf-8") as file:
@@ -1468,11 +2982,18 @@ class SimulationVisualizationDataManager:
         """
         file_path = SimulationVisualizationDataManager.get_saved_simulation_polylines_version_file_path(simulation_id)
 
+        # No polylines have been saved yet
+        if not os.path.exists(file_path):
+            return 0
+
         with open(file_path, "r", encoding="utf-8") as file:
             return int(file.read())
 
     @staticmethod
     def get_polylines_version_with_lock(simulation_id: str) -> int:
+        if SimulationVisualizationDataManager.is_simulation_sealed(simulation_id):
+            return SimulationVisualizationDataManager.get_polylines_version(simulation_id)
+
         lock = SimulationVisualizationDataManager.get_saved_simulation_polylines_lock(simulation_id)
         with lock:
             return SimulationVisualizationDataManager.get_polylines_version(simulation_id)
@@ -1480,27 +3001,56 @@ class SimulationVisualizationDataManager:
     @staticmethod
     def get_saved_simulation_polylines_file_path(simulation_id: str) -> str:
         directory_path = SimulationVisualizationDataManager.get_saved_simulation_polylines_directory_path(simulation_id)
+        return f"{directory_path}/{SimulationVisualizationDataManager.__POLYLINES_FILE_NAME}.jsonl"
+
+    @staticmethod
+    def get_saved_simulation_polylines_versions_index_file_path(simulation_id: str) -> str:
+        directory_path = SimulationVisualizationDataManager.get_saved_simulation_polylines_directory_path(simulation_id)
+        return f"{directory_path}/{SimulationVisualizationDataManager.__POLYLINES_VERSIONS_INDEX_FILE_NAME}"
+
+    @staticmethod
+    def get_polylines_version_byte_offset(simulation_id: str, version: int) -> int | None:
+        """
+        Get the byte offset of the first polyline added after the given version, or None if it is not indexed.
 
-        file_path = f"{directory_path}/{SimulationVisualizationDataManager.__POLYLINES_FILE_NAME}.jsonl"
+        Should always be called in a lock.
+        """
+        file_path = SimulationVisualizationDataManager.get_saved_simulation_polylines_versions_index_file_path(
+            simulation_id
+        )
 
         if not os.path.exists(file_path):
-            with open(file_path, "w", encoding="utf-8") as file:
-                file.write("")
+            return None
+
+        with open(file_path, "r", encoding="utf-8") as file:
+            for line in file:
+                entry_version, byte_offset = line.split()
+                if int(entry_version) > version:
+                    return int(byte_offset)
 
-        return file_path
+        return None
 
     @staticmethod
-    def set_polylines(simulation_id: str, polylines: dict[str, tuple[str, list[float]]]) -> None:
+    def set_polylines(simulation_id: str, polylines: dict[str, tuple[str, list[float]]]) -> int:
+        """
+        Append polylines to the save and return the new polylines version.
+        """
+        SimulationVisualizationDataManager.verify_simulation_is_not_sealed(simulation_id)
 
         file_path = SimulationVisualizationDataManager.get_saved_simulation_polylines_file_path(simulation_id)
+        versions_index_file_path = (
+            SimulationVisualizationDataManager.get_saved_simulation_polylines_versions_index_file_path(simulation_id)
+        )
 
         lock = SimulationVisualizationDataManager.get_saved_simulation_polylines_lock(simulation_id)
 
         with lock:
-            # Increment the version to notify the client that the polylines have changed
             version = SimulationVisualizationDataManager.get_polylines_version(simulation_id)
             version += 1
-            SimulationVisualizationDataManager.set_polylines_version(simulation_id, version)
+
+            # Polylines are separated by a new line written before them
+            file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+            byte_offset = file_size + 1 if file_size > 0 else 0
 
             with open(file_path, "a", encoding="utf-8") as file:
                 for coordinates_string, (
@@ -1514,24 +3064,526 @@ class SimulationVisualizationDataManager:
                     }
                     SimulationVisualizationDataManager.__format_json_one_line(data, file)
 
+            # Index the polylines of the version so that clients can only read the new ones
+            with open(versions_index_file_path, "a", encoding="utf-8") as file:
+                file.write(f"{version} {byte_offset}\n")
+
+            # Increment the version to notify the client that the polylines have changed
+            SimulationVisualizationDataManager.set_polylines_version(simulation_id, version)
+
+        return version
+
+    @staticmethod
+    def get_saved_simulation_polylines_level_of_detail_file_path(simulation_id: str, level_of_detail: int) -> str:
+        directory_path = SimulationVisualizationDataManager.get_saved_simulation_polylines_directory_path(simulation_id)
+        return (
+            f"{directory_path}/{SimulationVisualizationDataManager.__POLYLINES_FILE_NAME}_lod_{level_of_detail}.jsonl"
+        )
+
+    @staticmethod
+    def simplify_polylines(polylines: list[str], level_of_detail: int) -> list[str]:
+        tolerance = POLYLINES_LEVELS_OF_DETAIL_TOLERANCES[level_of_detail - 1]
+
+        simplified_polylines = []
+        for line in polylines:
+            data = json.loads(line)
+            data["encodedPolyline"], data["coefficients"] = simplify_encoded_polyline(
+                data["encodedPolyline"], data["coefficients"], tolerance
+            )
+            simplified_polylines.append(json.dumps(data, separators=(",", ":")) + "\n")
+
+        return simplified_polylines
+
+    @staticmethod
+    def build_polylines_levels_of_detail(simulation_id: str) -> None:
+        """
+        Write the simplified polylines of every level of detail. Should only be called once the polylines of the
+        simulation cannot change anymore.
+        """
+        polylines, _, _ = SimulationVisualizationDataManager.get_polylines(simulation_id)
+
+        # Older saves might not have any polylines
+        os.makedirs(
+            SimulationVisualizationDataManager.get_saved_simulation_polylines_directory_path(simulation_id),
+            exist_ok=True,
+        )
+
+        for level_of_detail in range(1, len(POLYLINES_LEVELS_OF_DETAIL_TOLERANCES) + 1):
+            file_path = SimulationVisualizationDataManager.get_saved_simulation_polylines_level_of_detail_file_path(
+                simulation_id, level_of_detail
+            )
+
+            # Written in a temporary file first so that readers never see a partial file.
+            # Older saves are built when they are read, each build has its own temporary file.
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=os.path.dirname(file_path), suffix=".tmp", delete=False
+            ) as file:
+                file.writelines(SimulationVisualizationDataManager.simplify_polylines(polylines, level_of_detail))
+
+            os.replace(file.name, file_path)
+
     @staticmethod
     def get_polylines(
-        simulation_id: str,
-    ) -> tuple[list[str], int]:
+        simulation_id: str, known_version: int | None = None, level_of_detail: int = 0
+    ) -> tuple[list[str], int, bool]:
+        """
+        Get the polylines of the simulation, their version, and whether only the polylines added after
+        known_version are returned. All the polylines are returned if known_version is None or is not indexed.
+
+        Polylines are simplified if level_of_detail is greater than 0, more as the level of detail increases.
+        """
+        if level_of_detail < 0 or level_of_detail > len(POLYLINES_LEVELS_OF_DETAIL_TOLERANCES):
+            raise ValueError(f"Invalid polylines level of detail {level_of_detail}")
 
         polylines = []
 
-        lock = SimulationVisualizationDataManager.get_saved_simulation_polylines_lock(simulation_id)
+        if level_of_detail > 0 and SimulationVisualizationDataManager.is_simulation_sealed(simulation_id):
+            version = SimulationVisualizationDataManager.get_polylines_version(simulation_id)
+
+            if known_version == version:
+                return polylines, version, True
+
+            file_path = SimulationVisualizationDataManager.get_saved_simulation_polylines_level_of_detail_file_path(
+                simulation_id, level_of_detail
+            )
+
+            # Simulations sealed before levels of detail existed
+            if not os.path.exists(file_path):
+                SimulationVisualizationDataManager.build_polylines_levels_of_detail(simulation_id)
+
+            with open(file_path, "r", encoding="utf-8") as file:
+                polylines = list(file)
+
+            return polylines, version, False
+
+        if SimulationVisualizationDataManager.is_simulation_sealed(simulation_id):
+            lock = nullcontext()
+        else:
+            lock = SimulationVisualizationDataManager.get_saved_simulation_polylines_lock(simulation_id)
 
         version = 0
 
         with lock:
             version = SimulationVisualizationDataManager.get_polylines_version(simulation_id)
 
+            if known_version == version:
+                return polylines, version, True
+
+            byte_offset = None
+            if known_version is not None and 0 <= known_version < version:
+                byte_offset = SimulationVisualizationDataManager.get_polylines_version_byte_offset(
+                    simulation_id, known_version
+                )
+
             file_path = SimulationVisualizationDataManager.get_saved_simulation_polylines_file_path(simulation_id)
 
-            with open(file_path, "r", encoding="utf-8") as file:
-                for line in file:
-                    polylines.append(line)
+            if os.path.exists(file_path):
+                with open(file_path, "rb") as file:
+                    if byte_offset is not None:
+                        file.seek(byte_offset)
+
+                    for line in file:
+                        polylines.append(line.decode("utf-8"))
+
+        # The polylines of running simulations are simplified on demand
+        if level_of_detail > 0:
+            polylines = SimulationVisualizationDataManager.simplify_polylines(polylines, level_of_detail)
+
+        return polylines, version, byte_offset is not None
+
+    # MARK: +- Compaction
+    @staticmethod
+    def __replay_states(
+        simulation_id: str,
+        target_simulation_id: str,
+        state_save_policy: StateSavePolicy,
+        state_compression: StateCompression,
+        progress_callback: Callable[[float], None] | None,
+    ) -> None:
+        """
+        Apply the updates of a sealed simulation on its first state and save them in the target simulation like a
+        running simulation would, with the given state save policy and state compression.
+
+        The progress callback receives the fraction of the states of the simulation replayed so far.
+        """
+        codec = SimulationVisualizationDataManager.get_save_codec(simulation_id)
+        state_writer = SimulationStateWriter(
+            target_simulation_id, SaveDurability.FSYNC_PER_CHECKPOINT, compression=state_compression
+        )
+
+        environment = None
+
+        sorted_states = SimulationVisualizationDataManager.get_sorted_states(simulation_id)
+
+        for state_index, (order, timestamp) in enumerate(sorted_states):
+            if progress_callback is not None:
+                progress_callback(state_index / len(sorted_states))
+
+            # The states are read with their archived entities
+            records, _ = SimulationVisualizationDataManager.read_state_records(simulation_id, order, timestamp, codec)
+
+            if len(records) == 0:
+                continue
+
+            state = VisualizedEnvironment.deserialize(json.loads(records[0]))
+
+            if environment is None:
+                environment = state
+
+            # The estimated end time is the only part of the states that the updates do not give
+            environment.estimated_end_time = state.estimated_end_time
+
+            for record in records[1:]:
+                update = Update.deserialize(json.loads(record))
+
+                environment.order = update.order
+                environment.timestamp = update.timestamp
+
+                if state_writer.file_path is None or state_save_policy.is_state_full(
+                    state_writer.update_count,
+                    state_writer.updates_byte_length,
+                    update.timestamp - state_writer.state_timestamp,
+                ):
+                    state_writer.start_state(environment)
+
+                environment.apply_update(update)
+                state_writer.write_update(update)
+
+        # A simulation without updates keeps its only state
+        if state_writer.file_path is None and environment is not None:
+            state_writer.start_state(environment)
+
+        state_writer.close()
+
+    @staticmethod
+    def compact_simulation(
+        simulation_id: str,
+        state_save_policy: StateSavePolicy | None = None,
+        state_compression: StateCompression = STATE_COMPRESSION,
+        progress_callback: Callable[[float], None] | None = None,
+    ) -> SimulationCompactionResult:
+        """
+        Save the states of a completed simulation again with the given state save policy, state compression and
+        the latest save version.
+
+        The updates are replayed on the first state of the simulation and written to a new hidden simulation
+        directory, which then replaces the directory of the simulation. The progress callback is called before
+        each state is replayed.
+        """
+        if state_save_policy is None:
+            state_save_policy = StateSavePolicy()
+
+        verify_state_compression_is_available(state_compression)
+
+        if simulation_id not in SimulationVisualizationDataManager.get_all_saved_simulation_ids():
+            raise ValueError(f"Simulation {simulation_id} not found")
+
+        if SimulationVisualizationDataManager.is_simulation_corrupted(simulation_id):
+            raise ValueError(f"Simulation {simulation_id} is corrupted")
+
+        simulation_information = SimulationVisualizationDataManager.get_simulation_information(simulation_id)
+
+        if simulation_information.simulation_end_time is None:
+            raise ValueError(f"Simulation {simulation_id} is not completed")
+
+        version = simulation_information.version
+        if version > SAVE_VERSION or (version < SAVE_VERSION and version not in COMPATIBLE_SAVE_VERSIONS):
+            raise ValueError(f"Simulation {simulation_id} has an incompatible save version {version}")
+
+        # Like the server does when it loads a completed simulation
+        SimulationVisualizationDataManager.seal_simulation(simulation_id)
+
+        saved_simulations_directory_path = SimulationVisualizationDataManager.get_saved_simulations_directory_path()
+        hidden_simulation_id = f"{SimulationVisualizationDataManager.__HIDDEN_DIRECTORY_PREFIX}{simulation_id}"
+        compacting_simulation_id = (
+            f"{hidden_simulation_id}{SimulationVisualizationDataManager.__COMPACTING_DIRECTORY_SUFFIX}"
+        )
+        compacting_directory_path = f"{saved_simulations_directory_path}/{compacting_simulation_id}"
+        replaced_directory_path = (
+            f"{saved_simulations_directory_path}/{hidden_simulation_id}"
+            f"{SimulationVisualizationDataManager.__REPLACED_DIRECTORY_SUFFIX}"
+        )
+
+        lock = FileLock(f"{compacting_directory_path}.lock", timeout=0)
+
+        try:
+            lock.acquire()
+        except Timeout as error:
+            raise ValueError(f"Simulation {simulation_id} is already being compacted") from error
+
+        try:
+            # Leftovers of an interrupted compaction
+            for directory_path in [compacting_directory_path, replaced_directory_path]:
+                if os.path.exists(directory_path):
+                    shutil.rmtree(directory_path)
+
+            size_before = SimulationVisualizationDataManager.get_saved_simulation_size(simulation_id)
+            state_count_before = len(SimulationVisualizationDataManager.get_sorted_states(simulation_id))
+
+            SimulationVisualizationDataManager.__replay_states(
+                simulation_id, compacting_simulation_id, state_save_policy, state_compression, progress_callback
+            )
+
+            simulation_information.version = SAVE_VERSION
+            simulation_information.state_save_policy = state_save_policy
+            simulation_information.state_compression = state_compression
+            SimulationVisualizationDataManager.set_simulation_information(
+                compacting_simulation_id, simulation_information
+            )
+
+            shutil.copytree(
+                SimulationVisualizationDataManager.get_saved_simulation_polylines_directory_path(simulation_id),
+                SimulationVisualizationDataManager.get_saved_simulation_polylines_directory_path(
+                    compacting_simulation_id
+                ),
+                dirs_exist_ok=True,
+            )
+
+            SimulationVisualizationDataManager.seal_simulation(compacting_simulation_id)
+
+            state_count_after = len(SimulationVisualizationDataManager.get_sorted_states(compacting_simulation_id))
+
+            # Directories cannot be exchanged in a single step, the simulation is missing only between the renames.
+            # Readers do not create the directory of a missing simulation, so the compacted directory can take its
+            # place, or the replaced directory can be put back if it cannot.
+            simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(
+                simulation_id
+            )
+            os.rename(simulation_directory_path, replaced_directory_path)
+            try:
+                os.rename(compacting_directory_path, simulation_directory_path)
+            except OSError as error:
+                os.rename(replaced_directory_path, simulation_directory_path)
+                raise ValueError(f"Simulation {simulation_id} cannot be replaced by its compacted save") from error
+
+            shutil.rmtree(replaced_directory_path)
+        finally:
+            SimulationVisualizationDataManager.clear_cached_simulation(compacting_simulation_id)
+            SimulationVisualizationDataManager.clear_cached_simulation(simulation_id)
+
+            if os.path.exists(compacting_directory_path):
+                shutil.rmtree(compacting_directory_path)
+
+            # Removed while it is held, other compactions do not wait for the lock
+            os.remove(lock.lock_file)
+            lock.release()
+
+        size_after = SimulationVisualizationDataManager.get_saved_simulation_size(simulation_id)
+
+        return SimulationCompactionResult(simulation_id, size_before, size_after, state_count_before, state_count_after)
+
+
+# MARK: State Writer
+class SimulationStateWriter:
+    """
+    This class writes the states and updates of a running simulation.
+
+    The file of the current state is kept open and the updates are buffered in memory. Buffered
+    updates are written as complete records while holding the file lock, so readers of the file
+    never see a partially written update.
+    """
+
+    simulation_id: str
+    codec: SaveCodec
+    stop_table: SimulationStopTable
+    completed_entities_archive: SimulationCompletedEntitiesArchive
+    durability: SaveDurability
+    batch_size: int
+    flush_interval: float
+    compression: StateCompression
+
+    file_path: str | None
+
+    __file: BinaryIO | None
+    __lock: FileLock | None
+    __pending_records: list[bytes]
+    __last_flush_time: float
+
+    # Current state
+    __state_order: int
+    __state_timestamp: float
+    __byte_length: int
+    __updates_byte_length: int
+    __update_count: int
+
+    def __init__(
+        self,
+        simulation_id: str,
+        durability: SaveDurability = SaveDurability.FLUSH_PER_BATCH,
+        batch_size: int = UPDATE_WRITE_BATCH_SIZE,
+        flush_interval: float = UPDATE_WRITE_FLUSH_INTERVAL,
+        compression: StateCompression = STATE_COMPRESSION,
+    ) -> None:
+        verify_state_compression_is_available(compression)
+
+        self.simulation_id = simulation_id
+        self.codec = get_save_codec(SAVE_VERSION)
+
+        SimulationVisualizationDataManager.create_saved_simulation_directory(simulation_id)
+        self.stop_table = SimulationStopTable(
+            SimulationVisualizationDataManager.get_saved_simulation_stops_file_path(simulation_id)
+        )
+        self.stop_table.refresh()
+        self.completed_entities_archive = SimulationCompletedEntitiesArchive(
+            SimulationVisualizationDataManager.get_saved_simulation_completed_entities_file_path(simulation_id)
+        )
+        self.durability = durability
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.compression = compression
+
+        self.file_path = None
+
+        self.__file = None
+        self.__lock = None
+        self.__pending_records = []
+        self.__last_flush_time = time.monotonic()
+
+        self.__state_order = 0
+        self.__state_timestamp = 0
+        self.__byte_length = 0
+        self.__updates_byte_length = 0
+        self.__update_count = 0
+
+    @property
+    def state_timestamp(self) -> float:
+        return self.__state_timestamp
+
+    @property
+    def updates_byte_length(self) -> int:
+        """
+        Size in bytes of the updates of the current state.
+        """
+        return self.__updates_byte_length
+
+    @property
+    def update_count(self) -> int:
+        return self.__update_count
+
+    def start_state(self, environment: VisualizedEnvironment) -> str:
+        """
+        Close the current state file and start a new one with the given environment.
+        """
+        SimulationVisualizationDataManager.verify_simulation_is_not_sealed(self.simulation_id)
+
+        self.close()
+
+        self.file_path = SimulationVisualizationDataManager.get_saved_simulation_state_file_path(
+            self.simulation_id, environment.order, environment.timestamp, self.codec.state_file_extension
+        )
+        self.__lock = FileLock(f"{self.file_path}.lock")
+
+        # The archive is written before the state that refers to it
+        active_environment = self.completed_entities_archive.archive_completed_entities(
+            environment, self.codec, self.stop_table, self.durability == SaveDurability.FSYNC_PER_CHECKPOINT
+        )
+
+        environment_record = self.codec.encode_environment(active_environment, self.stop_table)
+
+        with self.__lock:
+            # pylint: disable=consider-using-with
+            self.__file = open(self.file_path, "wb")
+            self.__file.write(environment_record)
+            self.__file.flush()
+
+        self.__last_flush_time = time.monotonic()
+
+        self.__state_order = environment.order
+        self.__state_timestamp = environment.timestamp
+        self.__byte_length = len(environment_record)
+        self.__updates_byte_length = 0
+        self.__update_count = 0
 
-        return polylines, version
+        # Index the state once it can be read
+        self.__append_state_index_entry()
+
+        return self.file_path
+
+    def write_update(self, update: Update) -> None:
+        if self.__file is None:
+            raise ValueError("A state must be started before writing updates")
+
+        self.completed_entities_archive.restore_updated_entity(update)
+
+        update_record = self.codec.encode_update(update, self.stop_table)
+
+        self.__pending_records.append(update_record)
+        self.__byte_length += len(update_record)
+        self.__updates_byte_length += len(update_record)
+        self.__update_count += 1
+
+        if (
+            self.durability == SaveDurability.FLUSH_PER_UPDATE
+            or len(self.__pending_records) >= self.batch_size
+            or time.monotonic() - self.__last_flush_time >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self, should_sync: bool = False) -> None:
+        """
+        Write all buffered updates to the current state file.
+        """
+        if self.__file is None:
+            return
+
+        with self.__lock:
+            if len(self.__pending_records) > 0:
+                self.__file.write(b"".join(self.__pending_records))
+                self.__pending_records = []
+
+            self.__file.flush()
+
+            if should_sync:
+                os.fsync(self.__file.fileno())
+
+        self.__last_flush_time = time.monotonic()
+
+    def close(self) -> None:
+        """
+        Flush the buffered updates, close the current state file and compress it.
+        """
+        if self.__file is None:
+            return
+
+        self.flush(self.durability == SaveDurability.FSYNC_PER_CHECKPOINT)
+
+        self.__file.close()
+
+        # The state is complete, it cannot change anymore
+        if self.compression != StateCompression.NONE:
+            self.__compress_state_file()
+
+        # Replace the index entry of the state by its final size
+        self.__append_state_index_entry()
+
+        self.__file = None
+        self.__lock = None
+        self.file_path = None
+
+    def __compress_state_file(self) -> None:
+        """
+        Replace the current state file by its compressed content.
+        """
+        compressed_file_path = f"{self.file_path}{get_compressed_state_file_extension(self.compression)}"
+        temporary_file_path = f"{compressed_file_path}.tmp"
+
+        with self.__lock:
+            with open(self.file_path, "rb") as file:
+                compressed_content = compress_state_file_content(file.read(), self.compression)
+
+            with open(temporary_file_path, "wb") as file:
+                file.write(compressed_content)
+
+                if self.durability == SaveDurability.FSYNC_PER_CHECKPOINT:
+                    file.flush()
+                    os.fsync(file.fileno())
+
+            # Readers never see a partially written compressed file
+            os.replace(temporary_file_path, compressed_file_path)
+            os.remove(self.file_path)
+
+    def __append_state_index_entry(self) -> None:
+        SimulationVisualizationDataManager.append_state_index_entry(
+            self.simulation_id,
+            StateIndexEntry(self.__state_order, self.__state_timestamp, self.__byte_length, self.__update_count),
+        )
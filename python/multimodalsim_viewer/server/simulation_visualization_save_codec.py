@@ -0,0 +1,720 @@
+import json
+import lzma
+import struct
+import zlib
+from typing import TYPE_CHECKING, Iterator
+
+from multimodalsim.state_machine.status import PassengerStatus, VehicleStatus
+
+from multimodalsim_viewer.common.utils import StateCompression
+
+try:
+    import zstandard
+except ImportError:
+    # The zstd compression is optional
+    zstandard = None
+
+if TYPE_CHECKING:
+    from multimodalsim_viewer.server.simulation_visualization_data_model import (
+        SimulationStopTable,
+        Update,
+        VisualizedEnvironment,
+    )
+
+
+# MARK: Codec
+class SaveCodec:
+    """
+    Encode and decode the records (states and updates) of a state file.
+
+    The first record of a state file is the environment and the following records are the updates.
+    Codecs that save the stops by id (see SimulationStopTable) need the stop table of the simulation.
+    """
+
+    version: int
+    state_file_extension: str
+
+    def encode_environment(
+        self, environment: "VisualizedEnvironment", stop_table: "SimulationStopTable | None" = None
+    ) -> bytes:
+        raise NotImplementedError()
+
+    def encode_update(self, update: "Update", stop_table: "SimulationStopTable | None" = None) -> bytes:
+        raise NotImplementedError()
+
+    def iter_records(self, content: bytes, stop_table: "SimulationStopTable | None" = None) -> Iterator[dict]:
+        """
+        Decode the complete records of the content of a state file into serialized dictionaries.
+        """
+        raise NotImplementedError()
+
+    def read_json_records(self, content: bytes, stop_table: "SimulationStopTable | None" = None) -> list[str]:
+        """
+        Decode the complete records of the content of a state file into JSON strings for the client.
+        """
+        return [json.dumps(record, separators=(",", ":")) for record in self.iter_records(content, stop_table)]
+
+
+# MARK: JSON lines
+class JsonLinesSaveCodec(SaveCodec):
+    """
+    Version 9 format: each record is a JSON object on its own line.
+    """
+
+    version = 9
+    state_file_extension = ".jsonl"
+
+    @staticmethod
+    def __encode(data: dict) -> bytes:
+        return (json.dumps(data, separators=(",", ":")) + "\n").encode("utf-8")
+
+    # pylint: disable=unused-argument
+    def encode_environment(
+        self, environment: "VisualizedEnvironment", stop_table: "SimulationStopTable | None" = None
+    ) -> bytes:
+        return self.__encode(environment.serialize())
+
+    def encode_update(self, update: "Update", stop_table: "SimulationStopTable | None" = None) -> bytes:
+        return self.__encode(update.serialize())
+
+    def iter_records(self, content: bytes, stop_table: "SimulationStopTable | None" = None) -> Iterator[dict]:
+        for line in self.read_json_records(content):
+            yield json.loads(line)
+
+    def read_json_records(self, content: bytes, stop_table: "SimulationStopTable | None" = None) -> list[str]:
+        # The records are already JSON, they can be sent as is
+        return [line for line in content.decode("utf-8").splitlines() if line != ""]
+
+    # pylint: enable=unused-argument
+
+
+# MARK: Binary
+# Version 10 format: each record is a little-endian uint32 length followed by the payload.
+#
+# Payload: kind (uint8, 0 for the environment, see _UPDATE_TYPES for updates) followed by the record.
+# Integers are LEB128 varints, numbers are either a zigzag varint shifted left by one bit for
+# integral values or a 0x01 byte followed by a float64, strings are a varint length followed by UTF-8
+# bytes and ids (or labels) are a 0x00 byte followed by a varint if they are canonical decimal integers
+# or a 0x01 byte followed by a string. Optional fields are announced by a bit field (uint8) in front of
+# each entity. Statuses are the index of the status in _PASSENGER_STATUSES or _VEHICLE_STATUSES.
+# Stop positions are two float64 (latitude, longitude).
+#
+# Version 11 format: same as version 10, except that the location of a stop (position, capacity and label) is
+# replaced by a varint id in the stop table of the simulation (see SimulationStopTable). Vehicle stops deltas are
+# the vehicle id, the number of previous stops, a has current stop byte, the number of stops and the changed stops
+# (varint count followed by the varint index and the stop of each one). Passenger legs deltas follow the same layout
+# with the legs of the passenger.
+#
+# Version 12 format: same records as version 11. The states only contain the passengers and vehicles that are not
+# complete. The complete ones are archived once as creation updates whose order is the order of the first state that
+# does not contain them.
+#
+# Version 13 format: same records as version 12. Once its state is complete, a state file can be compressed as a whole
+# (see StateCompression) and the extension of the compression is appended to its name. Byte offsets in a state file
+# (in the state index or sent to the clients) are always offsets in the uncompressed content.
+
+_RECORD_LENGTH = struct.Struct("<I")
+_FLOAT = struct.Struct("<d")
+_POSITION = struct.Struct("<dd")
+
+_ENVIRONMENT_KIND = 0
+
+_MAX_INTEGRAL_ID_LENGTH = 18
+
+_PASSENGER_STATUSES = [
+    (PassengerStatus.RELEASE, "release"),
+    (PassengerStatus.ASSIGNED, "assigned"),
+    (PassengerStatus.READY, "ready"),
+    (PassengerStatus.ONBOARD, "onboard"),
+    (PassengerStatus.COMPLETE, "complete"),
+]
+
+_VEHICLE_STATUSES = [
+    (VehicleStatus.RELEASE, "release"),
+    (VehicleStatus.IDLE, "idle"),
+    (VehicleStatus.BOARDING, "boarding"),
+    (VehicleStatus.ENROUTE, "enroute"),
+    (VehicleStatus.ALIGHTING, "alighting"),
+    (VehicleStatus.COMPLETE, "complete"),
+]
+
+# Update kinds, the index + 1 is written in the file
+_UPDATE_TYPES = [
+    "createPassenger",
+    "createVehicle",
+    "updatePassengerStatus",
+    "updatePassengerLegs",
+    "updateVehicleStatus",
+    "updateVehicleStops",
+    "updateStatistic",
+    "updateVehicleStopsDelta",
+    "updatePassengerLegsDelta",
+]
+
+
+class _BinaryEncoder:
+    buffer: bytearray
+    stop_table: "SimulationStopTable | None"
+
+    __PASSENGER_STATUS_INDEXES = {status: index for index, (status, _) in enumerate(_PASSENGER_STATUSES)}
+    __VEHICLE_STATUS_INDEXES = {status: index for index, (status, _) in enumerate(_VEHICLE_STATUSES)}
+    __UPDATE_KINDS = {update_type: index + 1 for index, update_type in enumerate(_UPDATE_TYPES)}
+
+    def __init__(self, stop_table: "SimulationStopTable | None" = None) -> None:
+        # Reserve the length of the record
+        self.buffer = bytearray(_RECORD_LENGTH.size)
+        self.stop_table = stop_table
+
+    def to_record(self) -> bytes:
+        _RECORD_LENGTH.pack_into(self.buffer, 0, len(self.buffer) - _RECORD_LENGTH.size)
+        return bytes(self.buffer)
+
+    # MARK: +- Primitives
+    def varint(self, value: int) -> None:
+        buffer = self.buffer
+        while value >= 0x80:
+            buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        buffer.append(value)
+
+    def number(self, value: float) -> None:
+        if isinstance(value, int) or value.is_integer():
+            value = int(value)
+            self.varint(((value << 1) ^ (value >> 63)) << 1)
+        else:
+            self.buffer.append(0x01)
+            self.buffer += _FLOAT.pack(value)
+
+    def string(self, value: str) -> None:
+        encoded = value.encode("utf-8")
+        self.varint(len(encoded))
+        self.buffer += encoded
+
+    def identifier(self, value: str | int) -> None:
+        value = str(value)
+        if value.isdecimal() and value.isascii() and len(value) <= _MAX_INTEGRAL_ID_LENGTH and str(int(value)) == value:
+            self.buffer.append(0x00)
+            self.varint(int(value))
+        else:
+            self.buffer.append(0x01)
+            self.string(value)
+
+    def json(self, value) -> None:
+        self.string(json.dumps(value, separators=(",", ":")))
+
+    # MARK: +- Entities
+    def leg(self, leg) -> None:
+        assigned_vehicle_id = leg.assigned_vehicle_id
+        boarding_stop_index = leg.boarding_stop_index
+        alighting_stop_index = leg.alighting_stop_index
+        boarding_time = leg.boarding_time
+        alighting_time = leg.alighting_time
+        assigned_time = leg.assigned_time
+
+        self.buffer.append(
+            (assigned_vehicle_id is not None)
+            | (boarding_stop_index is not None) << 1
+            | (alighting_stop_index is not None) << 2
+            | (boarding_time is not None) << 3
+            | (alighting_time is not None) << 4
+            | (assigned_time is not None) << 5
+        )
+
+        if assigned_vehicle_id is not None:
+            self.identifier(assigned_vehicle_id)
+        if boarding_stop_index is not None:
+            self.varint(boarding_stop_index)
+        if alighting_stop_index is not None:
+            self.varint(alighting_stop_index)
+        if boarding_time is not None:
+            self.number(boarding_time)
+        if alighting_time is not None:
+            self.number(alighting_time)
+        if assigned_time is not None:
+            self.number(assigned_time)
+
+    def legs(self, previous_legs: list, current_leg, next_legs: list) -> None:
+        self.buffer.append(current_leg is not None)
+
+        self.varint(len(previous_legs))
+        for leg in previous_legs:
+            self.leg(leg)
+
+        if current_leg is not None:
+            self.leg(current_leg)
+
+        self.varint(len(next_legs))
+        for leg in next_legs:
+            self.leg(leg)
+
+    def passenger(self, passenger) -> None:
+        self.identifier(passenger.passenger_id)
+        self.buffer.append(self.__PASSENGER_STATUS_INDEXES[passenger.status])
+        self.varint(passenger.number_of_passengers)
+
+        self.buffer.append(passenger.name is not None)
+        if passenger.name is not None:
+            self.string(passenger.name)
+
+        self.legs(passenger.previous_legs, passenger.current_leg, passenger.next_legs)
+
+    def stop(self, stop) -> None:
+        has_position = stop.latitude is not None and stop.longitude is not None
+
+        self.buffer.append(
+            (stop.departure_time is not None)
+            | has_position << 1
+            | (stop.capacity is not None) << 2
+            | (stop.label is not None) << 3
+        )
+
+        self.number(stop.arrival_time)
+        if stop.departure_time is not None:
+            self.number(stop.departure_time)
+        if has_position:
+            self.buffer += _POSITION.pack(stop.latitude, stop.longitude)
+        if stop.capacity is not None:
+            self.number(stop.capacity)
+        if stop.label is not None:
+            self.identifier(stop.label)
+
+    def stops(self, previous_stops: list, current_stop, next_stops: list) -> None:
+        self.buffer.append(current_stop is not None)
+
+        self.varint(len(previous_stops))
+        for stop in previous_stops:
+            self.stop(stop)
+
+        if current_stop is not None:
+            self.stop(current_stop)
+
+        self.varint(len(next_stops))
+        for stop in next_stops:
+            self.stop(stop)
+
+    def vehicle(self, vehicle) -> None:
+        self.identifier(vehicle.vehicle_id)
+        self.buffer.append(self.__VEHICLE_STATUS_INDEXES[vehicle.status])
+
+        self.buffer.append(
+            (vehicle.mode is not None) | (vehicle.name is not None) << 1 | (vehicle.capacity is not None) << 2
+        )
+        if vehicle.mode is not None:
+            self.string(vehicle.mode)
+        if vehicle.name is not None:
+            self.string(vehicle.name)
+        if vehicle.capacity is not None:
+            self.number(vehicle.capacity)
+
+        self.stops(vehicle.previous_stops, vehicle.current_stop, vehicle.next_stops)
+
+    def environment(self, environment) -> None:
+        self.buffer.append(_ENVIRONMENT_KIND)
+        self.number(environment.timestamp)
+        self.number(environment.estimated_end_time)
+        self.varint(environment.order)
+        self.json(environment.statistic if environment.statistic is not None else {})
+
+        self.varint(len(environment.passengers))
+        for passenger in environment.passengers.values():
+            self.passenger(passenger)
+
+        self.varint(len(environment.vehicles))
+        for vehicle in environment.vehicles.values():
+            self.vehicle(vehicle)
+
+    def update(self, update) -> None:
+        update_type = update.update_type.value
+        data = update.data
+
+        self.buffer.append(self.__UPDATE_KINDS[update_type])
+        self.number(update.timestamp)
+        self.varint(update.order)
+
+        if update_type == "createPassenger":
+            self.passenger(data)
+        elif update_type == "createVehicle":
+            self.vehicle(data)
+        elif update_type == "updatePassengerStatus":
+            self.identifier(data.passenger_id)
+            self.buffer.append(self.__PASSENGER_STATUS_INDEXES[data.status])
+        elif update_type == "updatePassengerLegs":
+            self.identifier(data.passenger_id)
+            self.legs(data.previous_legs, data.current_leg, data.next_legs)
+        elif update_type == "updateVehicleStatus":
+            self.identifier(data.vehicle_id)
+            self.buffer.append(self.__VEHICLE_STATUS_INDEXES[data.status])
+        elif update_type == "updateVehicleStops":
+            self.identifier(data.vehicle_id)
+            self.stops(data.previous_stops, data.current_stop, data.next_stops)
+        elif update_type == "updateStatistic":
+            self.json(data.statistic)
+        elif update_type == "updateVehicleStopsDelta":
+            self.identifier(data.vehicle_id)
+            self.varint(data.number_of_previous_stops)
+            self.buffer.append(data.has_current_stop)
+            self.varint(data.number_of_stops)
+            self.varint(len(data.changed_stops))
+            for index, stop in sorted(data.changed_stops.items()):
+                self.varint(index)
+                self.stop(stop)
+        elif update_type == "updatePassengerLegsDelta":
+            self.identifier(data.passenger_id)
+            self.varint(data.number_of_previous_legs)
+            self.buffer.append(data.has_current_leg)
+            self.varint(data.number_of_legs)
+            self.varint(len(data.changed_legs))
+            for index, leg in sorted(data.changed_legs.items()):
+                self.varint(index)
+                self.leg(leg)
+        else:
+            raise ValueError(f"Unknown update type {update_type}")
+
+
+class _BinaryDecoder:
+    data: bytes
+    position: int
+    stop_table: "SimulationStopTable | None"
+
+    def __init__(self, data: bytes, stop_table: "SimulationStopTable | None" = None) -> None:
+        self.data = data
+        self.position = 0
+        self.stop_table = stop_table
+
+    # MARK: +- Primitives
+    def byte(self) -> int:
+        value = self.data[self.position]
+        self.position += 1
+        return value
+
+    def varint(self) -> int:
+        data = self.data
+        position = self.position
+        value = 0
+        shift = 0
+        while True:
+            byte = data[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        self.position = position
+        return value
+
+    def number(self) -> int | float:
+        if self.data[self.position] & 0x01:
+            value = _FLOAT.unpack_from(self.data, self.position + 1)[0]
+            self.position += 1 + _FLOAT.size
+            return value
+
+        value = self.varint() >> 1
+        return (value >> 1) ^ -(value & 1)
+
+    def string(self) -> str:
+        length = self.varint()
+        value = self.data[self.position : self.position + length].decode("utf-8")
+        self.position += length
+        return value
+
+    def identifier(self) -> str:
+        if self.byte() == 0x00:
+            return str(self.varint())
+        return self.string()
+
+    def json(self):
+        return json.loads(self.string())
+
+    # MARK: +- Entities
+    def leg(self) -> dict:
+        flags = self.byte()
+        leg = {}
+        if flags & 0x01:
+            leg["assignedVehicleId"] = self.identifier()
+        if flags & 0x02:
+            leg["boardingStopIndex"] = self.varint()
+        if flags & 0x04:
+            leg["alightingStopIndex"] = self.varint()
+        if flags & 0x08:
+            leg["boardingTime"] = self.number()
+        if flags & 0x10:
+            leg["alightingTime"] = self.number()
+        if flags & 0x20:
+            leg["assignedTime"] = self.number()
+        return leg
+
+    def legs(self, serialized: dict) -> dict:
+        has_current_leg = self.byte()
+        serialized["previousLegs"] = [self.leg() for _ in range(self.varint())]
+        if has_current_leg:
+            serialized["currentLeg"] = self.leg()
+        serialized["nextLegs"] = [self.leg() for _ in range(self.varint())]
+        return serialized
+
+    def passenger(self) -> dict:
+        passenger = {
+            "id": self.identifier(),
+            "status": _PASSENGER_STATUSES[self.byte()][1],
+            "numberOfPassengers": self.varint(),
+        }
+        if self.byte():
+            passenger["name"] = self.string()
+        return self.legs(passenger)
+
+    def stop(self) -> dict:
+        flags = self.byte()
+        stop = {"arrivalTime": self.number()}
+        if flags & 0x01:
+            stop["departureTime"] = self.number()
+        if flags & 0x02:
+            latitude, longitude = _POSITION.unpack_from(self.data, self.position)
+            self.position += _POSITION.size
+            stop["position"] = {"latitude": latitude, "longitude": longitude}
+        if flags & 0x04:
+            stop["capacity"] = self.number()
+        stop["label"] = self.identifier() if flags & 0x08 else None
+        return stop
+
+    def stops(self, serialized: dict) -> dict:
+        has_current_stop = self.byte()
+        serialized["previousStops"] = [self.stop() for _ in range(self.varint())]
+        if has_current_stop:
+            serialized["currentStop"] = self.stop()
+        serialized["nextStops"] = [self.stop() for _ in range(self.varint())]
+        return serialized
+
+    def vehicle(self) -> dict:
+        vehicle = {
+            "id": self.identifier(),
+            "status": _VEHICLE_STATUSES[self.byte()][1],
+        }
+        flags = self.byte()
+        if flags & 0x01:
+            vehicle["mode"] = self.string()
+        vehicle["name"] = self.string() if flags & 0x02 else None
+        vehicle["capacity"] = self.number() if flags & 0x04 else None
+        return self.stops(vehicle)
+
+    def record(self) -> dict:
+        kind = self.byte()
+
+        if kind == _ENVIRONMENT_KIND:
+            environment = {
+                "timestamp": self.number(),
+                "estimatedEndTime": self.number(),
+                "order": self.varint(),
+                "statistic": self.json(),
+            }
+            environment["passengers"] = [self.passenger() for _ in range(self.varint())]
+            environment["vehicles"] = [self.vehicle() for _ in range(self.varint())]
+            return environment
+
+        update_type = _UPDATE_TYPES[kind - 1]
+        update = {"type": update_type, "timestamp": self.number(), "order": self.varint()}
+
+        if update_type == "createPassenger":
+            update["data"] = self.passenger()
+        elif update_type == "createVehicle":
+            update["data"] = self.vehicle()
+        elif update_type == "updatePassengerStatus":
+            update["data"] = {"id": self.identifier(), "status": _PASSENGER_STATUSES[self.byte()][1]}
+        elif update_type == "updatePassengerLegs":
+            update["data"] = self.legs({"id": self.identifier()})
+        elif update_type == "updateVehicleStatus":
+            update["data"] = {"id": self.identifier(), "status": _VEHICLE_STATUSES[self.byte()][1]}
+        elif update_type == "updateVehicleStops":
+            update["data"] = self.stops({"id": self.identifier()})
+        elif update_type == "updateStatistic":
+            update["data"] = {"statistic": self.json()}
+        elif update_type == "updateVehicleStopsDelta":
+            update["data"] = {
+                "id": self.identifier(),
+                "previousStopsCount": self.varint(),
+                "hasCurrentStop": bool(self.byte()),
+                "stopsCount": self.varint(),
+            }
+            update["data"]["changedStops"] = [
+                {"index": self.varint(), "stop": self.stop()} for _ in range(self.varint())
+            ]
+        elif update_type == "updatePassengerLegsDelta":
+            update["data"] = {
+                "id": self.identifier(),
+                "previousLegsCount": self.varint(),
+                "hasCurrentLeg": bool(self.byte()),
+                "legsCount": self.varint(),
+            }
+            update["data"]["changedLegs"] = [{"index": self.varint(), "leg": self.leg()} for _ in range(self.varint())]
+
+        return update
+
+
+class _InternedStopsBinaryEncoder(_BinaryEncoder):
+    def stop(self, stop) -> None:
+        self.buffer.append(stop.departure_time is not None)
+
+        self.number(stop.arrival_time)
+        if stop.departure_time is not None:
+            self.number(stop.departure_time)
+
+        self.varint(self.stop_table.get_stop_id(stop))
+
+
+class _InternedStopsBinaryDecoder(_BinaryDecoder):
+    def stop(self) -> dict:
+        flags = self.byte()
+        stop = {"arrivalTime": self.number()}
+        if flags & 0x01:
+            stop["departureTime"] = self.number()
+        stop.update(self.stop_table.get_location(self.varint()))
+        return stop
+
+
+class BinarySaveCodec(SaveCodec):
+    """
+    Version 10 format: length-prefixed binary records.
+    """
+
+    version = 10
+    state_file_extension = ".bin"
+
+    encoder_class: type[_BinaryEncoder] = _BinaryEncoder
+    decoder_class: type[_BinaryDecoder] = _BinaryDecoder
+
+    def encode_environment(
+        self, environment: "VisualizedEnvironment", stop_table: "SimulationStopTable | None" = None
+    ) -> bytes:
+        encoder = self.encoder_class(stop_table)
+        encoder.environment(environment)
+        return encoder.to_record()
+
+    def encode_update(self, update: "Update", stop_table: "SimulationStopTable | None" = None) -> bytes:
+        encoder = self.encoder_class(stop_table)
+        encoder.update(update)
+        return encoder.to_record()
+
+    def iter_records(self, content: bytes, stop_table: "SimulationStopTable | None" = None) -> Iterator[dict]:
+        position = 0
+        content_length = len(content)
+
+        while position + _RECORD_LENGTH.size <= content_length:
+            (record_length,) = _RECORD_LENGTH.unpack_from(content, position)
+            position += _RECORD_LENGTH.size
+
+            # Ignore a record that is still being written
+            if position + record_length > content_length:
+                break
+
+            yield self.decoder_class(content[position : position + record_length], stop_table).record()
+
+            position += record_length
+
+
+class InternedStopsBinarySaveCodec(BinarySaveCodec):
+    """
+    Version 11 format: version 10 with the stops saved by id in the stop table of the simulation.
+    """
+
+    version = 11
+
+    encoder_class = _InternedStopsBinaryEncoder
+    decoder_class = _InternedStopsBinaryDecoder
+
+    def encode_environment(
+        self, environment: "VisualizedEnvironment", stop_table: "SimulationStopTable | None" = None
+    ) -> bytes:
+        if stop_table is None:
+            raise ValueError(f"Version {self.version} saves need a stop table")
+        return super().encode_environment(environment, stop_table)
+
+    def encode_update(self, update: "Update", stop_table: "SimulationStopTable | None" = None) -> bytes:
+        if stop_table is None:
+            raise ValueError(f"Version {self.version} saves need a stop table")
+        return super().encode_update(update, stop_table)
+
+    def iter_records(self, content: bytes, stop_table: "SimulationStopTable | None" = None) -> Iterator[dict]:
+        if stop_table is None:
+            raise ValueError(f"Version {self.version} saves need a stop table")
+        return super().iter_records(content, stop_table)
+
+
+class CompletedEntitiesArchiveBinarySaveCodec(InternedStopsBinarySaveCodec):
+    """
+    Version 12 format: version 11 records, with the complete passengers and vehicles saved once in the completed
+    entities archive of the simulation instead of in every state (see SimulationCompletedEntitiesArchive).
+    """
+
+    version = 12
+
+
+class CompressedStatesBinarySaveCodec(CompletedEntitiesArchiveBinarySaveCodec):
+    """
+    Version 13 format: version 12 records, with the state files compressed once their state is complete.
+    """
+
+    version = 13
+
+
+SAVE_CODECS: dict[int, SaveCodec] = {
+    codec.version: codec
+    for codec in [
+        JsonLinesSaveCodec(),
+        BinarySaveCodec(),
+        InternedStopsBinarySaveCodec(),
+        CompletedEntitiesArchiveBinarySaveCodec(),
+        CompressedStatesBinarySaveCodec(),
+    ]
+}
+
+
+def get_save_codec(version: int) -> SaveCodec:
+    if version not in SAVE_CODECS:
+        raise ValueError(f"No save codec for version {version}")
+    return SAVE_CODECS[version]
+
+
+# MARK: State compression
+_COMPRESSED_STATE_FILE_EXTENSIONS = {
+    StateCompression.ZLIB: ".zz",
+    StateCompression.LZMA: ".xz",
+    StateCompression.ZSTD: ".zst",
+}
+
+COMPRESSED_STATE_FILE_EXTENSIONS = tuple(_COMPRESSED_STATE_FILE_EXTENSIONS.values())
+
+
+def verify_state_compression_is_available(compression: StateCompression) -> None:
+    if compression == StateCompression.ZSTD and zstandard is None:
+        raise ValueError("The zstd compression needs the zstandard package")
+
+
+def get_compressed_state_file_extension(compression: StateCompression) -> str:
+    """
+    Get the extension appended to the name of a state file compressed with the given compression.
+    """
+    if compression not in _COMPRESSED_STATE_FILE_EXTENSIONS:
+        raise ValueError(f"No file extension for the {compression.value} compression")
+    return _COMPRESSED_STATE_FILE_EXTENSIONS[compression]
+
+
+def compress_state_file_content(content: bytes, compression: StateCompression) -> bytes:
+    verify_state_compression_is_available(compression)
+
+    if compression == StateCompression.ZLIB:
+        return zlib.compress(content)
+    if compression == StateCompression.LZMA:
+        return lzma.compress(content)
+    if compression == StateCompression.ZSTD:
+        return zstandard.ZstdCompressor().compress(content)
+    return content
+
+
+def decompress_state_file_content(content: bytes, compression: StateCompression) -> bytes:
+    verify_state_compression_is_available(compression)
+
+    if compression == StateCompression.ZLIB:
+        return zlib.decompress(content)
+    if compression == StateCompression.LZMA:
+        return lzma.decompress(content)
+    if compression == StateCompression.ZSTD:
+        return zstandard.ZstdDecompressor().decompress(content)
+    return content
@@ -26,14 +26,21 @@ setup(
         "questionary==2.1.0",
         "python-dotenv==1.1.0",
         "multimodalsim==0.0.1",
+        "polyline==2.0.4",
     ],
-    extras_require={"dev": ["black==25.1.0", "pylint==3.3.7", "isort==6.0.1"]},
+    extras_require={
+        "dev": ["black==25.1.0", "pylint==3.3.7", "isort==6.0.1", "pytest==9.1.1"],
+        # Compression of the state files with zstd
+        "zstd": ["zstandard==0.23.0"],
+    },
     python_requires="==3.11.*",
     entry_points={
         "console_scripts": [
             "multimodalsim-server=multimodalsim_viewer.server.server:run_server",
             "multimodalsim-ui=multimodalsim_viewer.ui.cli:main",
             "multimodalsim-simulation=multimodalsim_viewer.server.simulation:run_simulation_cli",
+            "multimodalsim-batch=multimodalsim_viewer.server.batch:run_batch_cli",
+            "multimodalsim-compact=multimodalsim_viewer.server.compact:run_compact_cli",
             "multimodalsim-viewer=multimodalsim_viewer.server.scripts:run_server_and_ui",
             "multimodalsim-stop-server=multimodalsim_viewer.server.scripts:terminate_server",
             "multimodalsim-stop-ui=multimodalsim_viewer.server.scripts:terminate_ui",
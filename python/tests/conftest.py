@@ -0,0 +1,43 @@
+from collections.abc import Iterator
+
+import pytest
+
+from multimodalsim_viewer.common.utils import SIMULATION_SAVE_FILE_SEPARATOR
+from multimodalsim_viewer.server.simulation_visualization_data_model import (
+    SimulationInformation,
+    SimulationVisualizationDataManager,
+)
+
+
+@pytest.fixture(name="saved_simulations_directory_path", autouse=True)
+def fixture_saved_simulations_directory_path(tmp_path, monkeypatch) -> Iterator[str]:
+    """
+    Save the simulations of each test in a temporary directory.
+    """
+    directory_path = str(tmp_path)
+
+    monkeypatch.setattr(
+        SimulationVisualizationDataManager,
+        "get_saved_simulations_directory_path",
+        staticmethod(lambda: directory_path),
+    )
+
+    yield directory_path
+
+    for saved_simulation_id in SimulationVisualizationDataManager.get_all_saved_simulation_ids():
+        SimulationVisualizationDataManager.clear_cached_simulation(saved_simulation_id)
+
+
+@pytest.fixture(name="simulation_id")
+def fixture_simulation_id() -> str:
+    """
+    A new simulation that has started, with its information saved.
+    """
+    simulation_id = f"20260101-000000000{SIMULATION_SAVE_FILE_SEPARATOR}test"
+
+    SimulationVisualizationDataManager.create_saved_simulation_directory(simulation_id)
+    SimulationVisualizationDataManager.set_simulation_information(
+        simulation_id, SimulationInformation(simulation_id, "test", 0, None, None, None)
+    )
+
+    return simulation_id
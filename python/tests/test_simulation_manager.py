@@ -0,0 +1,59 @@
+import multiprocessing
+from collections.abc import Iterator
+
+import pytest
+
+from multimodalsim_viewer.common import utils
+from multimodalsim_viewer.common.utils import SimulationStatus
+from multimodalsim_viewer.server import simulation_manager
+from multimodalsim_viewer.server.simulation_manager import SimulationManager
+
+# Set to let the simulation processes exit
+exit_event = multiprocessing.Event()
+
+
+def run_simulation_until_exit_event(*_) -> None:
+    exit_event.wait()
+
+
+@pytest.fixture(name="manager")
+def fixture_manager(monkeypatch) -> Iterator[SimulationManager]:
+    """
+    A manager without clients, whose simulation processes exit before connecting to the server.
+    """
+    monkeypatch.setattr(simulation_manager, "emit", lambda *args, **kwargs: None)
+    monkeypatch.setattr(utils, "emit", lambda *args, **kwargs: None)
+    monkeypatch.setattr(simulation_manager, "run_simulation", run_simulation_until_exit_event)
+
+    exit_event.clear()
+
+    manager = SimulationManager(progress_emit_interval=0, max_concurrent_simulations=1)
+
+    yield manager
+
+    exit_event.set()
+
+    for simulation in manager.simulations.values():
+        if simulation.process is not None:
+            simulation.process.join()
+
+
+# MARK: Queue
+def test_queued_simulation_starts_when_a_process_exits_before_connecting(manager):
+    first_simulation = manager.start_simulation("first", "data", "response", None)
+    second_simulation = manager.start_simulation("second", "data", "response", None)
+
+    assert first_simulation.status == SimulationStatus.STARTING
+    assert second_simulation.status == SimulationStatus.QUEUED
+
+    # The first process exits without any event
+    exit_event.set()
+    first_simulation.process.join()
+
+    manager.start_queued_simulations_in_freed_slots()
+
+    assert second_simulation.status == SimulationStatus.STARTING
+    assert manager.queued_simulation_ids == []
+
+    changes = dict(manager.pop_throttled_simulation_changes())
+    assert changes[second_simulation.simulation_id]["status"] == SimulationStatus.STARTING.value
@@ -0,0 +1,112 @@
+import os
+
+import pytest
+from multimodalsim.state_machine.status import VehicleStatus
+
+from multimodalsim_viewer.server.simulation_visualization_data_model import (
+    SimulationInformation,
+    SimulationStateWriter,
+    SimulationVisualizationDataManager,
+    VisualizedEnvironment,
+    VisualizedStop,
+    VisualizedVehicle,
+)
+
+
+def build_environment(order: int, timestamp: float, stop_labels: list[str]) -> VisualizedEnvironment:
+    environment = VisualizedEnvironment()
+    environment.order = order
+    environment.timestamp = timestamp
+
+    stops = [
+        VisualizedStop(timestamp, None, 45.5, -73.6 + index / 100, None, label)
+        for index, label in enumerate(stop_labels)
+    ]
+    environment.add_vehicle(VisualizedVehicle("vehicle", "bus", VehicleStatus.ENROUTE, None, [], None, stops, 10))
+
+    return environment
+
+
+def save_completed_simulation(simulation_id: str) -> None:
+    """
+    Save two states without updates and seal the simulation.
+    """
+    state_writer = SimulationStateWriter(simulation_id)
+    state_writer.start_state(build_environment(0, 0, ["A"]))
+    state_writer.start_state(build_environment(1, 10, ["A", "B"]))
+    state_writer.close()
+
+    SimulationVisualizationDataManager.set_simulation_information(
+        simulation_id, SimulationInformation(simulation_id, "test", 0, 10, 1, None)
+    )
+    SimulationVisualizationDataManager.seal_simulation(simulation_id)
+
+
+# MARK: Sealed simulations
+def test_sealed_simulation_is_read_entirely_when_cached_while_running(simulation_id):
+    state_writer = SimulationStateWriter(simulation_id)
+    state_writer.start_state(build_environment(0, 0, ["A"]))
+
+    # The server reads the simulation while it is running
+    missing_states = SimulationVisualizationDataManager.get_missing_states(simulation_id, 0, [], False)
+    assert len(missing_states[0]) == 1
+
+    state_writer.start_state(build_environment(1, 10, ["A", "B"]))
+    state_writer.close()
+
+    SimulationVisualizationDataManager.seal_simulation(simulation_id)
+
+    # The state and the stop saved after the simulation was cached are read once it is sealed
+    assert SimulationVisualizationDataManager.get_state_index(simulation_id).sorted_states == [(0, 0), (1, 10)]
+
+    missing_states = SimulationVisualizationDataManager.get_missing_states(simulation_id, 10, [0], True)
+    assert missing_states[6] == 1
+    assert '"label":"B"' in missing_states[0][0]
+
+
+# MARK: Compaction
+def test_compaction_by_another_process_is_noticed(simulation_id, monkeypatch):
+    save_completed_simulation(simulation_id)
+
+    # The server caches the sealed simulation
+    assert len(SimulationVisualizationDataManager.get_state_index(simulation_id).sorted_states) == 2
+
+    # Another process does not clear the caches of the server
+    with monkeypatch.context() as context:
+        context.setattr(
+            SimulationVisualizationDataManager, "clear_cached_simulation", staticmethod(lambda simulation_id: None)
+        )
+        SimulationVisualizationDataManager.compact_simulation(simulation_id)
+
+    # The first state is the only one without updates after the compaction
+    assert SimulationVisualizationDataManager.get_state_index(simulation_id).sorted_states == [(0, 0)]
+
+    missing_states = SimulationVisualizationDataManager.get_missing_states(simulation_id, 10, [], True)
+    assert missing_states[6] == 0
+
+
+def test_failed_compaction_swap_puts_the_simulation_back(simulation_id, saved_simulations_directory_path, monkeypatch):
+    save_completed_simulation(simulation_id)
+
+    simulation_directory_path = SimulationVisualizationDataManager.get_saved_simulation_directory_path(simulation_id)
+    rename = os.rename
+
+    def rename_and_fail_to_replace(source_path: str, target_path: str) -> None:
+        # Read the simulation while it is missing, then fail to move the compacted directory in its place
+        if target_path == simulation_directory_path and source_path.endswith(".compacting"):
+            assert not SimulationVisualizationDataManager.is_simulation_sealed(simulation_id)
+            assert SimulationVisualizationDataManager.get_sorted_states(simulation_id) == []
+            assert not os.path.exists(simulation_directory_path)
+
+            raise OSError("Cannot rename")
+
+        rename(source_path, target_path)
+
+    monkeypatch.setattr(os, "rename", rename_and_fail_to_replace)
+
+    with pytest.raises(ValueError):
+        SimulationVisualizationDataManager.compact_simulation(simulation_id)
+
+    # Only the simulation is left, unchanged
+    assert os.listdir(saved_simulations_directory_path) == [simulation_id]
+    assert SimulationVisualizationDataManager.get_state_index(simulation_id).sorted_states == [(0, 0), (1, 10)]